@@ -9,8 +9,8 @@ from logging.config import fileConfig
 from pathlib import Path
 
 from alembic import context
-from sqlalchemy import engine_from_config, pool
-from sqlalchemy.engine import make_url
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection, make_url
 
 # ======================================================================
 # 1. Добавляем путь к корню проекта в sys.path
@@ -21,24 +21,24 @@ sys.path.insert(0, project_root)
 # ======================================================================
 # 2. Импортируем MetaData всех моделей
 # ======================================================================
-from database.db import engine as async_engine  # AsyncEngine приложения
+from database.db import make_engine             # фабрика AsyncEngine приложения
 from database.models import Base                # declarative_base()
 from database.models import User, Group, GoogleSheet
 # ======================================================================
 
 
-# Получаем URL из конфига
+# Получаем URL: DATABASE_URL из окружения важнее значения в alembic.ini
 config = context.config
 alembic_config = config.get_section(config.config_ini_section)
-original_url = alembic_config.get("sqlalchemy.url")
+original_url = os.getenv("DATABASE_URL") or alembic_config.get("sqlalchemy.url")
 
 # Если URL не найден, вызываем ошибку
 if not original_url:
     raise ValueError("Не задан sqlalchemy.url в alembic.ini")
 
-# Конвертируем async-URL в sync-URL
+# Для offline-режима нужен только диалект (sqlite / postgresql), без async-драйвера
 SYNC_DATABASE_URL = str(
-    make_url(original_url).set(drivername="sqlite")
+    make_url(original_url).set(drivername=make_url(original_url).get_backend_name())
 )
 
 # ----------------------------------------------------------------------
@@ -56,25 +56,32 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 # ----------------------------------------------------------------------
-# ON-line режим — прямое подключение к БД и выполнение миграций
+# ON-line режим — подключение через async-движок приложения
+# (aiosqlite или asyncpg) и выполнение миграций
 # ----------------------------------------------------------------------
-def run_migrations_online() -> None:
-    """Run migrations in 'online' mode."""
-    connectable = engine_from_config(
-        {"sqlalchemy.url": SYNC_DATABASE_URL},
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        render_as_batch=True,  # важно для SQLite
     )
 
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=Base.metadata,
-            render_as_batch=True,  # важно для SQLite
-        )
+    with context.begin_transaction():
+        context.run_migrations()
+
 
-        with context.begin_transaction():
-            context.run_migrations()
+async def run_async_migrations() -> None:
+    connectable = make_engine(original_url, poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
+    asyncio.run(run_async_migrations())
 
 # ----------------------------------------------------------------------
 #  Запускаем подходящую процедуру
@@ -0,0 +1,40 @@
+"""Add generation_cache table
+
+Revision ID: 3b7c1d2e4f50
+Revises: f6fed09e535d
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1d2e4f50'
+down_revision: Union[str, None] = 'f6fed09e535d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('total_tokens', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('generation_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_generation_cache_created_at'), ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generation_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generation_cache_created_at'))
+
+    op.drop_table('generation_cache')
@@ -0,0 +1,32 @@
+"""Add route and cost to llm_usage
+
+Revision ID: 5d9e0b7a3c21
+Revises: c41f7a9e2d68
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9e0b7a3c21'
+down_revision: Union[str, None] = 'c41f7a9e2d68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('route', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('cost_usd', sa.Float(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.drop_column('cost_usd')
+        batch_op.drop_column('route')
@@ -0,0 +1,48 @@
+"""Add execution fields to generated_series
+
+Revision ID: 8e2a4c6d9b13
+Revises: 3b7c1d2e4f50
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2a4c6d9b13'
+down_revision: Union[str, None] = '3b7c1d2e4f50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    # Старые базы (в том числе созданные setup_db.py) уже содержат часть колонок
+    columns = {c['name'] for c in inspector.get_columns('generated_series')}
+    indexes = {i['name'] for i in inspector.get_indexes('generated_series')}
+    with op.batch_alter_table('generated_series', schema=None) as batch_op:
+        if 'post_limit' not in columns:
+            batch_op.add_column(sa.Column('post_limit', sa.Integer(), nullable=False, server_default='10'))
+        if 'posts_generated' not in columns:
+            batch_op.add_column(sa.Column('posts_generated', sa.Integer(), nullable=False, server_default='0'))
+        if 'moderation' not in columns:
+            batch_op.add_column(sa.Column('moderation', sa.Boolean(), nullable=False, server_default=sa.true()))
+        if 'is_active' not in columns:
+            batch_op.add_column(sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+        if 'ix_generated_series_is_active' not in indexes:
+            batch_op.create_index(batch_op.f('ix_generated_series_is_active'), ['is_active'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('generated_series', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_generated_series_is_active'))
+        batch_op.drop_column('is_active')
+        batch_op.drop_column('moderation')
+        batch_op.drop_column('posts_generated')
+        batch_op.drop_column('post_limit')
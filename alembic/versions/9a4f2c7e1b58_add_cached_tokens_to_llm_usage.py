@@ -0,0 +1,30 @@
+"""Add cached_tokens to llm_usage
+
+Revision ID: 9a4f2c7e1b58
+Revises: 5d9e0b7a3c21
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f2c7e1b58'
+down_revision: Union[str, None] = '5d9e0b7a3c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cached_tokens', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.drop_column('cached_tokens')
@@ -0,0 +1,49 @@
+"""Add posts_archive table
+
+Revision ID: a6d4f1c83e92
+Revises: e2c8a6f4b710
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d4f1c83e92'
+down_revision: Union[str, None] = 'e2c8a6f4b710'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('posts_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('media_file_id', sa.String(), nullable=True),
+    sa.Column('publish_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('published', sa.Boolean(), nullable=False),
+    sa.Column('is_generated', sa.Boolean(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=True),
+    sa.Column('generation_params', sa.Text(), nullable=True),
+    sa.Column('rejection_reason', sa.String(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('posts_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_archive_chat_id_publish_at', ['chat_id', 'publish_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('posts_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_posts_archive_chat_id_publish_at')
+
+    op.drop_table('posts_archive')
@@ -0,0 +1,46 @@
+"""Add preview column to posts, posts_archive and generated_posts
+
+Revision ID: b8e2d5f7a031
+Revises: a6d4f1c83e92
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2d5f7a031'
+down_revision: Union[str, None] = 'a6d4f1c83e92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Совпадает с database.models.post.PREVIEW_LENGTH на момент миграции
+PREVIEW_LENGTH = 100
+
+TABLES = ('posts', 'posts_archive', 'generated_posts')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('preview', sa.String(length=PREVIEW_LENGTH + 1), nullable=True))
+
+        # Заполняем превью существующих строк: начало текста и многоточие, если текст длиннее
+        table = sa.table(table_name, sa.column('text', sa.Text), sa.column('preview', sa.String))
+        op.execute(
+            table.update().values(
+                preview=sa.func.substr(table.c.text, 1, PREVIEW_LENGTH, type_=sa.String)
+                + sa.case((sa.func.length(table.c.text) > PREVIEW_LENGTH, '…'), else_='')
+            )
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in reversed(TABLES):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('preview')
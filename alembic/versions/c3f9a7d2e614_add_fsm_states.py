@@ -0,0 +1,39 @@
+"""Add fsm_states table
+
+Revision ID: c3f9a7d2e614
+Revises: b8e2d5f7a031
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a7d2e614'
+down_revision: Union[str, None] = 'b8e2d5f7a031'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('fsm_states',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('state', sa.String(length=255), nullable=True),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('fsm_states', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_fsm_states_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('fsm_states', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_fsm_states_updated_at'))
+
+    op.drop_table('fsm_states')
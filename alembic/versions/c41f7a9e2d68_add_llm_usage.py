@@ -0,0 +1,49 @@
+"""Add llm_usage table
+
+Revision ID: c41f7a9e2d68
+Revises: 8e2a4c6d9b13
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a9e2d68'
+down_revision: Union[str, None] = '8e2a4c6d9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_usage',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=True),
+    sa.Column('chat_id', sa.BigInteger(), nullable=True),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('total_tokens', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_llm_usage_chat_id'), ['chat_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_llm_usage_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_llm_usage_user_id'), ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_llm_usage_user_id'))
+        batch_op.drop_index(batch_op.f('ix_llm_usage_created_at'))
+        batch_op.drop_index(batch_op.f('ix_llm_usage_chat_id'))
+
+    op.drop_table('llm_usage')
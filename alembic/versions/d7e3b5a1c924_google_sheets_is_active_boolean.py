@@ -0,0 +1,43 @@
+"""Make google_sheets.is_active a boolean
+
+Revision ID: d7e3b5a1c924
+Revises: 9a4f2c7e1b58
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e3b5a1c924'
+down_revision: Union[str, None] = '9a4f2c7e1b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # В SQLite значения 0/1 остаются как есть; в PostgreSQL нужен явный USING
+    with op.batch_alter_table('google_sheets', schema=None) as batch_op:
+        batch_op.alter_column(
+            'is_active',
+            existing_type=sa.Integer(),
+            type_=sa.Boolean(),
+            existing_nullable=False,
+            postgresql_using='is_active::boolean',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('google_sheets', schema=None) as batch_op:
+        batch_op.alter_column(
+            'is_active',
+            existing_type=sa.Boolean(),
+            type_=sa.Integer(),
+            existing_nullable=False,
+            postgresql_using='is_active::integer',
+        )
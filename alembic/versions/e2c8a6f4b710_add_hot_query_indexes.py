@@ -0,0 +1,53 @@
+"""Add indexes for hot handler and scheduler queries
+
+Revision ID: e2c8a6f4b710
+Revises: d7e3b5a1c924
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c8a6f4b710'
+down_revision: Union[str, None] = 'd7e3b5a1c924'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (таблица, имя индекса, колонки)
+INDEXES = [
+    ('posts', 'ix_posts_chat_id_published_publish_at', ['chat_id', 'published', 'publish_at']),
+    ('posts', 'ix_posts_chat_id_status_published_publish_at', ['chat_id', 'status', 'published', 'publish_at']),
+    ('google_sheets', 'ix_google_sheets_is_active', ['is_active']),
+    ('google_sheets', 'ix_google_sheets_chat_id', ['chat_id']),
+    ('groups', 'ix_groups_added_by', ['added_by']),
+    ('generated_posts', 'ix_generated_posts_status_publish_at', ['status', 'publish_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    # Базы, созданные setup_db.py, уже содержат groups.added_by и date_added
+    group_columns = {c['name'] for c in inspector.get_columns('groups')}
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        if 'added_by' not in group_columns:
+            batch_op.add_column(sa.Column('added_by', sa.BigInteger(), nullable=True))
+        if 'date_added' not in group_columns:
+            batch_op.add_column(sa.Column('date_added', sa.DateTime(), nullable=True))
+
+    for table, name, columns in INDEXES:
+        existing = {i['name'] for i in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Колонки groups не удаляются: на части баз они существовали до этой миграции
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
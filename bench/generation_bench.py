@@ -0,0 +1,255 @@
+# bench/generation_bench.py
+"""
+Бенчмарк генерации: прогоняет сценарии BASIC и PRO из handlers/auto_generation.py
+от начала до конца против локальной заглушки API (bench/openai_stub.py).
+
+Хэндлеры вызываются напрямую с поддельными Message/CallbackQuery и настоящим
+FSMContext на MemoryStorage, поэтому в замер входят очередь генерации, кэш,
+HTTP-клиент и стриминг с правками сообщения. Telegram и реальные токены
+не используются; БД - временный SQLite-файл.
+
+Пример:
+
+    python -m bench.generation_bench --users 20 --requests 5 --distinct 10 --latency 0.8
+
+Чтобы гонять против уже запущенной заглушки (или другого совместимого API),
+передайте --base-url http://127.0.0.1:8088/v1.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench.openai_stub import StubConfig, start_stub  # noqa: E402
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль (ближайший ранг)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """Фиксирует время первого показанного фрагмента текста"""
+
+    def __init__(self, cursor: str):
+        self.cursor = cursor
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.edits = 0
+
+    def on_text(self, text: str):
+        self.edits += 1
+        if self.first_token_at is None and (self.cursor in text or text.startswith("✅")):
+            self.first_token_at = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.first_token_at - self.started if self.first_token_at else None
+
+
+class FakeMessage:
+    """Минимальная замена aiogram Message для вызова хэндлеров"""
+
+    def __init__(self, user_id: int, recorder: Recorder, text: str = ""):
+        self.from_user = SimpleNamespace(id=user_id, username=f"bench{user_id}", full_name=f"Bench {user_id}")
+        self.chat = SimpleNamespace(id=user_id)
+        self.text = text
+        self.recorder = recorder
+
+    async def edit_text(self, text: str, **kwargs):
+        self.recorder.on_text(text)
+        return self
+
+    async def answer(self, text: str, **kwargs):
+        self.recorder.on_text(text)
+        return FakeMessage(self.from_user.id, self.recorder)
+
+    async def edit_reply_markup(self, **kwargs):
+        return self
+
+
+class FakeCallback:
+    """Минимальная замена aiogram CallbackQuery"""
+
+    def __init__(self, user_id: int, data: str, message: FakeMessage):
+        self.from_user = message.from_user
+        self.data = data
+        self.message = message
+
+    async def answer(self, *args, **kwargs):
+        return None
+
+
+async def main(args):
+    # Окружение выставляется до импорта модулей бота: они читают config при импорте
+    stub_runner = None
+    base_url = args.base_url
+    if not base_url:
+        stub_runner, base_url = await start_stub(StubConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            tokens_per_sec=args.tokens_per_sec,
+            words=args.words,
+            error_rate=args.error_rate,
+        ))
+
+    tmp_dir = tempfile.mkdtemp(prefix="publicus-bench-")
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_dir}/bench.db"
+    os.environ.setdefault("LLM_USER_DAILY_TOKENS", "0")
+    os.environ.setdefault("LLM_CHAT_DAILY_TOKENS", "0")
+    os.environ.setdefault("STREAM_EDIT_INTERVAL", "0.2")
+
+    from aiogram.fsm.context import FSMContext
+    from aiogram.fsm.storage.base import StorageKey
+    from aiogram.fsm.storage.memory import MemoryStorage
+
+    import gpt_client
+    from database.db import engine
+    from database.models import Base
+    from handlers.auto_generation import AutoGenStates, process_length, process_pro_prompt
+    from utils.generation_cache import generation_cache
+    from utils.metrics import metrics
+    from utils.stream_editor import TYPING_CURSOR
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    storage = MemoryStorage()
+    results = {"basic": [], "pro": []}
+
+    def make_state(user_id: int) -> FSMContext:
+        return FSMContext(storage=storage, key=StorageKey(bot_id=0, chat_id=user_id, user_id=user_id))
+
+    async def run_basic(user_id: int, variant: int):
+        state = make_state(user_id)
+        await state.set_data({
+            "chat_id": -1000000000000 - user_id % 10,
+            "blog_topic_code": "tech",
+            "content_type_code": "news",
+            "themes": f"тема {variant}",
+            "tone_code": "friendly",
+            "structure": {"title": True, "main": True, "hashtags": True},
+        })
+        await state.set_state(AutoGenStates.length)
+
+        recorder = Recorder(TYPING_CURSOR)
+        call = FakeCallback(user_id, "len_medium", FakeMessage(user_id, recorder))
+        started = time.perf_counter()
+        await process_length(call, state)
+        latency = time.perf_counter() - started
+        ok = await state.get_state() == AutoGenStates.generated_post.state
+        results["basic"].append((latency, recorder.ttft, ok))
+
+    async def run_pro(user_id: int, variant: int):
+        state = make_state(user_id)
+        await state.set_data({"chat_id": -1000000000000 - user_id % 10})
+        await state.set_state(AutoGenStates.pro_prompt)
+
+        recorder = Recorder(TYPING_CURSOR)
+        message = FakeMessage(user_id, recorder, text=f"Напиши пост про идею №{variant} для канала о маркетинге")
+        started = time.perf_counter()
+        await process_pro_prompt(message, state)
+        latency = time.perf_counter() - started
+        ok = await state.get_state() == AutoGenStates.pro_generated_post.state
+        results["pro"].append((latency, recorder.ttft, ok))
+
+    async def user_session(user_id: int):
+        for i in range(args.requests):
+            variant = (user_id * args.requests + i) % args.distinct
+            flow = args.mode if args.mode != "mixed" else ("basic" if (user_id + i) % 2 == 0 else "pro")
+            if flow == "basic":
+                await run_basic(user_id, variant)
+            else:
+                await run_pro(user_id, variant)
+
+    print(f"API: {base_url}; users={args.users}, requests/user={args.requests}, "
+          f"distinct prompts={args.distinct}, mode={args.mode}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_session(1000 + u) for u in range(args.users)))
+    wall = time.perf_counter() - started
+
+    total = sum(len(v) for v in results.values())
+    print(f"\nTotal: {total} generations in {wall:.2f}s, throughput {total / wall:.2f} gen/s\n")
+    print(f"{'flow':<6} {'count':>6} {'ok':>6} {'p50, s':>8} {'p99, s':>8} {'ttft p50':>9} {'ttft p99':>9}")
+    for flow, rows in results.items():
+        if not rows:
+            continue
+        latencies = [r[0] for r in rows]
+        ttfts = [r[1] for r in rows if r[1] is not None]
+        ok = sum(1 for r in rows if r[2])
+        print(f"{flow:<6} {len(rows):>6} {ok:>6} {percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.99):>8.3f} "
+              f"{percentile(ttfts, 0.5):>9.3f} {percentile(ttfts, 0.99):>9.3f}")
+
+    cache = generation_cache.stats()
+    print(f"\nCache: hits={cache['hits']} misses={cache['misses']} hit rate={cache['hit_rate']:.1%} "
+          f"saved tokens={cache['saved_tokens']}")
+
+    snapshot = metrics.snapshot()
+    wait = snapshot["summaries"].get("llm_queue.wait_seconds")
+    if wait:
+        print(f"Queue wait: p50={wait['p50']:.3f}s p99={wait['p99']:.3f}s over {wait['count']} jobs")
+    counters = snapshot["counters"]
+    print(f"API requests: {int(counters.get('llm.requests', 0))}, tokens: {int(counters.get('llm.tokens.total', 0))}")
+    prompt_tokens = counters.get("llm.tokens.prompt", 0)
+    cached_tokens = counters.get("llm.tokens.cached", 0)
+    if prompt_tokens:
+        print(f"Prompt tokens: {int(prompt_tokens)}, cached by provider: {int(cached_tokens)} "
+              f"({cached_tokens / prompt_tokens:.1%}), cost ${counters.get('llm.cost_usd', 0):.4f}")
+    for name, summary in sorted(snapshot["summaries"].items()):
+        if name.startswith("llm.latency."):
+            route = name.rsplit(".", 1)[1]
+            print(f"Route {route}: p50={summary['p50']:.3f}s p99={summary['p99']:.3f}s "
+                  f"cost=${counters.get(f'llm.route.{route}.cost_usd', 0):.4f}")
+
+    if stub_runner is not None:
+        print(f"Stub: {stub_runner.app['stats']}")
+
+    # Отдельный замер HTTP-клиента без хэндлеров и кэша
+    if args.client_requests:
+        client_latencies = []
+
+        async def one_call(i: int):
+            t0 = time.perf_counter()
+            await gpt_client.generate_article(f"Клиентский запрос {i}", use_cache=False)
+            client_latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one_call(i) for i in range(args.client_requests)))
+        client_wall = time.perf_counter() - t0
+        print(f"\nClient: {args.client_requests} requests in {client_wall:.2f}s, "
+              f"{args.client_requests / client_wall:.2f} req/s, "
+              f"p50={percentile(client_latencies, 0.5):.3f}s p99={percentile(client_latencies, 0.99):.3f}s")
+
+    await gpt_client.close_session()
+    await engine.dispose()
+    if stub_runner is not None:
+        await stub_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generation throughput benchmark")
+    parser.add_argument("--base-url", help="Адрес API; по умолчанию поднимается встроенная заглушка")
+    parser.add_argument("--users", type=int, default=10, help="Число одновременных пользователей")
+    parser.add_argument("--requests", type=int, default=3, help="Генераций на пользователя (последовательно)")
+    parser.add_argument("--distinct", type=int, default=1000, help="Число различных промптов (меньше - больше попаданий в кэш)")
+    parser.add_argument("--mode", choices=["basic", "pro", "mixed"], default="mixed")
+    parser.add_argument("--client-requests", type=int, default=0, help="Доп. замер: параллельные запросы через gpt_client")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--tokens-per-sec", type=float, default=200)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
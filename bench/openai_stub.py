@@ -0,0 +1,216 @@
+# bench/openai_stub.py
+"""
+Локальная заглушка OpenAI-совместимого API для нагрузочных тестов без расхода токенов.
+
+Поддерживает POST /v1/chat/completions: обычные ответы, параметр n,
+потоковую выдачу (stream=true, stream_options.include_usage), задержки,
+внедрение ошибок (429 с Retry-After и 5xx) и кэширование префикса промпта:
+повторно встреченное системное сообщение отдается в usage как cached_tokens,
+но, как у OpenAI, только если оно не короче PROMPT_CACHE_MIN_TOKENS токенов
+(кэшируется кратно PROMPT_CACHE_INCREMENT токенам).
+
+Запуск отдельным процессом:
+
+    python -m bench.openai_stub --port 8088 --latency 0.8 --error-rate 0.05
+
+и в .env бота: OPENAI_API_BASE=http://127.0.0.1:8088/v1
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from aiohttp import web
+
+# OpenAI кэширует префиксы от 1024 токенов, дальше - блоками по 128 токенов
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT = 128
+
+
+@dataclass
+class StubConfig:
+    """Параметры поведения заглушки"""
+    latency: float = 0.5          # задержка до первого байта ответа, секунды
+    jitter: float = 0.2           # случайная добавка к задержке, секунды
+    tokens_per_sec: float = 200   # скорость «генерации» при стриминге
+    words: int = 120              # длина ответа в словах (ограничивается max_tokens)
+    error_rate: float = 0.0       # доля запросов, завершающихся ошибкой
+    rate_limit_share: float = 0.5 # доля 429 среди ошибок (остальные - 500/503)
+    prompt_cache: bool = True     # имитировать кэширование общего префикса (системного сообщения)
+
+
+def _completion_text(words: int, seed: str) -> str:
+    rnd = random.Random(seed)
+    vocabulary = ["контент", "канал", "пост", "идея", "совет", "новость", "тренд", "читатель", "история", "факт"]
+    return " ".join(rnd.choice(vocabulary) for _ in range(words))
+
+
+def _cacheable_tokens(prefix: str) -> int:
+    """Сколько токенов префикса провайдер может отдать из кэша (токен ~ 4 символа)"""
+    tokens = len(prefix) // 4
+    if tokens < PROMPT_CACHE_MIN_TOKENS:
+        return 0
+    return tokens - (tokens - PROMPT_CACHE_MIN_TOKENS) % PROMPT_CACHE_INCREMENT
+
+
+def _usage(prompt: str, completion_tokens: int, cached_tokens: int = 0) -> dict:
+    prompt_tokens = max(1, len(prompt) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": min(cached_tokens, prompt_tokens)},
+    }
+
+
+def create_app(config: StubConfig) -> web.Application:
+    """Создает aiohttp-приложение заглушки"""
+    stats = {"requests": 0, "errors": 0, "streams": 0, "cached_prefixes": 0}
+    seen_prefixes = set()
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        stats["requests"] += 1
+        data = await request.json()
+        await asyncio.sleep(config.latency + random.uniform(0, config.jitter))
+
+        if random.random() < config.error_rate:
+            stats["errors"] += 1
+            if random.random() < config.rate_limit_share:
+                return web.json_response(
+                    {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit"}},
+                    status=429,
+                    headers={"Retry-After": "1"},
+                )
+            return web.json_response(
+                {"error": {"message": "Internal error (stub)", "type": "server_error"}},
+                status=random.choice([500, 503]),
+            )
+
+        messages = data.get("messages", [])
+        prompt = " ".join(m.get("content", "") for m in messages)
+        prefix = messages[0].get("content", "") if messages and messages[0].get("role") == "system" else ""
+        cached_tokens = 0
+        if config.prompt_cache and prefix:
+            if prefix in seen_prefixes:
+                cached_tokens = _cacheable_tokens(prefix)
+                if cached_tokens:
+                    stats["cached_prefixes"] += 1
+            seen_prefixes.add(prefix)
+        words = min(config.words, int(data.get("max_tokens") or config.words))
+        n = int(data.get("n") or 1)
+        model = data.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not data.get("stream"):
+            choices = [
+                {
+                    "index": i,
+                    "message": {"role": "assistant", "content": _completion_text(words, f"{prompt}:{i}:{random.random()}")},
+                    "finish_reason": "stop",
+                }
+                for i in range(n)
+            ]
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                "usage": _usage(prompt, words * n, cached_tokens),
+            })
+
+        stats["streams"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(payload: dict):
+            await response.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        text = _completion_text(words, f"{prompt}:{random.random()}")
+        delay = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+        for i, word in enumerate(text.split(" ")):
+            await send({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            })
+            if delay:
+                await asyncio.sleep(delay)
+
+        await send({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        })
+        if (data.get("stream_options") or {}).get("include_usage"):
+            await send({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": _usage(prompt, words, cached_tokens),
+            })
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    app["stats"] = stats
+    return app
+
+
+async def start_stub(config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    Запускает заглушку внутри текущего event loop.
+
+    Returns:
+        tuple: (runner, base_url) - runner нужно остановить через runner.cleanup()
+    """
+    runner = web.AppRunner(create_app(config))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", type=float, default=StubConfig.latency)
+    parser.add_argument("--jitter", type=float, default=StubConfig.jitter)
+    parser.add_argument("--tokens-per-sec", type=float, default=StubConfig.tokens_per_sec)
+    parser.add_argument("--words", type=int, default=StubConfig.words)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--no-prompt-cache", action="store_true", help="Не имитировать кэширование префикса")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_sec=args.tokens_per_sec,
+        words=args.words,
+        error_rate=args.error_rate,
+        prompt_cache=not args.no_prompt_cache,
+    )
+    print(f"OpenAI stub listening on http://{args.host}:{args.port}/v1")
+    web.run_app(create_app(config), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# bench/query_counts.py
+"""
+Регрессионная проверка числа SQL-запросов функций database/crud.py.
+
+Каждая функция репозитория вызывается на заполненной временной SQLite-базе
+(много каналов, таблиц и постов - чтобы N+1 и фильтрация в Python были
+заметны), а запросы считаются событием before_cursor_execute движка.
+Число запросов не должно зависеть от объема данных.
+
+    python -m bench.query_counts          # код возврата 1, если счетчик вырос
+    python -m bench.query_counts -v       # вывести SQL каждого вызова
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from database import crud  # noqa: E402
+from database.models import (  # noqa: E402
+    Base, GeneratedPost, GeneratedSeries, GoogleSheet, Group, Post,
+)
+from utils.pagination import NEXT  # noqa: E402
+
+CHAT_ID = -1000000000001
+USER_ID = 100001
+CHATS = 50
+
+
+async def seed(session_factory, now: datetime):
+    """Каналы, таблицы, посты и посты серий для каждого из CHATS каналов"""
+    chats = [CHAT_ID - i for i in range(CHATS)]
+    async with session_factory() as session:
+        session.add_all([Group(chat_id=chat, title=f"Канал {i}", added_by=USER_ID) for i, chat in enumerate(chats)])
+        session.add_all([
+            GoogleSheet(chat_id=chat, spreadsheet_id=f"sheet{i}", created_by=USER_ID, is_active=i % 3 != 0)
+            for i, chat in enumerate(chats * 2)
+        ])
+        session.add_all([
+            Post(
+                chat_id=chat, text=f"Пост {i}", publish_at=now + timedelta(minutes=i - 500), created_by=USER_ID,
+                status="approved" if i % 2 else "sent", published=not i % 2,
+            )
+            for i, chat in enumerate(chats * 20)
+        ])
+        series = [
+            GeneratedSeries(chat_id=chat, prompt="серия", repeat="daily", time=now, post_limit=10)
+            for chat in chats
+        ]
+        session.add_all(series)
+        await session.flush()
+        session.add_all([
+            GeneratedPost(
+                series_id=s.id, chat_id=s.chat_id, text="пост серии", publish_at=now + timedelta(hours=i),
+                status="pending" if i % 2 else "approved",
+            )
+            for s in series for i in range(1, 6)
+        ])
+        await session.commit()
+
+
+def checks(now: datetime) -> list:
+    """(название, вызов(session), ожидаемое число запросов)"""
+    return [
+        ("get_user_channels", lambda s: crud.get_user_channels(s, USER_ID), 1),
+        ("get_user_channel", lambda s: crud.get_user_channel(s, USER_ID, CHAT_ID), 1),
+        ("get_due_posts", lambda s: crud.get_due_posts(s, now), 1),
+        ("get_history_page", lambda s: crud.get_history_page(s, CHAT_ID, now - timedelta(days=30), 10), 2),
+        ("get_history_page (cursor)", lambda s: history_second_page(s, now), 4),
+        ("get_schedule_page", lambda s: crud.get_schedule_page(s, CHAT_ID, now - timedelta(days=30), 10), 2),
+        ("get_pending_series_posts", lambda s: crud.get_pending_series_posts(s, CHAT_ID, now), 1),
+        ("get_active_sheets", lambda s: crud.get_active_sheets(s), 1),
+        ("get_active_sheets (chat)", lambda s: crud.get_active_sheets(s, CHAT_ID), 1),
+        ("get_sheet_stats_by_chat", lambda s: crud.get_sheet_stats_by_chat(s), 1),
+    ]
+
+
+async def history_second_page(session, now: datetime):
+    """Первая страница и переход по курсору: по 2 запроса на страницу"""
+    first = await crud.get_history_page(session, CHAT_ID, now - timedelta(days=30), 10)
+    return await crud.get_history_page(session, CHAT_ID, now - timedelta(days=30), 10, first.last_cursor, NEXT)
+
+
+async def main(args) -> int:
+    url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='publicus-queries-')}/queries.db"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    now = datetime.now().replace(microsecond=0)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(session_factory, now)
+
+    statements: List[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    failures = 0
+    for name, call, expected in checks(now):
+        statements.clear()
+        async with session_factory() as session:
+            await call(session)
+        ok = len(statements) == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<28} {len(statements)} queries (expected {expected})")
+        if args.verbose or not ok:
+            for statement in statements:
+                print("       " + " ".join(statement.split())[:200])
+
+    await engine.dispose()
+    print(f"\n{len(checks(now)) - failures} of {len(checks(now))} repository functions within their query budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL query count check for database/crud.py")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Печатать SQL каждого вызова")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,214 @@
+# bench/query_plans.py
+"""
+Проверка планов горячих запросов хэндлеров и планировщика.
+
+Создает схему из моделей во временном SQLite-файле, заполняет ее данными,
+выполняет ANALYZE и для каждого запроса проверяет через EXPLAIN QUERY PLAN,
+что SQLite использует ожидаемый индекс, а не полный просмотр таблицы.
+
+    python -m bench.query_plans          # код возврата 1, если план не совпал
+    python -m bench.query_plans -v       # вывести планы целиком
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import and_, or_, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from database.crud import history_query  # noqa: E402
+from database.models import (  # noqa: E402
+    Base, GeneratedPost, GeneratedSeries, GoogleSheet, Group, Post,
+)
+
+CHAT_ID = -1000000000001
+USER_ID = 100001
+
+
+def history_with_archive(now: datetime):
+    """Страница истории из posts и posts_archive, как ее строит keyset_page"""
+    query, post = history_query(CHAT_ID, now - timedelta(days=30))
+    return query.order_by(post.publish_at.desc(), post.id.desc()).limit(11)
+
+
+def hot_queries(now: datetime) -> list:
+    """(название, запрос, допустимые индексы) - запросы в том виде, в каком их строят хэндлеры"""
+    return [
+        (
+            "history: published posts (handlers/history.py)",
+            select(Post)
+            .filter(Post.chat_id == CHAT_ID, Post.published == True, Post.publish_at >= now - timedelta(days=30))  # noqa: E712
+            .order_by(Post.publish_at.desc()),
+            ["ix_posts_chat_id_published_publish_at"],
+        ),
+        (
+            "history: sent posts (handlers/history.py)",
+            select(Post)
+            .where(and_(Post.chat_id == CHAT_ID, Post.status == "sent"))
+            .order_by(Post.publish_at.desc())
+            .limit(30),
+            ["ix_posts_chat_id_status_published_publish_at"],
+        ),
+        (
+            "queue (handlers/queue.py)",
+            select(Post)
+            .where(and_(Post.chat_id == CHAT_ID, Post.status == "approved", Post.published.is_(False)))
+            .order_by(Post.publish_at),
+            ["ix_posts_chat_id_status_published_publish_at"],
+        ),
+        (
+            "history page after cursor (utils/pagination.keyset_page)",
+            select(Post)
+            .filter(
+                Post.chat_id == CHAT_ID, Post.published == True, Post.publish_at >= now - timedelta(days=30),  # noqa: E712
+                or_(Post.publish_at < now, and_(Post.publish_at == now, Post.id < 1000)),
+            )
+            .order_by(Post.publish_at.desc(), Post.id.desc())
+            .limit(11),
+            ["ix_posts_chat_id_published_publish_at"],
+        ),
+        (
+            "history with archive (database/crud.history_query)",
+            history_with_archive(now),
+            ["ix_posts_archive_chat_id_publish_at"],
+        ),
+        (
+            "queue page after cursor (utils/pagination.keyset_page)",
+            select(Post)
+            .filter(
+                Post.chat_id == CHAT_ID, Post.status == "approved", Post.published == False,  # noqa: E712
+                Post.publish_at > now,
+                or_(Post.publish_at > now, and_(Post.publish_at == now, Post.id > 1000)),
+            )
+            .order_by(Post.publish_at, Post.id)
+            .limit(11),
+            ["ix_posts_chat_id_status_published_publish_at"],
+        ),
+        (
+            "active sheets (scheduler.check_google_sheets)",
+            select(GoogleSheet).filter(GoogleSheet.is_active.is_(True)),
+            ["ix_google_sheets_is_active"],
+        ),
+        (
+            "channel sheets (handlers/google_sheets.py)",
+            select(GoogleSheet).filter(GoogleSheet.chat_id == CHAT_ID, GoogleSheet.is_active == True),  # noqa: E712
+            ["ix_google_sheets_chat_id", "ix_google_sheets_is_active"],
+        ),
+        (
+            "user channels (handlers/start.py, utils/keyboards.py)",
+            select(Group).filter(Group.added_by == USER_ID),
+            ["ix_groups_added_by"],
+        ),
+        (
+            "pending series posts (handlers/pending.py)",
+            select(GeneratedPost)
+            .join(GeneratedSeries)
+            .where(
+                GeneratedSeries.chat_id == CHAT_ID,
+                GeneratedPost.publish_at > now,
+                GeneratedPost.status.in_(["pending", "approved"]),
+            )
+            .order_by(GeneratedPost.publish_at),
+            ["ix_generated_posts_status_publish_at"],
+        ),
+        (
+            "due series posts (utils/series_executor.publish_generated_posts)",
+            select(GeneratedPost)
+            .where(
+                GeneratedPost.status == "approved",
+                GeneratedPost.published.is_(False),
+                GeneratedPost.publish_at <= now,
+            )
+            .order_by(GeneratedPost.publish_at),
+            ["ix_generated_posts_status_publish_at"],
+        ),
+    ]
+
+
+async def seed(conn, now: datetime, rows: int):
+    """Данные с реалистичной селективностью: много каналов, мало активных таблиц"""
+    chats = [CHAT_ID - i for i in range(200)]
+    await conn.execute(Group.__table__.insert(), [
+        {"chat_id": chat, "title": f"Канал {i}", "added_by": USER_ID + i % 150, "date_added": now}
+        for i, chat in enumerate(chats)
+    ])
+    await conn.execute(Post.__table__.insert(), [
+        {
+            "chat_id": random.choice(chats),
+            "text": "пост",
+            "publish_at": now + timedelta(minutes=random.randint(-50000, 50000)),
+            "created_by": USER_ID,
+            "status": random.choice(["sent", "sent", "sent", "approved", "draft"]),
+            "published": random.random() < 0.6,
+            "created_at": now,
+            "is_generated": False,
+        }
+        for _ in range(rows)
+    ])
+    await conn.execute(GoogleSheet.__table__.insert(), [
+        {
+            "chat_id": random.choice(chats), "spreadsheet_id": "sheet", "sheet_name": "Контент-план",
+            "is_active": i % 20 == 0, "created_by": USER_ID, "created_at": now, "sync_interval": 15,
+        }
+        for i in range(rows // 10)
+    ])
+    await conn.execute(GeneratedSeries.__table__.insert(), [
+        {"chat_id": chat, "prompt": "серия", "repeat": "daily", "time": now, "post_limit": 10,
+         "posts_generated": 0, "moderation": True, "is_active": True}
+        for chat in chats
+    ])
+    await conn.execute(GeneratedPost.__table__.insert(), [
+        {
+            "series_id": random.randint(1, len(chats)),
+            "chat_id": random.choice(chats),
+            "text": "пост серии",
+            "publish_at": now + timedelta(minutes=random.randint(-50000, 50000)),
+            "status": random.choice(["sent", "sent", "sent", "sent", "pending", "approved"]),
+            "published": False,
+            "created_at": now,
+        }
+        for _ in range(rows)
+    ])
+    await conn.execute(text("ANALYZE"))
+
+
+async def main(args) -> int:
+    url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='publicus-plans-')}/plans.db"
+    engine = create_async_engine(url)
+    now = datetime.now().replace(microsecond=0)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await seed(conn, now, args.rows)
+
+    failures = 0
+    async with engine.connect() as conn:
+        for name, query, expected in hot_queries(now):
+            sql = str(query.compile(engine.sync_engine, compile_kwargs={"literal_binds": True}))
+            rows = (await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+            plan: List[str] = [row[-1] for row in rows]
+            used = next((index for index in expected if any(index in line for line in plan)), None)
+            ok = used is not None
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {used or 'expected ' + ' / '.join(expected)}")
+            if args.verbose or not ok:
+                for line in plan:
+                    print(f"       {line}")
+
+    await engine.dispose()
+    print(f"\n{len(hot_queries(now)) - failures} of {len(hot_queries(now))} queries use the expected index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN check for hot queries")
+    parser.add_argument("--rows", type=int, default=20000, help="Постов в тестовых данных")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Печатать планы всех запросов")
+    sys.exit(asyncio.run(main(parser.parse_args())))
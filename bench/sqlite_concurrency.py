@@ -0,0 +1,193 @@
+# bench/sqlite_concurrency.py
+"""
+Бенчмарк конкурентного доступа к SQLite: чтения хэндлеров во время записей
+другого процесса.
+
+Блокировки SQLite - файловые, поэтому писатель запускается отдельным процессом,
+как import_posts.py или вторая копия бота рядом с работающим ботом. Он чередует:
+
+* импорт - --import-rows постов одной транзакцией (как /import и import_posts.py);
+* планировщик - отметку наступивших постов отправленными и добавление новых.
+
+Тем временем --readers задач основного процесса выполняют запросы хэндлеров
+(страница постов канала и счетчик запланированных).
+
+Профили (временный файл БД на каждый):
+
+* default - движок с настройками по умолчанию (rollback journal, без mmap);
+* tuned   - движок из database.db.make_engine с профилем SQLITE_* (WAL, mmap).
+
+Пример:
+
+    python -m bench.sqlite_concurrency --readers 10 --duration 10 --import-rows 20000
+
+Для каждого профиля выводятся p50/p99/максимум задержки чтений и записей, число
+операций в секунду и количество ошибок "database is locked". Отдельные PRAGMA
+можно сравнить, запуская tuned с переменными SQLITE_* (например, SQLITE_WAL=false).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import func, insert, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from bench.generation_bench import percentile  # noqa: E402
+from database.db import make_engine  # noqa: E402
+from database.models import Base, Post  # noqa: E402
+
+CHATS = [-1000000000000 - i for i in range(20)]
+
+
+def make_session_factory(profile: str, url: str):
+    engine = make_engine(url) if profile == "tuned" else create_async_engine(url)
+    return engine, async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def post_row(now: datetime, text: str) -> dict:
+    return {
+        "chat_id": random.choice(CHATS),
+        "text": text + " текст" * 50,
+        "publish_at": now + timedelta(minutes=random.randint(-600, 600)),
+        "created_by": 1,
+        "status": "scheduled",
+        "published": False,
+    }
+
+
+async def seed(session_factory, rows: int):
+    """Заполняет таблицу posts отправленными и запланированными постами"""
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        data = [post_row(now, f"Пост {i}") for i in range(rows)]
+        for row in data[::2]:
+            row.update(status="sent", published=True)
+        await session.execute(insert(Post), data)
+        await session.commit()
+
+
+async def write_loop(profile: str, url: str, deadline: float, args) -> Dict[str, object]:
+    """Писатель: импорт большого файла и задачи планировщика по очереди до deadline"""
+    engine, session_factory = make_session_factory(profile, url)
+    latencies: Dict[str, List[float]] = {"import": [], "schedule": []}
+    errors = {"import": 0, "schedule": 0}
+
+    async def import_batch():
+        # Как utils/post_import: пакеты executemany, весь файл - одна транзакция
+        rows = [post_row(datetime.utcnow(), "Импорт") for _ in range(args.import_rows)]
+        async with session_factory() as session:
+            for start in range(0, len(rows), 1000):
+                await session.execute(insert(Post), rows[start:start + 1000])
+            await session.commit()
+
+    async def schedule():
+        # Как check_scheduled_posts: наступившие посты отмечаются отправленными
+        async with session_factory() as session:
+            now = datetime.utcnow() + timedelta(minutes=random.randint(0, 600))
+            ids = (await session.scalars(
+                select(Post.id).where(Post.status == "scheduled", Post.publish_at <= now).limit(args.batch)
+            )).all()
+            if ids:
+                await session.execute(update(Post).where(Post.id.in_(ids)).values(status="sent", published=True))
+            await session.commit()
+
+    while time.time() < deadline:
+        for op, job in (("import", import_batch), ("schedule", schedule)):
+            started = time.perf_counter()
+            try:
+                await job()
+                latencies[op].append(time.perf_counter() - started)
+            except OperationalError:
+                errors[op] += 1
+            await asyncio.sleep(args.think_time)
+    await engine.dispose()
+    return {"latencies": latencies, "errors": errors}
+
+
+def writer_process(profile: str, url: str, deadline: float, args, results):
+    results.put(asyncio.run(write_loop(profile, url, deadline, args)))
+
+
+async def run_profile(name: str, args) -> Dict[str, object]:
+    tmp_dir = tempfile.mkdtemp(prefix="publicus-sqlite-")
+    url = f"sqlite+aiosqlite:///{tmp_dir}/bench.db"
+    engine, session_factory = make_session_factory(name, url)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(session_factory, args.rows)
+
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.time() + args.duration
+    results = multiprocessing.get_context("spawn").Queue()
+    writer = multiprocessing.get_context("spawn").Process(
+        target=writer_process, args=(name, url, deadline, args, results)
+    )
+    writer.start()
+
+    async def reader():
+        nonlocal errors
+        # Как хэндлеры: список постов канала и счетчик запланированных
+        while time.time() < deadline:
+            chat_id = random.choice(CHATS)
+            started = time.perf_counter()
+            try:
+                async with session_factory() as session:
+                    await session.execute(
+                        select(Post).where(Post.chat_id == chat_id).order_by(Post.publish_at.desc()).limit(10)
+                    )
+                    await session.execute(
+                        select(func.count(Post.id)).where(Post.chat_id == chat_id, Post.status == "scheduled")
+                    )
+                latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                errors += 1
+            await asyncio.sleep(args.think_time)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(reader() for _ in range(args.readers)))
+    wall = time.perf_counter() - started
+    written = await asyncio.to_thread(results.get)
+    await asyncio.to_thread(writer.join)
+    await engine.dispose()
+    return {
+        "latencies": {"read": latencies, **written["latencies"]},
+        "errors": {"read": errors, **written["errors"]},
+        "wall": wall,
+    }
+
+
+async def main(args):
+    profiles = ["default", "tuned"] if args.profile == "both" else [args.profile]
+    print(f"readers={args.readers}, duration={args.duration}s, rows={args.rows}, import rows={args.import_rows}\n")
+    print(f"{'profile':<8} {'op':<9} {'count':>7} {'ops/s':>8} {'p50, ms':>9} {'p99, ms':>9} {'max, ms':>9} {'locked':>7}")
+    for name in profiles:
+        result = await run_profile(name, args)
+        for op in ("read", "import", "schedule"):
+            values = result["latencies"][op]
+            print(f"{name:<8} {op:<9} {len(values):>7} {len(values) / result['wall']:>8.1f} "
+                  f"{percentile(values, 0.5) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f} "
+                  f"{max(values, default=0) * 1000:>9.2f} {result['errors'][op]:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite concurrency benchmark")
+    parser.add_argument("--profile", choices=["default", "tuned", "both"], default="both")
+    parser.add_argument("--readers", type=int, default=10, help="Параллельных читателей (хэндлеры)")
+    parser.add_argument("--duration", type=float, default=10, help="Длительность прогона профиля, секунды")
+    parser.add_argument("--rows", type=int, default=20000, help="Постов в таблице перед стартом")
+    parser.add_argument("--import-rows", type=int, default=20000, help="Постов в одной транзакции импорта")
+    parser.add_argument("--batch", type=int, default=20, help="Постов, отмечаемых отправленными за одну запись")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Пауза между операциями, секунды")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+# bench/update_load.py
+"""
+Нагрузочная проверка параллельной обработки апдейтов.
+
+Синтетические апдейты --users пользователей по --updates от каждого
+проходят через диспетчер aiogram. Хэндлер имитирует тяжелую работу
+(генерацию, Google Таблицы) ожиданием --delay секунд и переводит FSM
+диалога: читает счетчик из данных состояния и записывает его + 1.
+
+Режимы:
+    sequential  - апдейты по одному (как polling с handle_as_tasks=False)
+    unlocked    - параллельно без изоляции диалогов (порядок не гарантирован)
+    concurrent  - параллельно с ChatLockIsolation и ConcurrencyLimitMiddleware, как в bot.py
+
+Для каждого режима печатается пропускная способность и проверяется, что
+апдейты каждого пользователя обработаны по порядку и ни один переход FSM
+не потерян. Код возврата 1, если режим concurrent нарушил порядок.
+
+    python -m bench.update_load --users 50 --updates 10 --delay 0.05 --limit 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from aiogram.types import Message, Update  # noqa: E402
+
+from middlewares import ChatLockIsolation, ConcurrencyLimitMiddleware  # noqa: E402
+
+
+def make_updates(bot: Bot, users: int, per_user: int) -> List[Update]:
+    """Апдейты пользователей вперемешку, как они приходят от Telegram"""
+    updates = []
+    for step in range(per_user):
+        for user in range(users):
+            update_id = len(updates) + 1
+            updates.append(Update.model_validate({
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": 0,
+                    "chat": {"id": 1000 + user, "type": "private"},
+                    "from": {"id": 1000 + user, "is_bot": False, "first_name": f"user{user}"},
+                    "text": str(step),
+                },
+            }, context={"bot": bot}))
+    return updates
+
+
+def make_dispatcher(mode: str, delay: float, limit: int, seen: Dict[int, List[int]]) -> Dispatcher:
+    isolated = mode == "concurrent"
+    dp = Dispatcher(storage=MemoryStorage(), events_isolation=ChatLockIsolation() if isolated else None)
+    if isolated:
+        dp.update.outer_middleware(ConcurrencyLimitMiddleware(limit))
+
+    @dp.message()
+    async def step(message: Message, state: FSMContext):
+        counter = (await state.get_data()).get("counter", 0)
+        await asyncio.sleep(delay)
+        seen[message.from_user.id].append(int(message.text))
+        await state.update_data(counter=counter + 1)
+
+    return dp
+
+
+async def run(mode: str, args) -> bool:
+    bot = Bot("1:bench")
+    seen: Dict[int, List[int]] = defaultdict(list)
+    dp = make_dispatcher(mode, args.delay, args.limit, seen)
+    updates = make_updates(bot, args.users, args.updates)
+
+    started = time.perf_counter()
+    if mode == "sequential":
+        for update in updates:
+            await dp.feed_update(bot, update)
+    else:
+        # Как start_polling(handle_as_tasks=True): задача на апдейт в порядке получения
+        await asyncio.gather(*(asyncio.create_task(dp.feed_update(bot, update)) for update in updates))
+    elapsed = time.perf_counter() - started
+
+    expected = list(range(args.updates))
+    ordered = all(steps == expected for steps in seen.values()) and len(seen) == args.users
+    lost = 0
+    for user in range(args.users):
+        data = await dp.storage.get_data(dp.fsm.get_context(bot, 1000 + user, 1000 + user).key)
+        lost += args.updates - data.get("counter", 0)
+    await bot.session.close()
+
+    print(
+        f"{mode:<11} {len(updates):>6} updates  {elapsed:7.2f}s  {len(updates) / elapsed:8.1f} upd/s  "
+        f"{'in order' if ordered else 'OUT OF ORDER'}, lost FSM transitions: {lost}"
+    )
+    return ordered and not lost
+
+
+async def main(args) -> int:
+    results = {}
+    for mode in args.modes:
+        results[mode] = await run(mode, args)
+    return 0 if results.get("concurrent", True) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of concurrent update processing with per-chat ordering")
+    parser.add_argument("--users", type=int, default=50, help="Пользователей")
+    parser.add_argument("--updates", type=int, default=10, help="Апдейтов от каждого пользователя")
+    parser.add_argument("--delay", type=float, default=0.05, help="Время работы хэндлера, секунды")
+    parser.add_argument("--limit", type=int, default=16, help="UPDATE_CONCURRENCY для режима concurrent")
+    parser.add_argument("--modes", nargs="+", default=["sequential", "unlocked", "concurrent"],
+                        choices=["sequential", "unlocked", "concurrent"])
+    sys.exit(asyncio.run(main(parser.parse_args())))
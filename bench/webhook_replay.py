@@ -0,0 +1,84 @@
+# bench/webhook_replay.py
+"""
+Отправка записанных апдейтов на webhook-сервер бота (BOT_MODE=webhook).
+
+Файл - JSON-список апдейтов или JSON Lines (по апдейту в строке), например
+сохраненные из getUpdates. Апдейты отправляются параллельно (--concurrency),
+при --repeat N каждый апдейт повторяется N раз с новым update_id.
+
+    python -m bench.webhook_replay updates.jsonl --secret $WEBHOOK_SECRET
+    python -m bench.webhook_replay updates.jsonl --url http://localhost:8080/webhook -c 50 --repeat 20
+
+Печатает число ответов по статусам (503 - очередь бота заполнена) и перцентили
+времени ответа сервера.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import List
+
+import aiohttp
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def load_updates(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def main(args) -> int:
+    updates = load_updates(args.file)
+    payloads = []
+    for round_ in range(args.repeat):
+        for update in updates:
+            payloads.append({**update, "update_id": update.get("update_id", 0) + round_ * 1_000_000})
+
+    headers = {SECRET_HEADER: args.secret} if args.secret else {}
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def send(payload: dict):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.post(args.url, json=payload) as response:
+                        statuses[response.status] += 1
+                except aiohttp.ClientError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(payload) for payload in payloads))
+        elapsed = time.perf_counter() - started
+
+    print(f"Sent {len(payloads)} updates in {elapsed:.2f}s ({len(payloads) / elapsed:.0f}/s)")
+    print("Statuses: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    print(f"Response time: p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Telegram updates to the bot webhook")
+    parser.add_argument("file", help="JSON-список или JSON Lines с апдейтами")
+    parser.add_argument("--url", default="http://localhost:8080/webhook", help="Адрес webhook")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET", ""), help="Секрет webhook")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="Одновременных запросов")
+    parser.add_argument("--repeat", type=int, default=1, help="Сколько раз повторить файл")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -5,12 +5,15 @@ from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from config import BOT_TOKEN
+from config import BOT_MODE, BOT_TOKEN, FSM_STORAGE, UPDATE_CONCURRENCY
 from scheduler import setup_scheduler
+from webhook import run_webhook
+from gpt_client import close_session as close_gpt_session
+from utils.media_cache import media_cache
 
-from sqlalchemy import text, select
 from database.db import AsyncSessionLocal
-from database.models import GoogleSheet
+from database.fsm_storage import fsm_storage
+from middlewares import ChatLockIsolation, ConcurrencyLimitMiddleware, DbSessionMiddleware, SqlStatsMiddleware
 
 # роутеры
 from handlers import (
@@ -26,66 +29,61 @@ from handlers import (
     users,
     channels,
     google_sheets,
+    post_import,
 )
+from utils.handlers import auto_generation as series_wizard
 
 logging.basicConfig(level=logging.INFO)
 
 bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
-dp = Dispatcher(storage=MemoryStorage())
+# Состояния диалогов - в памяти; FSM_STORAGE=sql - в БД, чтобы переживать перезапуск
+# Апдейты одного диалога - строго по очереди (состояние читается под блокировкой диалога)
+dp = Dispatcher(
+    storage=fsm_storage if FSM_STORAGE == "sql" else MemoryStorage(),
+    events_isolation=ChatLockIsolation(),
+)
 scheduler = AsyncIOScheduler()
 
 
-# Добавьте перед async def main():
-async def fix_sheets_on_startup():
-    """Исправляет проблемы с таблицей google_sheets при запуске бота"""
-    logging.info("Проверка и исправление таблицы google_sheets...")
-    try:
-        async with AsyncSessionLocal() as session:
-            # Проверяем наличие активных таблиц с неправильным значением is_active
-            problem_sheets_q = select(GoogleSheet).filter(
-                GoogleSheet.is_active.is_not(None),  # не NULL
-                GoogleSheet.is_active != 0,         # не 0
-                GoogleSheet.is_active != 1          # не 1
-            )
-            problem_sheets = (await session.execute(problem_sheets_q)).scalars().all()
-            
-            if problem_sheets:
-                logging.warning(f"Найдено {len(problem_sheets)} записей с неправильным значением is_active")
-                for sheet in problem_sheets:
-                    logging.info(f"Исправление записи {sheet.id}: is_active={sheet.is_active} (тип: {type(sheet.is_active)})")
-                    # Исправляем значение
-                    sheet.is_active = 0
-                
-                await session.commit()
-                logging.info("Все проблемные записи исправлены")
-                
-    except Exception as e:
-        logging.error(f"Ошибка при исправлении таблицы: {e}")
-        import traceback
-        logging.error(traceback.format_exc())
-
-
 async def main():
+    # не больше UPDATE_CONCURRENCY апдейтов в хэндлерах одновременно
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(UPDATE_CONCURRENCY))
+    # учет SQL-запросов апдейта (раньше сессии, чтобы учитывать и ее запросы)
+    dp.update.outer_middleware(SqlStatsMiddleware())
+    # одна сессия БД на апдейт: хэндлеры получают session, db_user и current_group
+    dp.update.outer_middleware(DbSessionMiddleware(AsyncSessionLocal))
+
     # регистрируем роутеры
     dp.include_router(start.router)
     dp.include_router(users.router)
     dp.include_router(channels.router)
     dp.include_router(manual_post.router)
+    dp.include_router(post_import.router)
     dp.include_router(google_sheets.router)
     dp.include_router(group_select.router)
     dp.include_router(group_settings.router)
     dp.include_router(queue.router)
     dp.include_router(history.router)
     dp.include_router(auto_generation.router)
+    dp.include_router(series_wizard.router)
     dp.include_router(moderation.router)
     dp.include_router(pending.router)
 
+    # закрываем пул соединений к OpenAI при остановке
+    dp.shutdown.register(close_gpt_session)
+    # закрываем HTTP-сессию загрузки медиа и дописываем индекс кэша
+    dp.shutdown.register(media_cache.close)
+    # хранилище FSM (и несохраненные состояния) закрывает сам Dispatcher: fsm.close
+
     # планировщик
     setup_scheduler(scheduler, bot)
     scheduler.start()
 
-    await dp.start_polling(bot)
-    await fix_sheets_on_startup()
+    if BOT_MODE == "webhook":
+        await run_webhook(dp, bot)
+    else:
+        # каждый апдейт - отдельная задача: медленные хэндлеры не задерживают других пользователей
+        await dp.start_polling(bot, handle_as_tasks=True)
 
 
 
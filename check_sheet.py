@@ -1,66 +1,58 @@
 #!/usr/bin/env python3
-import sqlite3
-import os
+# check_sheet.py
+import asyncio
 
-# Путь к файлу базы данных
-DB_FILE = "bot.db"
+from sqlalchemy import func, select
 
-def check_sheets_status():
-    """Проверяет состояние подключений таблиц"""
-    if not os.path.exists(DB_FILE):
-        print(f"[ОШИБКА] Файл базы данных {DB_FILE} не найден!")
-        return False
-    
+from database.db import AsyncSessionLocal, engine
+from database.models import Group, GoogleSheet
+
+
+async def check_sheets_status():
+    """Проверяет состояние подключений таблиц (SQLite или PostgreSQL из DATABASE_URL)"""
     try:
-        # Подключаемся к базе
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        
-        # Получаем количество записей
-        cursor.execute("SELECT COUNT(*) FROM google_sheets")
-        total_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM google_sheets WHERE is_active = 1")
-        active_count = cursor.fetchone()[0]
-        
-        print(f"[i] Всего записей в таблице google_sheets: {total_count}")
-        print(f"[i] Активных записей: {active_count}")
-        
-        # Получаем каналы с активными таблицами
-        cursor.execute("""
-            SELECT g.chat_id, g.title, COUNT(gs.id) 
-            FROM groups g 
-            JOIN google_sheets gs ON g.chat_id = gs.chat_id AND gs.is_active = 1
-            GROUP BY g.chat_id
-        """)
-        active_channels = cursor.fetchall()
-        
-        if active_channels:
-            print(f"\n[i] Найдены каналы с активными таблицами ({len(active_channels)}):")
-            for chat_id, title, count in active_channels:
-                print(f"    - {title} (ID: {chat_id}): {count} активных таблиц")
-                
-                # Выводим подробности по таблицам этого канала
-                cursor.execute("""
-                    SELECT id, spreadsheet_id, sheet_name
-                    FROM google_sheets 
-                    WHERE chat_id = ? AND is_active = 1
-                """, (chat_id,))
-                sheets = cursor.fetchall()
-                
-                for sheet_id, spreadsheet_id, sheet_name in sheets:
-                    print(f"      * ID: {sheet_id}, Sheet ID: {spreadsheet_id}, Name: {sheet_name}")
-        else:
-            print("[i] Не найдены каналы с активными таблицами")
-            
-        # Закрываем соединение
-        conn.close()
+        async with AsyncSessionLocal() as session:
+            # Получаем количество записей
+            total_count = await session.scalar(select(func.count(GoogleSheet.id)))
+            active_count = await session.scalar(
+                select(func.count(GoogleSheet.id)).where(GoogleSheet.is_active.is_(True))
+            )
+
+            print(f"[i] Всего записей в таблице google_sheets: {total_count}")
+            print(f"[i] Активных записей: {active_count}")
+
+            # Получаем каналы с активными таблицами
+            result = await session.execute(
+                select(Group.chat_id, Group.title, func.count(GoogleSheet.id))
+                .join(GoogleSheet, (Group.chat_id == GoogleSheet.chat_id) & GoogleSheet.is_active.is_(True))
+                .group_by(Group.chat_id, Group.title)
+            )
+            active_channels = result.all()
+
+            if active_channels:
+                print(f"\n[i] Найдены каналы с активными таблицами ({len(active_channels)}):")
+                for chat_id, title, count in active_channels:
+                    print(f"    - {title} (ID: {chat_id}): {count} активных таблиц")
+
+                    # Выводим подробности по таблицам этого канала
+                    sheets = await session.execute(
+                        select(GoogleSheet.id, GoogleSheet.spreadsheet_id, GoogleSheet.sheet_name)
+                        .where(GoogleSheet.chat_id == chat_id, GoogleSheet.is_active.is_(True))
+                    )
+                    for sheet_id, spreadsheet_id, sheet_name in sheets:
+                        print(f"      * ID: {sheet_id}, Sheet ID: {spreadsheet_id}, Name: {sheet_name}")
+            else:
+                print("[i] Не найдены каналы с активными таблицами")
+
         return True
-        
+
     except Exception as e:
         print(f"[ОШИБКА] {str(e)}")
         return False
+    finally:
+        await engine.dispose()
+
 
 if __name__ == "__main__":
     print("=== ПРОВЕРКА СОСТОЯНИЯ ПОДКЛЮЧЕНИЙ ТАБЛИЦ ===")
-    check_sheets_status()
+    asyncio.run(check_sheets_status())
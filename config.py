@@ -1,6 +1,7 @@
 # config.py
 from pathlib import Path
 from dotenv import load_dotenv
+import json
 import os
 
 # ──────────────────────────────────────────────────────────────
@@ -18,9 +19,133 @@ BOT_TOKEN       = os.getenv("BOT_TOKEN")        # без дефолта - пус
 OPENAI_API_KEY  = os.getenv("OPENAI_API_KEY")   # то же
 DATABASE_URL    = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///bot.db")
 
+# Пул соединений PostgreSQL (asyncpg): размер, переполнение, ожидание соединения и пересоздание (секунды),
+# кэш подготовленных выражений на соединение (0 - выключить, нужно за pgbouncer в режиме transaction)
+DB_POOL_SIZE            = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW         = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT         = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE         = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING        = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Профиль SQLite (применяется к каждому соединению aiosqlite): журнал WAL, размер mmap (байты)
+SQLITE_WAL       = os.getenv("SQLITE_WAL", "true").lower() in ("1", "true", "yes")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
 # Новые настройки для Google Sheets
 GOOGLE_CREDS_FILE = os.getenv("GOOGLE_CREDS_FILE", "google_credentials.json")
 GOOGLE_SERVICE_ACCOUNT_EMAIL = os.getenv("GOOGLE_SERVICE_ACCOUNT_EMAIL", "service-account@your-project.iam.gserviceaccount.com")
 
 # Настройки для управления пользователями
 DEFAULT_ADMIN_ID = os.getenv("DEFAULT_ADMIN_ID")  # ID администратора по умолчанию
+
+# Локальный кэш медиафайлов (картинки из Google Таблиц и т.п.)
+MEDIA_CACHE_DIR       = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Параметры HTTP-клиента OpenAI
+OPENAI_API_BASE        = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))   # секунды
+OPENAI_READ_TIMEOUT    = float(os.getenv("OPENAI_READ_TIMEOUT", "90"))      # секунды
+OPENAI_MAX_RETRIES     = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+OPENAI_POOL_SIZE       = int(os.getenv("OPENAI_POOL_SIZE", "20"))           # макс. соединений в пуле
+
+# Потоковая генерация: минимальный интервал между правками сообщения с превью (секунды)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+
+# Истории и контент-план: постов на одной странице списка
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "10"))
+
+# Кэш результатов генерации: размер (записей), время жизни (секунды), хранение в БД
+GENERATION_CACHE_SIZE    = int(os.getenv("GENERATION_CACHE_SIZE", "500"))
+GENERATION_CACHE_TTL     = int(os.getenv("GENERATION_CACHE_TTL", str(24 * 3600)))
+GENERATION_CACHE_PERSIST = os.getenv("GENERATION_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
+
+# Кэш выборок User/Group по Telegram ID и chat_id: размер (записей, 0 - выключен), время жизни (секунды).
+# Пользователи несут роль и блокировку, а сброс кэша локален для процесса - другие реплики
+# видят makeadmin/block не позже ENTITY_CACHE_USER_TTL (проверки прав читают роль из БД всегда)
+ENTITY_CACHE_SIZE     = int(os.getenv("ENTITY_CACHE_SIZE", "5000"))
+ENTITY_CACHE_TTL      = int(os.getenv("ENTITY_CACHE_TTL", "300"))
+ENTITY_CACHE_USER_TTL = int(os.getenv("ENTITY_CACHE_USER_TTL", "15"))
+
+# Архив опубликованных постов: возраст переноса в posts_archive (дни, 0 - не архивировать),
+# постов в одной транзакции, период задачи (минуты)
+ARCHIVE_AFTER_DAYS        = int(os.getenv("ARCHIVE_AFTER_DAYS", "14"))
+ARCHIVE_BATCH_SIZE        = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_MINUTES  = int(os.getenv("ARCHIVE_INTERVAL_MINUTES", "60"))
+
+# Режим получения апдейтов: "polling" или "webhook" (webhook.py). WEBHOOK_URL - публичный адрес
+# для регистрации в Telegram (пусто - не регистрировать), WEBHOOK_SECRET - значение заголовка
+# X-Telegram-Bot-Api-Secret-Token; очередь апдейтов и число одновременно обрабатываемых апдейтов
+BOT_MODE                  = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL               = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH              = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET            = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST              = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT              = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_QUEUE_SIZE        = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+# Обработчик webhook, ждущий блокировку диалога, занят - их должно быть больше UPDATE_CONCURRENCY
+WEBHOOK_WORKERS           = int(os.getenv("WEBHOOK_WORKERS", "64"))
+
+# Апдейтов в хэндлерах одновременно (апдейты одного диалога всегда обрабатываются по очереди)
+UPDATE_CONCURRENCY        = int(os.getenv("UPDATE_CONCURRENCY", "16"))
+
+# Хранилище FSM: "memory" - в памяти процесса (по умолчанию), "sql" - в БД (переживает перезапуск);
+# диалогов в памяти, время жизни брошенного состояния (секунды), период записи в БД (секунды).
+# FSM_SHARED=true обязателен, если бот запущен в нескольких процессах с одной БД:
+# состояния читаются из БД и записываются сразу, без кэша в памяти
+FSM_STORAGE               = os.getenv("FSM_STORAGE", "memory").lower()
+FSM_CACHE_SIZE            = int(os.getenv("FSM_CACHE_SIZE", "1000"))
+FSM_STATE_TTL             = int(os.getenv("FSM_STATE_TTL", str(48 * 3600)))
+FSM_FLUSH_INTERVAL        = float(os.getenv("FSM_FLUSH_INTERVAL", "1.0"))
+FSM_SHARED                = os.getenv("FSM_SHARED", "false").lower() in ("1", "true", "yes")
+
+# Массовый импорт постов (CSV/JSON): максимум строк в файле, строк в одном INSERT (executemany)
+IMPORT_MAX_ROWS           = int(os.getenv("IMPORT_MAX_ROWS", "10000"))
+IMPORT_BATCH_SIZE         = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+# Учет SQL по апдейтам: медленный апдейт - от SLOW_UPDATE_DB_MS мс в БД или SLOW_UPDATE_STATEMENTS запросов;
+# SQL_DEBUG - искать одинаковые запросы в одном апдейте (N+1), начиная с SQL_REPEAT_THRESHOLD повторов
+SLOW_UPDATE_DB_MS      = float(os.getenv("SLOW_UPDATE_DB_MS", "200"))
+SLOW_UPDATE_STATEMENTS = int(os.getenv("SLOW_UPDATE_STATEMENTS", "20"))
+SQL_DEBUG              = os.getenv("SQL_DEBUG", "false").lower() in ("1", "true", "yes")
+SQL_REPEAT_THRESHOLD   = int(os.getenv("SQL_REPEAT_THRESHOLD", "3"))
+
+# Пакетная генерация черновиков: макс. постов в пакете, вариантов в одном запросе (n), параллельных запросов
+BATCH_MAX_POSTS            = int(os.getenv("BATCH_MAX_POSTS", "10"))
+BATCH_VARIANTS_PER_REQUEST = int(os.getenv("BATCH_VARIANTS_PER_REQUEST", "4"))
+BATCH_MAX_CONCURRENCY      = int(os.getenv("BATCH_MAX_CONCURRENCY", "3"))
+
+# Предгенерация серий: за сколько часов до публикации генерировать посты и как часто проверять серии
+SERIES_PREGEN_HOURS            = int(os.getenv("SERIES_PREGEN_HOURS", "12"))
+SERIES_PREGEN_INTERVAL_MINUTES = int(os.getenv("SERIES_PREGEN_INTERVAL_MINUTES", "15"))
+SERIES_PREGEN_MAX_PER_RUN      = int(os.getenv("SERIES_PREGEN_MAX_PER_RUN", "20"))   # постов за один проход
+
+# Очередь задач генерации: общий лимит параллельных запросов, лимит на пользователя,
+# дневные бюджеты токенов на пользователя и на канал (0 - без ограничения)
+LLM_MAX_CONCURRENCY   = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_USER_CONCURRENCY  = int(os.getenv("LLM_USER_CONCURRENCY", "1"))
+LLM_USER_DAILY_TOKENS = int(os.getenv("LLM_USER_DAILY_TOKENS", "50000"))
+LLM_CHAT_DAILY_TOKENS = int(os.getenv("LLM_CHAT_DAILY_TOKENS", "100000"))
+
+# Спекулятивная генерация: пока пользователь читает черновик, в фоне готовится следующий вариант.
+# Выключена по умолчанию; лимит - число фоновых генераций на пользователя в сутки
+SPECULATIVE_ENABLED     = os.getenv("SPECULATIVE_ENABLED", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_DAILY_LIMIT = int(os.getenv("SPECULATIVE_DAILY_LIMIT", "20"))
+
+# Маршрутизация моделей: быстрая дешевая модель для превью и черновиков, качественная - для финальных постов
+MODEL_ROUTES = {
+    "preview": os.getenv("MODEL_ROUTE_PREVIEW", "gpt-4o-mini"),   # примеры постов
+    "draft":   os.getenv("MODEL_ROUTE_DRAFT", "gpt-4o-mini"),     # пакетные черновики
+    "final":   os.getenv("MODEL_ROUTE_FINAL", "gpt-4"),           # посты, которые уходят в канал
+}
+
+# Цены моделей в USD за 1M токенов: (prompt, completion). Дополняются через MODEL_PRICES_JSON
+MODEL_PRICES = {
+    "gpt-4":       (30.0, 60.0),
+    "gpt-4o":      (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+}
+MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("MODEL_PRICES_JSON", "{}")).items()})
+# Доля цены prompt-токена для токенов, взятых провайдером из кэша префикса (prompt caching)
+CACHED_PROMPT_PRICE_RATIO = float(os.getenv("CACHED_PROMPT_PRICE_RATIO", "0.5"))
@@ -0,0 +1,170 @@
+# database/cache.py
+"""
+Кэш частых выборок User и Group в памяти процесса.
+
+Почти каждый хэндлер начинает с выборки пользователя по Telegram ID и его
+текущего канала по chat_id. Кэш хранит отсоединенные копии строк (LRU + TTL)
+и возвращает их в сессию хэндлера через session.merge(load=False) - без
+запроса к БД. Код, который меняет пользователей и каналы, обязан вызвать
+invalidate_user / invalidate_group: после коммита или с сессией, в которой
+идут изменения (тогда сброс выполнится после ее коммита).
+
+Сброс кэша действует только в своем процессе. Поэтому пользователи (роль,
+блокировка) живут в кэше всего ENTITY_CACHE_USER_TTL секунд, а проверки прав
+читают пользователя из БД (get_user(..., fresh=True)).
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Optional, Tuple, Type, TypeVar
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from config import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL, ENTITY_CACHE_USER_TTL
+from database.db import run_after_commit
+from database.models import Group, User
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _detached_copy(obj: T) -> T:
+    """Копия строки с теми же значениями колонок, не привязанная ни к одной сессии"""
+    mapper = inspect(obj).mapper
+    copy = mapper.class_(**{attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class EntityCache(Generic[T]):
+    """
+    LRU+TTL кэш строк одной модели по ключу-колонке.
+
+    Отсутствующие строки не кэшируются: новый пользователь или канал
+    виден сразу после регистрации.
+    """
+
+    def __init__(self, model: Type[T], column: str, name: str, max_size: int, ttl: int):
+        """
+        Args:
+            model: ORM-модель
+            column: Колонка, по которой ищется строка (user_id, chat_id)
+            name: Имя кэша в метриках
+            max_size: Максимальное число записей
+            ttl: Время жизни записи в секундах
+        """
+        self.model = model
+        self.column = getattr(model, column)
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[T, float]]" = OrderedDict()
+
+    def _lookup(self, key) -> Optional[T]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        obj, stored_at = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return obj
+
+    def _remember(self, key, obj: T):
+        self._entries[key] = (_detached_copy(obj), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, session: AsyncSession, key, fresh: bool = False) -> Optional[T]:
+        """
+        Возвращает строку по ключу, привязанную к session.
+
+        Args:
+            session: Сессия хэндлера; объект можно менять и коммитить в ней
+            key: Значение ключевой колонки
+            fresh: Прочитать строку из БД в обход кэша (и обновить кэш)
+
+        Returns:
+            Объект модели или None, если строки нет
+        """
+        if key is None:
+            return None
+        if self.max_size <= 0:
+            # Кэш выключен (ENTITY_CACHE_SIZE=0)
+            return await session.scalar(select(self.model).where(self.column == key))
+
+        cached = None if fresh else self._lookup(key)
+        if cached is not None:
+            metrics.inc(f"{self.name}.hits")
+            # load=False: объект попадает в identity map сессии без SELECT
+            return await session.merge(cached, load=False)
+
+        metrics.inc(f"{self.name}.misses")
+        query = select(self.model).where(self.column == key)
+        if fresh:
+            # Объект может уже быть в identity map сессии - перечитываем его колонки
+            query = query.execution_options(populate_existing=True)
+        obj = await session.scalar(query)
+        if obj is not None:
+            self._remember(key, obj)
+        return obj
+
+    def invalidate(self, key):
+        """Удаляет запись (после изменения строки в БД)"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Размер кэша и доля попаданий"""
+        hits = metrics.counter(f"{self.name}.hits")
+        misses = metrics.counter(f"{self.name}.misses")
+        total = hits + misses
+        return {
+            "size": len(self._entries),
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+user_cache: EntityCache[User] = EntityCache(User, "user_id", "entity_cache.user", ENTITY_CACHE_SIZE, ENTITY_CACHE_USER_TTL)
+group_cache: EntityCache[Group] = EntityCache(Group, "chat_id", "entity_cache.group", ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+
+
+async def get_user(session: AsyncSession, user_id: Optional[int], fresh: bool = False) -> Optional[User]:
+    """Пользователь по Telegram ID (из кэша, если есть; fresh=True - из БД, для проверок прав)"""
+    return await user_cache.get(session, user_id, fresh)
+
+
+async def get_group(session: AsyncSession, chat_id: Optional[int]) -> Optional[Group]:
+    """Канал/группа по chat_id (из кэша, если есть)"""
+    return await group_cache.get(session, chat_id)
+
+
+def invalidate_user(user_id: int, session: Optional[AsyncSession] = None):
+    """
+    Сбрасывает кэш пользователя: вызывать после изменения строки users.
+
+    С session сброс откладывается до коммита ее транзакции - иначе параллельный
+    апдейт успел бы положить в кэш еще не измененную строку.
+    """
+    if session is not None:
+        run_after_commit(session, lambda: user_cache.invalidate(user_id))
+    else:
+        user_cache.invalidate(user_id)
+
+
+def invalidate_group(chat_id: int, session: Optional[AsyncSession] = None):
+    """Сбрасывает кэш канала: вызывать после изменения или удаления строки groups (session - как у invalidate_user)"""
+    if session is not None:
+        run_after_commit(session, lambda: group_cache.invalidate(chat_id))
+    else:
+        group_cache.invalidate(chat_id)
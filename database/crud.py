@@ -1,6 +1,30 @@
-from .models import Group, Post, GeneratedSeries, GeneratedPost
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from .models import Group, Post, PostArchive, GeneratedSeries, GeneratedPost, GoogleSheet
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import case, func, insert, select, union_all
+from sqlalchemy.orm import aliased, contains_eager, defer, load_only
+
+from utils.pagination import NEXT, Page, keyset_page
+
+# Репозиторий запросов хэндлеров и планировщика.
+# Каждая функция - один запрос к БД с фильтрацией, сортировкой и агрегацией
+# на стороне SQL по индексам из моделей (см. bench/query_plans.py);
+# число запросов на вызов проверяет bench/query_counts.py.
+
+
+# Колонки постов, которые показывают списки (очередь, история): без text и
+# generation_params - вместо текста списки выводят сохраненный preview
+POST_LIST_COLUMNS = ("id", "chat_id", "publish_at", "status", "published", "media_file_id", "preview")
+
+
+def post_list_columns(entity=Post):
+    """load_only для списков; обращение к незагруженной колонке - ошибка, а не скрытый запрос"""
+    return load_only(*[getattr(entity, name) for name in POST_LIST_COLUMNS], raiseload=True)
+
+
+# ── каналы и группы ─────────────────────────────────────────────
 
 async def add_group(session: AsyncSession, chat_id: int, title: str, added_by: int):
     group = Group(chat_id=chat_id, title=title, added_by=added_by)
@@ -9,4 +33,158 @@ async def add_group(session: AsyncSession, chat_id: int, title: str, added_by: i
 
 async def get_groups(session: AsyncSession):
     result = await session.execute(select(Group))
-    return result.scalars().all()
\ No newline at end of file
+    return result.scalars().all()
+
+async def get_user_channels(session: AsyncSession, user_id: int) -> Sequence[Group]:
+    """Каналы и группы, добавленные пользователем (ix_groups_added_by)"""
+    result = await session.scalars(select(Group).where(Group.added_by == user_id).order_by(Group.id))
+    return result.all()
+
+async def get_user_channel(session: AsyncSession, user_id: int, chat_id: int) -> Optional[Group]:
+    """Канал пользователя по chat_id (None, если канал чужой или не найден)"""
+    return await session.scalar(select(Group).where(Group.chat_id == chat_id, Group.added_by == user_id))
+
+
+# ── посты ───────────────────────────────────────────────────────
+
+async def add_posts(session: AsyncSession, posts: list[Post]):
+    """Сохраняет пачку постов одной транзакцией (INSERT выполняется пакетно)"""
+    session.add_all(posts)
+    await session.commit()
+
+async def insert_posts(session: AsyncSession, rows: List[dict], batch_size: int) -> int:
+    """
+    Вставляет посты из словарей колонок пакетами по batch_size.
+
+    Каждый пакет - один INSERT с executemany (без создания ORM-объектов
+    и отдельного INSERT на строку). Коммит - на вызывающей стороне, чтобы
+    весь импорт шел одной транзакцией.
+
+    Returns:
+        int: Число вставленных строк
+    """
+    for start in range(0, len(rows), batch_size):
+        await session.execute(insert(Post), rows[start:start + batch_size])
+    return len(rows)
+
+async def get_due_posts(session: AsyncSession, until: datetime) -> Sequence[Post]:
+    """
+    Одобренные неопубликованные посты со временем публикации не позже until.
+
+    Полный текст не загружается: часть постов только планируется на точное
+    время, а отправляемым text подгружается через session.refresh.
+
+    Args:
+        session: Сессия БД
+        until: Граница в московском времени без таймзоны (как хранится publish_at)
+
+    Returns:
+        Посты в порядке publish_at
+    """
+    result = await session.scalars(
+        select(Post)
+        .options(defer(Post.text, raiseload=True), defer(Post.generation_params, raiseload=True))
+        .where(Post.status == "approved", Post.published.is_(False), Post.publish_at <= until)
+        .order_by(Post.publish_at, Post.id)
+    )
+    return result.all()
+
+def history_query(chat_id: int, since: datetime):
+    """
+    Опубликованные посты канала с момента since из рабочей таблицы и архива.
+
+    UNION ALL posts и posts_archive с фильтрами внутри каждой ветки (по индексам
+    обеих таблиц); посты архива возвращаются как объекты Post. Выбираются только
+    колонки списка (POST_LIST_COLUMNS), без полного текста.
+
+    Returns:
+        (select, сущность Post над объединением) - для keyset_page
+    """
+    history = union_all(
+        select(*[getattr(Post, key) for key in POST_LIST_COLUMNS])
+        .where(Post.chat_id == chat_id, Post.published.is_(True), Post.publish_at >= since),
+        select(*[getattr(PostArchive, key) for key in POST_LIST_COLUMNS])
+        .where(PostArchive.chat_id == chat_id, PostArchive.publish_at >= since),
+    ).subquery("history")
+    post = aliased(Post, history)
+    return select(post).options(post_list_columns(post)), post
+
+async def get_history_page(
+    session: AsyncSession,
+    chat_id: int,
+    since: datetime,
+    page_size: int,
+    cursor: Optional[str] = None,
+    direction: str = NEXT,
+) -> Page:
+    """Страница опубликованных постов канала с момента since (из posts и архива), новые сверху"""
+    query, post = history_query(chat_id, since)
+    return await keyset_page(session, query, post, page_size, cursor, direction, descending=True)
+
+async def get_schedule_page(
+    session: AsyncSession,
+    chat_id: int,
+    after: datetime,
+    page_size: int,
+    cursor: Optional[str] = None,
+    direction: str = NEXT,
+) -> Page:
+    """Страница запланированных (одобренных, неопубликованных) постов канала после after"""
+    query = select(Post).options(post_list_columns()).where(
+        Post.chat_id == chat_id,
+        Post.status == "approved",
+        Post.published.is_(False),
+        Post.publish_at > after,
+    )
+    return await keyset_page(session, query, Post, page_size, cursor, direction)
+
+
+# ── посты серий автогенерации ───────────────────────────────────
+
+async def get_pending_series_posts(session: AsyncSession, chat_id: int, after: datetime) -> Sequence[GeneratedPost]:
+    """Посты серий канала на премодерации или одобренные, еще не наступившие"""
+    result = await session.scalars(
+        select(GeneratedPost)
+        .join(GeneratedPost.series)
+        # Серия уже в JOIN - заполняем связь из него вместо отдельного selectin-запроса
+        .options(
+            contains_eager(GeneratedPost.series),
+            # Список показывает превью - полный текст не загружаем
+            load_only(GeneratedPost.id, GeneratedPost.series_id, GeneratedPost.publish_at,
+                      GeneratedPost.status, GeneratedPost.preview, raiseload=True),
+        )
+        .where(
+            GeneratedSeries.chat_id == chat_id,
+            GeneratedPost.publish_at > after,
+            GeneratedPost.status.in_(["pending", "approved"]),
+        )
+        .order_by(GeneratedPost.publish_at)
+    )
+    return result.all()
+
+
+# ── Google Таблицы ──────────────────────────────────────────────
+
+async def get_active_sheets(session: AsyncSession, chat_id: Optional[int] = None) -> Sequence[GoogleSheet]:
+    """Активные подключения таблиц: все или только канала chat_id"""
+    query = select(GoogleSheet).where(GoogleSheet.is_active.is_(True))
+    if chat_id is not None:
+        query = query.where(GoogleSheet.chat_id == chat_id)
+    result = await session.scalars(query.order_by(GoogleSheet.id))
+    return result.all()
+
+async def get_sheet_stats_by_chat(session: AsyncSession) -> List[Tuple[int, Optional[str], int, int]]:
+    """
+    Число активных и неактивных таблиц по каналам одним запросом.
+
+    Returns:
+        [(chat_id, название канала или None, активных, неактивных)]
+    """
+    active = func.sum(case((GoogleSheet.is_active.is_(True), 1), else_=0))
+    result = await session.execute(
+        select(GoogleSheet.chat_id, Group.title, active, func.count(GoogleSheet.id) - active)
+        .outerjoin(Group, Group.chat_id == GoogleSheet.chat_id)
+        .group_by(GoogleSheet.chat_id, Group.title)
+        .order_by(GoogleSheet.chat_id)
+    )
+    return [(chat_id, title, int(n_active or 0), int(n_inactive or 0)) for chat_id, title, n_active, n_inactive in result]
@@ -0,0 +1,263 @@
+# database/fsm_storage.py
+"""
+Хранилище FSM aiogram в основной БД (таблица fsm_states).
+
+Диалоги переживают перезапуск бота, а брошенные на полпути состояния
+(с полными сгенерированными текстами в generated_text) не копятся в памяти:
+
+* в памяти - LRU не больше max_size недавних диалогов, остальные читаются из БД;
+* запись отложенная: set_state/set_data меняют запись в памяти, а фоновая
+  задача раз в flush_interval секунд пишет все измененные диалоги одной
+  транзакцией (несколько изменений одного апдейта - одна строка в БД);
+* состояния, не менявшиеся дольше ttl, удаляет purge_expired (задача
+  планировщика) и не возвращает чтение.
+
+При аварийном завершении теряются изменения последних flush_interval секунд;
+при штатной остановке close() дописывает их.
+
+LRU и отложенная запись верны только для одного процесса бота: другая
+реплика не увидит изменений и перезапишет их своей копией. Если бот
+запущен в нескольких процессах с одной БД, нужен FSM_SHARED=true - тогда
+каждое чтение идет в БД, а каждое изменение сразу записывается (память не
+используется). Блокировка диалога (ChatLockIsolation) и в этом режиме
+действует только внутри процесса.
+
+updated_at хранится в московском времени без таймзоны, как остальные даты бота.
+"""
+import asyncio
+import datetime as dt
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete, insert
+
+from zoneinfo import ZoneInfo
+
+from config import FSM_CACHE_SIZE, FSM_FLUSH_INTERVAL, FSM_SHARED, FSM_STATE_TTL
+from database.db import AsyncSessionLocal
+from database.models import FsmState
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MSK = ZoneInfo("Europe/Moscow")
+
+
+def _now() -> dt.datetime:
+    """Текущее московское время без таймзоны (как хранится updated_at)"""
+    return dt.datetime.now(MSK).replace(tzinfo=None)
+
+
+@dataclass
+class _Record:
+    """Диалог в памяти; dirty - есть изменения, еще не записанные в БД"""
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    dirty: bool = False
+    updated_at: dt.datetime = field(default_factory=_now)
+
+
+def make_key(key: StorageKey) -> str:
+    """Строковый ключ диалога: bot:chat:user:thread:destiny"""
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+
+def _encode(value: Any) -> Any:
+    # manual_post кладет в данные datetime (publish_at)
+    if isinstance(value, dt.datetime):
+        return {"__datetime__": value.isoformat()}
+    # После перезапуска вернулся бы другой тип - ошибка должна всплыть в хэндлере
+    raise TypeError(f"FSM data value of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict) -> Any:
+    if "__datetime__" in obj and len(obj) == 1:
+        return dt.datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def dump_data(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_encode)
+
+
+def load_data(raw: Optional[str]) -> Dict[str, Any]:
+    return json.loads(raw, object_hook=_decode) if raw else {}
+
+
+class SqlStorage(BaseStorage):
+    """FSM-хранилище в БД с LRU в памяти, отложенной записью и TTL"""
+
+    def __init__(
+        self, max_size: int, ttl: int, flush_interval: float, shared: bool = False, session_factory=AsyncSessionLocal,
+    ):
+        """
+        Args:
+            max_size: Максимум диалогов в памяти
+            ttl: Время жизни неизменявшегося состояния в секундах
+            flush_interval: Период записи изменений в БД в секундах
+            shared: БД используют несколько процессов бота: чтение и запись без памяти
+            session_factory: Фабрика сессий БД
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.shared = shared
+        self.session_factory = session_factory
+        self._records: "OrderedDict[str, _Record]" = OrderedDict()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def _record(self, key: StorageKey) -> _Record:
+        """Диалог из памяти или из БД (просроченное состояние считается пустым)"""
+        name = make_key(key)
+        record = None if self.shared else self._records.get(name)
+        if record is not None:
+            self._records.move_to_end(name)
+            metrics.inc("fsm_storage.hits")
+            if record.updated_at < self._border():
+                # Брошенный диалог: строку в БД удалит purge_expired
+                record.state, record.data = None, {}
+            return record
+
+        metrics.inc("fsm_storage.misses")
+        async with self.session_factory() as session:
+            row = await session.get(FsmState, name)
+        if self.shared:
+            record = _Record()
+            if row is not None and row.updated_at >= self._border():
+                record.state, record.data, record.updated_at = row.state, load_data(row.data), row.updated_at
+            return record
+        # Пока шел запрос, диалог мог появиться в памяти
+        record = self._records.get(name)
+        if record is None:
+            record = _Record()
+            if row is not None and row.updated_at >= self._border():
+                record.state, record.data, record.updated_at = row.state, load_data(row.data), row.updated_at
+            self._records[name] = record
+            self._evict()
+        return record
+
+    def _border(self) -> dt.datetime:
+        return _now() - dt.timedelta(seconds=self.ttl)
+
+    def _evict(self):
+        """Вытесняет из памяти самые старые записанные в БД диалоги сверх max_size"""
+        excess = len(self._records) - self.max_size
+        if excess <= 0:
+            return
+        for name in [name for name, record in self._records.items() if not record.dirty][:excess]:
+            del self._records[name]
+
+    async def _changed(self, key: StorageKey, record: _Record):
+        """Изменение диалога: сразу в БД (shared) или отложенной записью"""
+        if self.shared:
+            record.updated_at = _now()
+            await self._write({make_key(key): record})
+            metrics.inc("fsm_storage.flushed")
+            return
+        record.dirty = True
+        record.updated_at = _now()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing FSM states: {e}")
+            if not any(record.dirty for record in self._records.values()):
+                return
+
+    async def flush(self) -> int:
+        """
+        Записывает измененные диалоги одной транзакцией.
+
+        Пустые диалоги (без состояния и данных) удаляются из БД и из памяти.
+
+        Returns:
+            int: Число записанных диалогов
+        """
+        async with self._flush_lock:
+            dirty = {name: record for name, record in self._records.items() if record.dirty}
+            if not dirty:
+                return 0
+            # Снимаем флаг до записи: изменения во время записи попадут в следующий flush
+            for record in dirty.values():
+                record.dirty = False
+            try:
+                await self._write(dirty)
+            except Exception:
+                for record in dirty.values():
+                    record.dirty = True
+                raise
+
+            for name, record in dirty.items():
+                if not record.dirty and record.state is None and not record.data:
+                    self._records.pop(name, None)
+            self._evict()
+            metrics.inc("fsm_storage.flushed", len(dirty))
+            return len(dirty)
+
+    async def _write(self, records: Dict[str, _Record]):
+        """Записывает диалоги одной транзакцией; пустые диалоги удаляются из БД"""
+        rows = [
+            {"key": name, "state": record.state, "data": dump_data(record.data), "updated_at": record.updated_at}
+            for name, record in records.items()
+            if record.state is not None or record.data
+        ]
+        async with self.session_factory() as session:
+            await session.execute(delete(FsmState).where(FsmState.key.in_(list(records))))
+            if rows:
+                await session.execute(insert(FsmState), rows)
+            await session.commit()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        await self._changed(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        # Проверяем сериализацию сразу: при отложенной записи TypeError возник бы во flush
+        dump_data(data)
+        record = await self._record(key)
+        record.data = data.copy()
+        await self._changed(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    async def purge_expired(self) -> int:
+        """Удаляет из БД состояния, не менявшиеся дольше ttl; возвращает число удаленных строк"""
+        border = self._border()
+        async with self.session_factory() as session:
+            result = await session.execute(delete(FsmState).where(FsmState.updated_at < border))
+            await session.commit()
+        for name in [name for name, record in self._records.items() if not record.dirty and record.updated_at < border]:
+            del self._records[name]
+        return result.rowcount or 0
+
+    def stats(self) -> dict:
+        """Диалогов в памяти и из них еще не записанных в БД"""
+        return {
+            "size": len(self._records),
+            "dirty": sum(record.dirty for record in self._records.values()),
+        }
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+
+fsm_storage = SqlStorage(FSM_CACHE_SIZE, FSM_STATE_TTL, FSM_FLUSH_INTERVAL, FSM_SHARED)
@@ -0,0 +1,105 @@
+# database/instrumentation.py
+"""
+Учет SQL-запросов по задачам (апдейтам Telegram).
+
+События движка before/after_cursor_execute считают запросы и время БД.
+Общие счетчики идут в utils.metrics, а если в контексте задан QueryStats
+(его ставит SqlStatsMiddleware на время обработки апдейта), запросы
+записываются и в него. В режиме отладки (SQL_DEBUG) запоминаются тексты
+запросов, чтобы найти одинаковые запросы в цикле (N+1).
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import SLOW_UPDATE_DB_MS, SLOW_UPDATE_STATEMENTS, SQL_DEBUG, SQL_REPEAT_THRESHOLD
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """Запросы одной задачи: число, суммарное время БД и (в отладке) повторы"""
+    label: str
+    statements: int = 0
+    db_time: float = 0.0
+    repeats: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int = SQL_REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        """Одинаковые запросы, выполненные не меньше threshold раз"""
+        return [(statement, count) for statement, count in self.repeats.most_common() if count >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    metrics.inc("db.statements")
+    metrics.observe("db.statement_time", elapsed)
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+        if SQL_DEBUG:
+            stats.repeats[statement] += 1
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Подключает учет запросов к движку (повторный вызов ничего не меняет)"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries(label: str) -> Iterator[QueryStats]:
+    """
+    Собирает запросы, выполненные внутри блока (в том числе во вложенных задачах).
+
+    Args:
+        label: Название задачи для отчета (тип апдейта, кнопка, команда)
+    """
+    stats = QueryStats(label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def report(stats: QueryStats):
+    """
+    Публикует статистику задачи в метрики и пишет в лог медленные задачи и повторы.
+
+    Задача считается медленной, если время БД не меньше SLOW_UPDATE_DB_MS
+    или запросов не меньше SLOW_UPDATE_STATEMENTS.
+    """
+    db_ms = stats.db_time * 1000
+    metrics.observe("db.update.statements", stats.statements)
+    metrics.observe("db.update.time_ms", db_ms)
+
+    if db_ms >= SLOW_UPDATE_DB_MS or stats.statements >= SLOW_UPDATE_STATEMENTS:
+        metrics.inc("db.slow_updates")
+        logger.warning(f"Slow update {stats.label}: {stats.statements} SQL statements, {db_ms:.1f} ms in DB")
+
+    for statement, count in stats.repeated():
+        metrics.inc("db.repeated_statements")
+        logger.warning(
+            f"Repeated SQL in {stats.label} ({count}x, possible N+1): {' '.join(statement.split())[:300]}"
+        )
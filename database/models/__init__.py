@@ -2,22 +2,30 @@
 from .base import Base
 from .group import Group
 from .post import Post
+from .post_archive import PostArchive
 from .generated_series import GeneratedSeries
 from .generated_post import GeneratedPost
 from .generation_template import GenerationTemplate
 from .user import User
 from .google_sheet import GoogleSheet
 from .group_settings import GroupSettings
+from .generation_cache import GenerationCacheEntry
+from .llm_usage import LLMUsage
+from .fsm_state import FsmState
 
 
 __all__ = (
     "Base",
     "Group",
     "Post",
+    "PostArchive",
     "GeneratedSeries",
     "GeneratedPost",
     "GenerationTemplate",
     "User",
     "GoogleSheet",
     "GroupSettings",
+    "GenerationCacheEntry",
+    "LLMUsage",
+    "FsmState",
 )
@@ -0,0 +1,21 @@
+# database/models/fsm_state.py
+import datetime as dt
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, String, Text
+
+from .base import Base
+
+
+class FsmState(Base):
+    """Состояние и данные FSM одного диалога (хранилище database/fsm_storage.py)"""
+    __tablename__ = "fsm_states"
+
+    key:        Mapped[str]           = mapped_column(String(255), primary_key=True)  # bot:chat:user:thread:destiny
+    state:      Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    data:       Mapped[str]           = mapped_column(Text, default="{}")  # JSON
+    updated_at: Mapped[dt.datetime]   = mapped_column(  # московское время без таймзоны
+        DateTime, default=lambda: dt.datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None), index=True
+    )
@@ -1,15 +1,21 @@
 import datetime as dt
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import BigInteger, DateTime, Text, String, Boolean, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy import BigInteger, DateTime, Text, String, Boolean, ForeignKey, Index
 from .base import Base            # или .db import Base — у вас может быть иначе
+from .post import PREVIEW_LENGTH, make_preview
 
 class GeneratedPost(Base):
     __tablename__ = "generated_posts"
+    __table_args__ = (
+        # Премодерация и публикация: посты с нужным статусом в порядке publish_at
+        Index("ix_generated_posts_status_publish_at", "status", "publish_at"),
+    )
 
     id:          Mapped[int]          = mapped_column(primary_key=True)
     series_id:   Mapped[int]          = mapped_column(ForeignKey("generated_series.id"))
     chat_id:     Mapped[int]          = mapped_column(BigInteger)
     text:        Mapped[str]          = mapped_column(Text)
+    preview:     Mapped[str | None]   = mapped_column(String(PREVIEW_LENGTH + 1), nullable=True)
     media_file_id: Mapped[str | None] = mapped_column(String, nullable=True)
     publish_at:  Mapped[dt.datetime]  = mapped_column(DateTime)
     status:      Mapped[str]          = mapped_column(String, default="pending")
@@ -26,3 +32,8 @@ class GeneratedPost(Base):
         back_populates="posts",
         lazy="selectin",
     )
+
+    @validates("text")
+    def _update_preview(self, key, text):
+        self.preview = make_preview(text)
+        return text
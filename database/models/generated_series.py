@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, Text, String
+from sqlalchemy import BigInteger, Boolean, DateTime, Integer, Text, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -25,9 +25,19 @@ class GeneratedSeries(Base):
     # crontab-строка или человекочитаемое (“daily”, “weekly”)
     repeat: Mapped[str] = mapped_column(String(50), nullable=False)
 
-    # Ближайшее время публикации
+    # Ближайшее время публикации (МСК, без таймзоны — как и publish_at у постов)
     time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
+    # Сколько постов серия может сгенерировать и сколько уже сгенерировано
+    post_limit: Mapped[int] = mapped_column(Integer, default=10)
+    posts_generated: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Отправлять ли сгенерированные посты на премодерацию
+    moderation: Mapped[bool] = mapped_column(Boolean, default=True)
+
+    # Серия отключается, когда исчерпан лимит или разовая публикация сгенерирована
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, index=True)
+
     # --- Связь с постами ------------------------------------------------
     posts: Mapped[list["GeneratedPost"]] = relationship(
         "GeneratedPost",
@@ -0,0 +1,17 @@
+# database/models/generation_cache.py
+import datetime as dt
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, Integer, String, Text
+
+from .base import Base
+
+
+class GenerationCacheEntry(Base):
+    """Сохраненный результат генерации (персистентный слой кэша генераций)"""
+    __tablename__ = "generation_cache"
+
+    key:          Mapped[str]         = mapped_column(String(64), primary_key=True)  # sha256 нормализованного запроса
+    model:        Mapped[str]         = mapped_column(String)
+    text:         Mapped[str]         = mapped_column(Text)
+    total_tokens: Mapped[int]         = mapped_column(Integer, default=0)
+    created_at:   Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, index=True)
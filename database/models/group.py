@@ -1,4 +1,7 @@
-from sqlalchemy import BigInteger, String
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -6,6 +9,8 @@ from .base import Base
 class Group(Base):
     __tablename__ = "groups"
 
-    id:        Mapped[int]        = mapped_column(primary_key=True, autoincrement=True)
-    chat_id:   Mapped[int]        = mapped_column(BigInteger, unique=True, index=True)
-    title:     Mapped[str]        = mapped_column(String, nullable=False)
+    id:         Mapped[int]           = mapped_column(primary_key=True, autoincrement=True)
+    chat_id:    Mapped[int]           = mapped_column(BigInteger, unique=True, index=True)
+    title:      Mapped[str]           = mapped_column(String, nullable=False)
+    added_by:   Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, index=True)  # ID пользователя, добавившего группу
+    date_added: Mapped[dt.datetime]   = mapped_column(DateTime, default=dt.datetime.utcnow)
@@ -0,0 +1,27 @@
+# database/models/llm_usage.py
+import datetime as dt
+from typing import Optional
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, DateTime, Float, Integer, String
+
+from .base import Base
+
+
+class LLMUsage(Base):
+    """Расход токенов на одну задачу генерации (по данным usage из ответа API)"""
+    __tablename__ = "llm_usage"
+
+    id:                Mapped[int]           = mapped_column(primary_key=True, autoincrement=True)
+    user_id:           Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, index=True)   # None - фоновые задачи
+    chat_id:           Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, index=True)
+    kind:              Mapped[str]           = mapped_column(String(32), default="article")        # article / batch / series ...
+    model:             Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    route:             Mapped[Optional[str]] = mapped_column(String(16), nullable=True)                # preview / draft / final
+    requests:          Mapped[int]           = mapped_column(Integer, default=0)
+    prompt_tokens:     Mapped[int]           = mapped_column(Integer, default=0)
+    cached_tokens:     Mapped[int]           = mapped_column(Integer, default=0)                   # prompt-токены из кэша провайдера
+    completion_tokens: Mapped[int]           = mapped_column(Integer, default=0)
+    total_tokens:      Mapped[int]           = mapped_column(Integer, default=0)
+    cost_usd:          Mapped[float]         = mapped_column(Float, default=0.0)
+    created_at:        Mapped[dt.datetime]   = mapped_column(DateTime, default=dt.datetime.utcnow, index=True)
@@ -1,16 +1,31 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Text, String, Boolean, Integer
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Text, String, Boolean, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from .base import Base
 
+# Длина превью поста в списках (очередь, история, премодерация)
+PREVIEW_LENGTH = 100
+
+
+def make_preview(text: Optional[str]) -> str:
+    """Превью текста для списков: первые PREVIEW_LENGTH символов и многоточие, если текст длиннее"""
+    text = text or ""
+    return text[:PREVIEW_LENGTH] + ("…" if len(text) > PREVIEW_LENGTH else "")
+
 
 class Post(Base):
     """Сообщение, запланированное или уже отправленное ботом."""
 
     __tablename__ = "posts"
+    __table_args__ = (
+        # История публикаций: посты канала с published=True, по убыванию publish_at
+        Index("ix_posts_chat_id_published_publish_at", "chat_id", "published", "publish_at"),
+        # Очередь: одобренные неопубликованные посты канала в порядке publish_at
+        Index("ix_posts_chat_id_status_published_publish_at", "chat_id", "status", "published", "publish_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
@@ -20,6 +35,9 @@ class Post(Base):
     # сам текст поста
     text: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # начало текста для списков (обновляется при записи text, см. make_preview)
+    preview: Mapped[Optional[str]] = mapped_column(String(PREVIEW_LENGTH + 1), nullable=True)
+
     # file_id (фото/видео/док) из Telegram, если есть
     media_file_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
@@ -44,6 +62,11 @@ class Post(Base):
     generation_params: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON с параметрами
     rejection_reason: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
+    @validates("text")
+    def _update_preview(self, key, text):
+        self.preview = make_preview(text)
+        return text
+
     # --- примеры связей -------------------------------------------------
     # group      = relationship("Group", back_populates="posts", lazy="joined")
     # attachments = relationship("Attachment", back_populates="post")
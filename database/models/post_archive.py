@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Text, String, Boolean, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+from .post import PREVIEW_LENGTH
+
+
+class PostArchive(Base):
+    """
+    Опубликованный пост, перенесенный из posts архиватором (utils/post_archiver.py).
+
+    Колонки повторяют Post, id сохраняется исходный; рабочая таблица posts
+    остается маленькой, а история читает обе таблицы.
+    """
+
+    __tablename__ = "posts_archive"
+    __table_args__ = (
+        # История публикаций канала по убыванию publish_at
+        Index("ix_posts_archive_chat_id_publish_at", "chat_id", "publish_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    preview: Mapped[Optional[str]] = mapped_column(String(PREVIEW_LENGTH + 1), nullable=True)
+    media_file_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    publish_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_by: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default="sent")
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    published: Mapped[bool] = mapped_column(Boolean, default=True)
+    is_generated: Mapped[bool] = mapped_column(Boolean, default=False)
+    template_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    generation_params: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    rejection_reason: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # когда пост перенесен в архив
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
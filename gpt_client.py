@@ -1,59 +1,361 @@
 # gpt_client.py с оптимизированным использованием контекста для разных режимов
-import requests
+import asyncio
 import json
-from config import OPENAI_API_KEY
-from utils.prompt_manager import SYSTEM_CONTEXT
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
 
-async def generate_article(prompt: str) -> str:
+import aiohttp
+
+from config import (
+    OPENAI_API_KEY, OPENAI_API_BASE, OPENAI_CONNECT_TIMEOUT,
+    OPENAI_READ_TIMEOUT, OPENAI_MAX_RETRIES, OPENAI_POOL_SIZE,
+    BATCH_VARIANTS_PER_REQUEST, BATCH_MAX_CONCURRENCY, MODEL_ROUTES
+)
+from utils.prompt_manager import SYSTEM_CONTEXT, ARTICLE_SYSTEM_PROMPT
+from utils.generation_cache import generation_cache, make_key
+from utils.llm_usage import record_usage
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# HTTP-статусы, при которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Маршрут по умолчанию - финальные посты
+DEFAULT_ROUTE = "final"
+
+# Общая сессия с пулом соединений (создается лениво внутри event loop)
+_session: Optional[aiohttp.ClientSession] = None
+
+# Ограничение параллельных запросов пакетной генерации
+_batch_semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+
+class OpenAIError(Exception):
+    """Ошибка обращения к API OpenAI"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """Возвращает общую сессию aiohttp, создавая ее при первом обращении"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=OPENAI_POOL_SIZE, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(
+                total=None,
+                connect=OPENAI_CONNECT_TIMEOUT,
+                sock_read=OPENAI_READ_TIMEOUT,
+            ),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {OPENAI_API_KEY}",
+            },
+        )
+    return _session
+
+
+async def close_session():
+    """Закрывает общую сессию (вызывается при остановке бота)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def resolve_model(route: str) -> str:
+    """
+    Возвращает модель для маршрута из MODEL_ROUTES.
+
+    Args:
+        route: preview (примеры постов), draft (черновики) или final (посты для публикации)
+    """
+    return MODEL_ROUTES.get(route) or MODEL_ROUTES[DEFAULT_ROUTE]
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Задержка перед повтором: Retry-After от API или экспоненциальный backoff с джиттером"""
+    if retry_after:
+        try:
+            return min(float(retry_after), 60.0)
+        except ValueError:
+            pass
+    return min(0.5 * 2 ** attempt, 20.0) + random.uniform(0, 0.5)
+
+
+@asynccontextmanager
+async def _open_completion(data: dict):
+    """
+    Открывает запрос к /chat/completions с повторами на 429/5xx и сетевых ошибках.
+
+    Повторяется только установка соединения и получение статуса: после того как
+    API ответил 200, ответ отдается вызывающему коду (в т.ч. для стриминга).
+
+    Raises:
+        OpenAIError: если запрос не удался после всех попыток
+    """
+    session = _get_session()
+    url = f"{OPENAI_API_BASE}/chat/completions"
+
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            response = await session.post(url, json=data)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == OPENAI_MAX_RETRIES:
+                raise OpenAIError(f"Ошибка соединения: {e!r}")
+            logger.warning(f"Ошибка соединения с API: {e!r}, повтор {attempt + 1}/{OPENAI_MAX_RETRIES}")
+        else:
+            if response.status == 200:
+                try:
+                    yield response
+                finally:
+                    response.release()
+                return
+
+            body = await response.text()
+            response.release()
+            if response.status not in RETRY_STATUSES or attempt == OPENAI_MAX_RETRIES:
+                logger.error(f"Ошибка API: {response.status}, {body}")
+                raise OpenAIError(f"Ошибка API {response.status}", status=response.status)
+
+            retry_after = response.headers.get("Retry-After")
+            logger.warning(f"API вернул {response.status}, повтор {attempt + 1}/{OPENAI_MAX_RETRIES}")
+
+        await asyncio.sleep(_retry_delay(attempt, retry_after))
+
+
+async def chat_completion(data: dict, route: str = DEFAULT_ROUTE) -> dict:
+    """
+    Выполняет запрос к /chat/completions и возвращает ответ API целиком.
+
+    Args:
+        data: Тело запроса к API
+        route: Маршрут модели (для метрик задержки и стоимости)
+
+    Returns:
+        dict: Ответ API
+
+    Raises:
+        OpenAIError: если запрос не удался после всех попыток
+    """
+    started = time.perf_counter()
+    try:
+        async with _open_completion(data) as response:
+            result = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise OpenAIError(f"Ошибка чтения ответа: {e!r}")
+
+    metrics.observe(f"llm.latency.{route}", time.perf_counter() - started)
+    record_usage(data.get("model"), result.get("usage"), route)
+    return result
+
+
+async def stream_chat_completion(
+    data: dict, usage: Optional[dict] = None, route: str = DEFAULT_ROUTE
+) -> AsyncIterator[str]:
+    """
+    Выполняет потоковый запрос к /chat/completions (server-sent events).
+
+    Args:
+        data: Тело запроса к API (параметр stream выставляется автоматически)
+        usage: Если передан, в него записывается usage из последнего чанка ответа
+        route: Маршрут модели (для метрик задержки и стоимости)
+
+    Yields:
+        str: Очередной фрагмент текста ответа
+
+    Raises:
+        OpenAIError: если запрос не удался
+    """
+    data = {**data, "stream": True, "stream_options": {"include_usage": True}}
+    if usage is None:
+        usage = {}
+    started = time.perf_counter()
+    first_token = True
+    try:
+        async with _open_completion(data) as response:
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if not line.startswith("data:"):
+                    continue
+
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+
+                try:
+                    chunk = json.loads(payload)
+                except json.JSONDecodeError:
+                    # Битый или служебный чанк от провайдера/прокси не должен обрывать ответ
+                    logger.warning(f"Skipping malformed stream chunk: {payload[:200]!r}")
+                    metrics.inc("llm.stream.bad_chunks")
+                    continue
+                if not isinstance(chunk, dict):
+                    continue
+                if chunk.get("usage"):
+                    usage.update(chunk["usage"])
+                choices = chunk.get("choices") or []
+                if choices:
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        if first_token:
+                            metrics.observe(f"llm.ttft.{route}", time.perf_counter() - started)
+                            first_token = False
+                        yield delta
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise OpenAIError(f"Обрыв потока ответа: {e!r}")
+    finally:
+        if usage:
+            metrics.observe(f"llm.latency.{route}", time.perf_counter() - started)
+            record_usage(data.get("model"), usage, route)
+
+
+def _article_request(prompt: str, route: str = DEFAULT_ROUTE) -> dict:
+    """Тело запроса для генерации поста"""
+    return {
+        "model": resolve_model(route),
+        "messages": [
+            {"role": "system", "content": ARTICLE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 800
+    }
+
+
+def _cache_key(data: dict) -> str:
+    """Ключ кэша генераций для тела запроса"""
+    system = next((m["content"] for m in data["messages"] if m["role"] == "system"), "")
+    prompt = next((m["content"] for m in data["messages"] if m["role"] == "user"), "")
+    return make_key(data["model"], system, prompt, data.get("temperature", 1.0))
+
+
+async def generate_article(prompt: str, use_cache: bool = True, route: str = DEFAULT_ROUTE) -> str:
     """
     Генерирует текст статьи по заданному промпту через прямой HTTP запрос к API OpenAI
+
+    Args:
+        prompt: Промпт для генерации
+        use_cache: Использовать кэш генераций (False - всегда новый вариант, например при регенерации)
+        route: Маршрут модели (см. MODEL_ROUTES)
     """
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {OPENAI_API_KEY}"
-        }
-        
-        data = {
-            "model": "gpt-4",
-            "messages": [
-                {"role": "system", "content": "Ты пишешь короткие посты для социальных сетей на русском языке. Не используй явные маркеры структуры текста вроде 'Основной текст:', 'Подзаголовок:', 'Заключение:' и т.п. Форматируй текст органично и естественно."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 800
-        }
-        
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        else:
-            print(f"Ошибка API: {response.status_code}, {response.text}")
-            return f"Не удалось сгенерировать контент: Ошибка API {response.status_code}"
-    
+        data = _article_request(prompt, route)
+        key = _cache_key(data)
+        if use_cache:
+            cached = await generation_cache.get(key)
+            if cached:
+                return cached.text
+
+        result = await chat_completion(data, route)
+        text = result["choices"][0]["message"]["content"]
+        if use_cache:
+            total_tokens = (result.get("usage") or {}).get("total_tokens", 0)
+            await generation_cache.set(key, data["model"], text, total_tokens)
+        return text
+
+    except OpenAIError as e:
+        return f"Не удалось сгенерировать контент: {str(e)}"
+
     except Exception as e:
-        print(f"Ошибка при генерации текста: {str(e)}")
+        logger.error(f"Ошибка при генерации текста: {str(e)}")
         return f"Не удалось сгенерировать контент: {str(e)}"
 
 
+async def stream_article(
+    prompt: str, use_cache: bool = True, route: str = DEFAULT_ROUTE
+) -> AsyncIterator[str]:
+    """
+    Генерирует текст статьи потоково: фрагменты отдаются по мере их получения от API.
+
+    В отличие от generate_article, ошибки не превращаются в текст, а пробрасываются
+    как OpenAIError, чтобы обработчик мог показать пользователю сообщение об ошибке.
+    При попадании в кэш весь текст отдается одним фрагментом.
+
+    Args:
+        prompt: Промпт для генерации
+        use_cache: Использовать кэш генераций (False - всегда новый вариант, например при регенерации)
+        route: Маршрут модели (см. MODEL_ROUTES)
+    """
+    data = _article_request(prompt, route)
+    key = _cache_key(data)
+    if use_cache:
+        cached = await generation_cache.get(key)
+        if cached:
+            yield cached.text
+            return
+
+    usage = {}
+    parts = []
+    async for delta in stream_chat_completion(data, usage=usage, route=route):
+        parts.append(delta)
+        yield delta
+
+    text = "".join(parts)
+    if use_cache and text.strip():
+        await generation_cache.set(key, data["model"], text, usage.get("total_tokens", 0))
+
+
+async def generate_variants(prompt: str, count: int, route: str = DEFAULT_ROUTE) -> List[str]:
+    """
+    Генерирует count вариантов поста по одному промпту.
+
+    Варианты запрашиваются параметром n (по BATCH_VARIANTS_PER_REQUEST за запрос),
+    запросы выполняются параллельно, не более BATCH_MAX_CONCURRENCY одновременно.
+    Промпт оплачивается один раз на запрос, а время ожидания - одна генерация
+    вместо count последовательных.
+
+    Args:
+        prompt: Промпт для генерации
+        count: Количество вариантов
+        route: Маршрут модели (см. MODEL_ROUTES)
+
+    Returns:
+        List[str]: Сгенерированные тексты
+
+    Raises:
+        OpenAIError: если хотя бы один запрос не удался
+    """
+    data = _article_request(prompt, route)
+    per_request = max(1, BATCH_VARIANTS_PER_REQUEST)
+    chunks = [min(per_request, count - start) for start in range(0, count, per_request)]
+
+    async def generate_chunk(n: int) -> List[str]:
+        async with _batch_semaphore:
+            result = await chat_completion({**data, "n": n}, route)
+        return [choice["message"]["content"] for choice in result["choices"]]
+
+    results = await asyncio.gather(*(generate_chunk(n) for n in chunks))
+    return [text for chunk in results for text in chunk if text and text.strip()]
+
+
+async def generate_variant(prompt: str, route: str = DEFAULT_ROUTE) -> str:
+    """
+    Генерирует один новый вариант поста (без кэша генераций и вне лимита BATCH_MAX_CONCURRENCY).
+
+    В отличие от generate_article ошибка не превращается в текст поста.
+
+    Raises:
+        OpenAIError: если запрос не удался
+    """
+    result = await chat_completion(_article_request(prompt, route), route)
+    return result["choices"][0]["message"]["content"]
+
+
 async def generate_example_post(prompt: str) -> str:
     """
     Генерирует пример поста для предпросмотра через прямой HTTP запрос к API OpenAI
     """
     try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {OPENAI_API_KEY}"
-        }
-        
         data = {
-            "model": "gpt-4",
+            "model": resolve_model("preview"),
             "messages": [
                 {"role": "system", "content": "Ты создаешь примеры контента для социальных сетей."},
                 {"role": "user", "content": prompt}
@@ -61,20 +363,13 @@ async def generate_example_post(prompt: str) -> str:
             "temperature": 0.7,
             "max_tokens": 500
         }
-        
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        else:
-            print(f"Ошибка API: {response.status_code}, {response.text}")
-            return f"Не удалось сгенерировать пример: Ошибка API {response.status_code}"
-    
+
+        result = await chat_completion(data, "preview")
+        return result["choices"][0]["message"]["content"]
+
+    except OpenAIError as e:
+        return f"Не удалось сгенерировать пример: {str(e)}"
+
     except Exception as e:
-        print(f"Ошибка при генерации примера поста: {str(e)}")
+        logger.error(f"Ошибка при генерации примера поста: {str(e)}")
         return f"Не удалось сгенерировать пример: {str(e)}"
@@ -3,19 +3,27 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+import html
 import json
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 import logging
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.db import AsyncSessionLocal
 from database.models import Post, Group
-from gpt_client import generate_article
+from gpt_client import stream_article
 from utils.prompt_manager import (
     PRO_MODE, BASIC_MODE, CONTENT_TYPES, TONES, STRUCTURE_OPTIONS, 
     LENGTH_OPTIONS, BLOG_TOPICS, validate_pro_prompt, build_basic_prompt,
-    MAX_PROMPT_LENGTH
+    build_generation_params, MAX_PROMPT_LENGTH
 )
+from utils.stream_editor import ThrottledEditor, TYPING_CURSOR
+from utils.batch_generation import generate_draft_batch
+from utils.llm_queue import llm_queue
+from utils.speculative import speculative
+from config import BATCH_MAX_POSTS
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -42,6 +50,55 @@ class AutoGenStates(StatesGroup):
     schedule_post = State()
     schedule_time = State()
     schedule_date = State()
+    batch_count = State()
+
+
+def post_actions_markup(generation_mode: str, edited: bool = False) -> InlineKeyboardMarkup:
+    """Клавиатура действий со сгенерированным постом"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
+        [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
+        [InlineKeyboardButton(text="✏️ Редактировать еще" if edited else "✏️ Редактировать", callback_data="post_edit")],
+        [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
+        [InlineKeyboardButton(text="📦 Пакет черновиков", callback_data="post_batch")],
+        [InlineKeyboardButton(
+            text="🔧 Изменить параметры" if generation_mode == BASIC_MODE else "📝 Изменить промпт",
+            callback_data="post_change_params" if generation_mode == BASIC_MODE else "post_change_prompt"
+        )]
+    ])
+
+
+def regenerate_prompt(user_data: dict, generation_mode: str) -> str:
+    """Промпт для генерации другого варианта поста"""
+    if generation_mode == BASIC_MODE:
+        # Для BASIC используем построенный промпт
+        return build_basic_prompt(user_data) + " Создай совершенно другой вариант поста."
+    # Для PRO используем готовый промпт
+    return user_data.get("pro_prompt", "") + " Создай совершенно другой вариант."
+
+
+async def stream_post(message: Message, prompt: str, header: str, use_cache: bool = True) -> str:
+    """
+    Генерирует пост потоково, показывая текст в сообщении message по мере генерации.
+
+    Args:
+        message: Сообщение бота, в котором показывается превью
+        prompt: Промпт для генерации
+        header: Заголовок над превью
+        use_cache: Использовать кэш генераций (при регенерации - False)
+
+    Returns:
+        str: Полный сгенерированный текст
+    """
+    editor = ThrottledEditor(message)
+    generated_text = ""
+    async for delta in stream_article(prompt, use_cache=use_cache):
+        generated_text += delta
+        await editor.update(f"{header}\n\n{generated_text}{TYPING_CURSOR}")
+
+    if not generated_text.strip():
+        raise ValueError("модель вернула пустой ответ")
+    return generated_text
 
 
 @router.message(lambda m: m.text and m.text.startswith("🤖 Автогенерация постов"))
@@ -320,20 +377,17 @@ async def process_length(call: CallbackQuery, state: FSMContext):
         # Формируем промпт по параметрам
         prompt = build_basic_prompt(user_data)
         
-        # Генерируем пост
-        generated_text = await generate_article(prompt)
+        # Генерируем пост, показывая текст по мере генерации
+        generated_text = await llm_queue.submit(
+            call.from_user.id, user_data.get("chat_id"),
+            lambda: stream_post(call.message, prompt, "⏳ Генерируем пост...")
+        )
         
         # Сохраняем сгенерированный текст
         await state.update_data(generated_text=generated_text, generation_mode="BASIC")
         
         # Показываем результат с кнопками действий
-        markup = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-            [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-            [InlineKeyboardButton(text="✏️ Редактировать", callback_data="post_edit")],
-            [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-            [InlineKeyboardButton(text="🔧 Изменить параметры", callback_data="post_change_params")]
-        ])
+        markup = post_actions_markup(BASIC_MODE)
         
         await call.message.edit_text(
             f"✅ Пост сгенерирован!\n\n"
@@ -344,6 +398,9 @@ async def process_length(call: CallbackQuery, state: FSMContext):
         
         await state.set_state(AutoGenStates.generated_post)
         
+        # Пока пользователь читает черновик, готовим следующий вариант
+        speculative.start(call.from_user.id, user_data.get("chat_id"), regenerate_prompt(user_data, BASIC_MODE))
+        
     except Exception as e:
         logger.error(f"Error generating post: {str(e)}")
         
@@ -376,25 +433,23 @@ async def process_pro_prompt(message: Message, state: FSMContext):
     # Сохраняем промпт
     await state.update_data(pro_prompt=prompt_text)
     
-    await message.answer("⏳ Генерируем пост на основе вашего промпта...")
+    status_message = await message.answer("⏳ Генерируем пост на основе вашего промпта...")
     
     try:
-        # Генерируем пример
-        generated_text = await generate_article(prompt_text)
+        # Генерируем пример, показывая текст по мере генерации
+        user_data = await state.get_data()
+        generated_text = await llm_queue.submit(
+            message.from_user.id, user_data.get("chat_id"),
+            lambda: stream_post(status_message, prompt_text, "⏳ Генерируем пост...")
+        )
         
         # Сохраняем сгенерированный текст
         await state.update_data(generated_text=generated_text, generation_mode="PRO")
         
         # Показываем результат с кнопками действий
-        markup = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-            [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-            [InlineKeyboardButton(text="✏️ Редактировать", callback_data="post_edit")],
-            [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-            [InlineKeyboardButton(text="📝 Изменить промпт", callback_data="post_change_prompt")]
-        ])
+        markup = post_actions_markup(PRO_MODE)
         
-        await message.answer(
+        await status_message.edit_text(
             f"✅ Пост сгенерирован!\n\n"
             f"{generated_text}\n\n"
             f"Выберите действие:",
@@ -403,9 +458,12 @@ async def process_pro_prompt(message: Message, state: FSMContext):
         
         await state.set_state(AutoGenStates.pro_generated_post)
         
+        # Пока пользователь читает черновик, готовим следующий вариант
+        speculative.start(message.from_user.id, user_data.get("chat_id"), regenerate_prompt(user_data, PRO_MODE))
+        
     except Exception as e:
         logger.error(f"Error generating post in PRO mode: {str(e)}")
-        await message.answer(
+        await status_message.edit_text(
             f"❌ Произошла ошибка при генерации поста: {str(e)}\n\n"
             f"Пожалуйста, попробуйте другой промпт или обратитесь к администратору."
         )
@@ -414,25 +472,29 @@ async def process_pro_prompt(message: Message, state: FSMContext):
 
 # Обработка действий с сгенерированным постом в режиме BASIC
 @router.callback_query(AutoGenStates.generated_post)
-async def process_post_action_basic(call: CallbackQuery, state: FSMContext):
-    await process_post_action(call, state)
+async def process_post_action_basic(call: CallbackQuery, state: FSMContext, session: AsyncSession):
+    await process_post_action(call, state, session)
 
 
 # Обработка действий с сгенерированным постом в режиме PRO
 @router.callback_query(AutoGenStates.pro_generated_post)
-async def process_post_action_pro(call: CallbackQuery, state: FSMContext):
-    await process_post_action(call, state)
+async def process_post_action_pro(call: CallbackQuery, state: FSMContext, session: AsyncSession):
+    await process_post_action(call, state, session)
 
 
-async def process_post_action(call: CallbackQuery, state: FSMContext):
+async def process_post_action(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Обработчик действий с сгенерированным постом"""
     action = call.data.split("_", 1)[1]
     user_data = await state.get_data()
     generation_mode = user_data.get("generation_mode", "BASIC")
     
+    if action in ("publish_now", "change_params", "change_prompt", "batch"):
+        # Подготовленный в фоне вариант больше не понадобится
+        speculative.discard(call.from_user.id)
+    
     if action == "publish_now":
         # Публикуем пост прямо сейчас
-        await publish_post_now(call, state)
+        await publish_post_now(call, state, session)
         
     elif action == "schedule":
         # Запрашиваем дату публикации
@@ -475,32 +537,21 @@ async def process_post_action(call: CallbackQuery, state: FSMContext):
         await call.message.edit_text("⏳ Генерируем новый вариант поста...")
         
         try:
-            if generation_mode == "BASIC":
-                # Для BASIC используем построенный промпт
-                prompt = build_basic_prompt(user_data)
-                prompt += " Создай совершенно другой вариант поста."
-            else:
-                # Для PRO используем готовый промпт
-                prompt = user_data.get("pro_prompt", "")
-                prompt += " Создай совершенно другой вариант."
+            prompt = regenerate_prompt(user_data, generation_mode)
             
-            # Генерируем новый пост
-            generated_text = await generate_article(prompt)
+            # Берем вариант, подготовленный в фоне, или генерируем новый, показывая текст по мере генерации
+            generated_text = await speculative.take(call.from_user.id, prompt)
+            if generated_text is None:
+                generated_text = await llm_queue.submit(
+                    call.from_user.id, user_data.get("chat_id"),
+                    lambda: stream_post(call.message, prompt, "⏳ Генерируем новый вариант поста...", use_cache=False)
+                )
             
             # Сохраняем новый текст
             await state.update_data(generated_text=generated_text)
             
             # Показываем новый пост с кнопками
-            markup = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-                [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-                [InlineKeyboardButton(text="✏️ Редактировать", callback_data="post_edit")],
-                [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-                [InlineKeyboardButton(
-                    text="🔧 Изменить параметры" if generation_mode == "BASIC" else "📝 Изменить промпт",
-                    callback_data="post_change_params" if generation_mode == "BASIC" else "post_change_prompt"
-                )]
-            ])
+            markup = post_actions_markup(generation_mode)
             
             await call.message.edit_text(
                 f"✅ Новый пост сгенерирован!\n\n"
@@ -509,6 +560,9 @@ async def process_post_action(call: CallbackQuery, state: FSMContext):
                 reply_markup=markup
             )
             
+            # Готовим следующий вариант на случай повторной регенерации
+            speculative.start(call.from_user.id, user_data.get("chat_id"), prompt)
+            
         except Exception as e:
             logger.error(f"Error regenerating post: {str(e)}")
             
@@ -522,6 +576,24 @@ async def process_post_action(call: CallbackQuery, state: FSMContext):
                 f"Что делать дальше?",
                 reply_markup=markup
             )
+    elif action == "batch":
+        # Предлагаем выбрать размер пакета черновиков
+        counts = [c for c in (3, 5, 7, 10) if c <= BATCH_MAX_POSTS] or [BATCH_MAX_POSTS]
+        markup = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=f"{c} черновиков", callback_data=f"batch_{c}") for c in counts],
+            [InlineKeyboardButton(text="⬅️ Назад к посту", callback_data="back_to_post")]
+        ])
+        
+        await call.message.edit_text(
+            "📦 <b>Пакет черновиков</b>\n\n"
+            "Будет сгенерировано несколько вариантов по текущим параметрам. "
+            "Черновики сохранятся в базе и не будут опубликованы автоматически.\n\n"
+            "Сколько черновиков создать?",
+            parse_mode="HTML",
+            reply_markup=markup
+        )
+        await state.set_state(AutoGenStates.batch_count)
+        
     elif action == "change_params":
         # Возвращаемся к выбору параметров в режиме BASIC
         await call.message.edit_text(
@@ -574,16 +646,7 @@ async def process_edited_post(message: Message, state: FSMContext):
     generation_mode = user_data.get("generation_mode", "BASIC")
     
     # Показываем отредактированный пост с кнопками действий
-    markup = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-        [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-        [InlineKeyboardButton(text="✏️ Редактировать еще", callback_data="post_edit")],
-        [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-        [InlineKeyboardButton(
-            text="🔧 Изменить параметры" if generation_mode == "BASIC" else "📝 Изменить промпт",
-            callback_data="post_change_params" if generation_mode == "BASIC" else "post_change_prompt"
-        )]
-    ])
+    markup = post_actions_markup(generation_mode, edited=True)
     
     await message.answer(
         f"✅ Пост отредактирован!\n\n"
@@ -607,16 +670,7 @@ async def process_schedule_date(call: CallbackQuery, state: FSMContext):
         generation_mode = user_data.get("generation_mode", "BASIC")
         generated_text = user_data.get("generated_text", "")
         
-        markup = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-            [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-            [InlineKeyboardButton(text="✏️ Редактировать", callback_data="post_edit")],
-            [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-            [InlineKeyboardButton(
-                text="🔧 Изменить параметры" if generation_mode == "BASIC" else "📝 Изменить промпт",
-                callback_data="post_change_params" if generation_mode == "BASIC" else "post_change_prompt"
-            )]
-        ])
+        markup = post_actions_markup(generation_mode)
         
         await call.message.edit_text(
             f"Сгенерированный пост:\n\n"
@@ -714,24 +768,9 @@ async def process_schedule_time(call: CallbackQuery, state: FSMContext):
     generated_text = user_data.get("generated_text", "")
     chat_id = user_data.get("chat_id")
     user_id = call.from_user.id
-    generation_mode = user_data.get("generation_mode", "BASIC")
     
     # Сохраняем параметры генерации в зависимости от режима
-    if generation_mode == "BASIC":
-        generation_params = {
-            "mode": "BASIC",
-            "blog_topic": user_data.get("blog_topic_name"),
-            "content_type": user_data.get("content_type_name"),
-            "themes": user_data.get("themes"),
-            "tone": user_data.get("tone_name"),
-            "structure": {k: v for k, v in user_data.get("structure", {}).items() if v},
-            "length": user_data.get("length_name")
-        }
-    else:
-        generation_params = {
-            "mode": "PRO",
-            "prompt": user_data.get("pro_prompt", "")
-        }
+    generation_params = build_generation_params(user_data)
     
     try:
         async with AsyncSessionLocal() as session:
@@ -750,6 +789,9 @@ async def process_schedule_time(call: CallbackQuery, state: FSMContext):
             session.add(post)
             await session.commit()
             
+            # Подготовленный в фоне вариант больше не понадобится
+            speculative.discard(user_id)
+            
             # Оповещаем пользователя об успешном планировании
             await call.message.edit_text(
                 f"✅ Пост запланирован на {publish_datetime.strftime('%d.%m.%Y %H:%M')}!\n\n"
@@ -770,29 +812,14 @@ async def process_schedule_time(call: CallbackQuery, state: FSMContext):
         )
 
 
-async def publish_post_now(call: CallbackQuery, state: FSMContext):
+async def publish_post_now(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Функция для немедленной публикации поста"""
     user_data = await state.get_data()
     generated_text = user_data.get("generated_text", "")
     chat_id = user_data.get("chat_id")
-    generation_mode = user_data.get("generation_mode", "BASIC")
     
     # Сохраняем параметры генерации в зависимости от режима
-    if generation_mode == "BASIC":
-        generation_params = {
-            "mode": "BASIC",
-            "blog_topic": user_data.get("blog_topic_name"),
-            "content_type": user_data.get("content_type_name"),
-            "themes": user_data.get("themes"),
-            "tone": user_data.get("tone_name"),
-            "structure": {k: v for k, v in user_data.get("structure", {}).items() if v},
-            "length": user_data.get("length_name")
-        }
-    else:
-        generation_params = {
-            "mode": "PRO",
-            "prompt": user_data.get("pro_prompt", "")
-        }
+    generation_params = build_generation_params(user_data)
     
     try:
         # Отправляем сообщение в чат
@@ -802,21 +829,18 @@ async def publish_post_now(call: CallbackQuery, state: FSMContext):
             parse_mode="HTML"
         )
         
-        # Сохраняем пост в БД как опубликованный
-        async with AsyncSessionLocal() as session:
-            post = Post(
-                chat_id=chat_id,
-                text=generated_text,
-                publish_at=datetime.now(timezone.utc),
-                created_by=call.from_user.id,
-                status="approved",
-                published=True,
-                is_generated=True,
-                generation_params=json.dumps(generation_params)
-            )
-            
-            session.add(post)
-            await session.commit()
+        # Сохраняем пост в БД как опубликованный (коммит - в DbSessionMiddleware)
+        session.add(Post(
+            chat_id=chat_id,
+            text=generated_text,
+            publish_at=datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None),
+            created_by=call.from_user.id,
+            status="approved",
+            published=True,
+            is_generated=True,
+            generation_params=json.dumps(generation_params)
+        ))
+        await session.flush()
             
         # Оповещаем пользователя об успешной публикации
         await call.message.edit_text(
@@ -837,6 +861,57 @@ async def publish_post_now(call: CallbackQuery, state: FSMContext):
         )
 
 
+@router.callback_query(AutoGenStates.batch_count, F.data.startswith("batch_"))
+async def process_batch_count(call: CallbackQuery, state: FSMContext):
+    """Генерация пакета черновиков по текущим параметрам"""
+    count = min(int(call.data.split("_")[1]), BATCH_MAX_POSTS)
+    user_data = await state.get_data()
+    chat_id = user_data.get("chat_id")
+    
+    back_markup = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⬅️ Назад к посту", callback_data="back_to_post")]
+    ])
+    
+    if not chat_id:
+        await call.message.edit_text(
+            "⚠️ Не выбран канал для черновиков. Сначала выберите группу или канал.",
+            reply_markup=back_markup
+        )
+        return
+    
+    await call.message.edit_text(f"⏳ Генерируем {count} черновиков...")
+    
+    try:
+        posts = await llm_queue.submit(
+            call.from_user.id, chat_id,
+            lambda: generate_draft_batch(call.from_user.id, chat_id, user_data, count),
+            kind="batch"
+        )
+        
+        if not posts:
+            await call.message.edit_text(
+                "❌ Модель не вернула ни одного варианта. Попробуйте еще раз.",
+                reply_markup=back_markup
+            )
+            return
+        
+        previews = "\n\n".join(
+            f"<b>#{post.id}</b> {html.escape(post.text[:150])}…" for post in posts
+        )
+        await call.message.edit_text(
+            f"✅ Сохранено черновиков: {len(posts)}\n\n{previews}",
+            parse_mode="HTML",
+            reply_markup=back_markup
+        )
+        
+    except Exception as e:
+        logger.error(f"Error generating draft batch: {str(e)}")
+        await call.message.edit_text(
+            f"❌ Произошла ошибка при пакетной генерации: {str(e)}",
+            reply_markup=back_markup
+        )
+
+
 # Обработчики для навигации между состояниями
 @router.callback_query(lambda c: c.data == "regenerate_basic")
 async def regenerate_basic_post(call: CallbackQuery, state: FSMContext):
@@ -849,20 +924,17 @@ async def regenerate_basic_post(call: CallbackQuery, state: FSMContext):
         # Формируем промпт по параметрам
         prompt = build_basic_prompt(user_data)
         
-        # Генерируем пост
-        generated_text = await generate_article(prompt)
+        # Генерируем пост, показывая текст по мере генерации
+        generated_text = await llm_queue.submit(
+            call.from_user.id, user_data.get("chat_id"),
+            lambda: stream_post(call.message, prompt, "⏳ Генерируем пост...", use_cache=False)
+        )
         
         # Сохраняем сгенерированный текст
         await state.update_data(generated_text=generated_text, generation_mode="BASIC")
         
         # Показываем результат с кнопками действий
-        markup = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-            [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-            [InlineKeyboardButton(text="✏️ Редактировать", callback_data="post_edit")],
-            [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-            [InlineKeyboardButton(text="🔧 Изменить параметры", callback_data="post_change_params")]
-        ])
+        markup = post_actions_markup(BASIC_MODE)
         
         await call.message.edit_text(
             f"✅ Пост сгенерирован!\n\n"
@@ -873,6 +945,9 @@ async def regenerate_basic_post(call: CallbackQuery, state: FSMContext):
         
         await state.set_state(AutoGenStates.generated_post)
         
+        # Пока пользователь читает черновик, готовим следующий вариант
+        speculative.start(call.from_user.id, user_data.get("chat_id"), regenerate_prompt(user_data, BASIC_MODE))
+        
     except Exception as e:
         logger.error(f"Error regenerating post: {str(e)}")
         
@@ -914,16 +989,7 @@ async def back_to_post_view(call: CallbackQuery, state: FSMContext):
     generation_mode = user_data.get("generation_mode", "BASIC")
     generated_text = user_data.get("generated_text", "")
     
-    markup = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📢 Опубликовать сейчас", callback_data="post_publish_now")],
-        [InlineKeyboardButton(text="🕒 Запланировать публикацию", callback_data="post_schedule")],
-        [InlineKeyboardButton(text="✏️ Редактировать", callback_data="post_edit")],
-        [InlineKeyboardButton(text="🔄 Сгенерировать другой вариант", callback_data="post_regenerate")],
-        [InlineKeyboardButton(
-            text="🔧 Изменить параметры" if generation_mode == "BASIC" else "📝 Изменить промпт",
-            callback_data="post_change_params" if generation_mode == "BASIC" else "post_change_prompt"
-        )]
-    ])
+    markup = post_actions_markup(generation_mode)
     
     await call.message.edit_text(
         f"Сгенерированный пост:\n\n"
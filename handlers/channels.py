@@ -8,10 +8,12 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy import select, text  # Добавьте импорт text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
+from database.cache import get_user, invalidate_user
 from database.db import AsyncSessionLocal
-from database.models import User, Group
+from database.models import Group
 from utils.keyboards import create_channels_keyboard, create_main_keyboard
 
 router = Router()
@@ -37,11 +39,11 @@ async def add_channel_callback(call: CallbackQuery, state: FSMContext):
     )
 
 @router.callback_query(lambda c: c.data == "back_to_channels")
-async def back_to_channels(call: CallbackQuery):
+async def back_to_channels(call: CallbackQuery, session: AsyncSession):
     """Возврат к списку каналов"""
     user_id = call.from_user.id
     try:
-        keyboard = await create_channels_keyboard(user_id)
+        keyboard = await create_channels_keyboard(user_id, session)
         await call.message.edit_text(
             "📝 <b>Выберите канал или группу для работы</b>\n\n"
             "Выберите одну из подключенных групп/каналов или добавьте новую.",
@@ -157,13 +159,12 @@ async def process_channel_message(message: Message, state: FSMContext):
                 await session.commit()
                 
                 # Обновляем текущий выбранный канал пользователя
-                user_q = select(User).filter(User.user_id == user_id)
-                user_result = await session.execute(user_q)
-                user = user_result.scalar_one_or_none()
+                user = await get_user(session, user_id)
                 
                 if user:
                     user.current_chat_id = channel_id
                     await session.commit()
+                    invalidate_user(user_id)
                 
                 # Уведомляем об успешном добавлении
                 await message.answer(
@@ -172,7 +173,7 @@ async def process_channel_message(message: Message, state: FSMContext):
                 )
                 
                 # Показываем список каналов для выбора
-                keyboard = await create_channels_keyboard(user_id)
+                keyboard = await create_channels_keyboard(user_id, session)
                 await message.answer(
                     "📝 <b>Выберите канал или группу для работы</b>",
                     parse_mode="HTML",
@@ -238,13 +239,12 @@ async def process_display_name(message: Message, state: FSMContext):
             group_id = result.scalar_one_or_none()
             
             # Обновляем текущий выбранный канал пользователя
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id)
             
             if user and group_id:
                 user.current_chat_id = group_id
                 await session.commit()
+                invalidate_user(user_id)
             
             await message.answer(
                 f"✅ Канал {channel_username} успешно добавлен как \"{display_name}\"!\n\n"
@@ -254,7 +254,7 @@ async def process_display_name(message: Message, state: FSMContext):
             )
             
             # Показываем список каналов для выбора
-            keyboard = await create_channels_keyboard(user_id)
+            keyboard = await create_channels_keyboard(user_id, session)
             await message.answer(
                 "📝 <b>Выберите канал или группу для работы</b>",
                 parse_mode="HTML",
@@ -346,13 +346,12 @@ async def connect_group(message: Message):
             await session.commit()
             
             # Обновляем текущий выбранный канал пользователя
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id)
             
             if user:
                 user.current_chat_id = chat_id
                 await session.commit()
+                invalidate_user(user_id)
             
             # Отправляем подтверждение в группу
             await message.answer(
@@ -373,13 +372,13 @@ async def connect_group(message: Message):
 
 
 @router.message(lambda m: m.text == "Сменить группу")
-async def change_group(message: Message):
+async def change_group(message: Message, session: AsyncSession):
     """Обработка кнопки 'Сменить группу' из основного меню"""
     user_id = message.from_user.id
     
     try:
         # Создаем клавиатуру с каналами пользователя
-        keyboard = await create_channels_keyboard(user_id)
+        keyboard = await create_channels_keyboard(user_id, session)
         
         await message.answer(
             "📝 <b>Выберите канал или группу для работы</b>\n\n"
@@ -393,13 +392,13 @@ async def change_group(message: Message):
         await message.answer("⚠️ Произошла ошибка при получении списка каналов. Пожалуйста, попробуйте позже.")
 
 @router.message(Command('channels'))
-async def cmd_channels(message: Message):
+async def cmd_channels(message: Message, session: AsyncSession):
     """Обработка команды /channels для просмотра списка каналов"""
     user_id = message.from_user.id
     
     try:
         # Создаем клавиатуру с каналами пользователя
-        keyboard = await create_channels_keyboard(user_id)
+        keyboard = await create_channels_keyboard(user_id, session)
         
         await message.answer(
             "📝 <b>Выберите канал или группу для работы</b>\n\n"
@@ -441,13 +440,12 @@ async def process_channel_selection(call: CallbackQuery, state: FSMContext):
             logger.info(f"Found channel: {channel.title}, chat_id: {channel.chat_id}")
             
             # Обновляем текущий выбранный канал пользователя
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id)
             
             if user:
                 user.current_chat_id = channel.chat_id
                 await session.commit()
+                invalidate_user(user_id)
                 logger.info(f"Updated user current_chat_id to {channel.chat_id}")
             
             # Сохраняем данные о выбранном канале в состоянии
@@ -557,13 +555,13 @@ async def history_handler(message: Message, state: FSMContext):
 
 
 @router.message(lambda m: m.text == "↩️ Назад" or m.text == "🔙 Сменить группу" or m.text == "Сменить группу")
-async def back_to_channels_list(message: Message, state: FSMContext):
+async def back_to_channels_list(message: Message, state: FSMContext, session: AsyncSession):
     """Обработчик кнопки 'Назад'/'Сменить группу'"""
     user_id = message.from_user.id
     
     try:
         # Создаем клавиатуру с каналами пользователя
-        keyboard = await create_channels_keyboard(user_id)
+        keyboard = await create_channels_keyboard(user_id, session)
         
         await message.answer(
             "📝 <b>Выберите канал или группу для работы</b>\n\n"
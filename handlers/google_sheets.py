@@ -11,8 +11,10 @@ from aiogram.fsm.storage.base import StorageKey
 
 from sqlalchemy import select
 from sqlalchemy import func, and_
-from sqlalchemy import select, text
+from sqlalchemy import select
 
+from database.cache import get_group, get_user
+from database.crud import get_active_sheets, get_sheet_stats_by_chat
 from database.db import AsyncSessionLocal
 from database.models import User, GoogleSheet, Group
 from utils.google_sheets import GoogleSheetsClient
@@ -39,24 +41,18 @@ async def sheets_menu(message: Message, state: FSMContext):
     
     try:
         async with AsyncSessionLocal() as session:
-            user = await session.scalar(select(User).filter(User.user_id == user_id))
+            user = await get_user(session, user_id)
             if not user or not user.current_chat_id:
                 await message.answer("⚠️ Сначала выберите канал или группу.")
                 return
             
-            channel = await session.scalar(select(Group).filter(Group.chat_id == user.current_chat_id))
+            channel = await get_group(session, user.current_chat_id)
             if not channel:
                 await message.answer("❌ Канал не найден.")
                 return
             
             # Запрос активных таблиц
-            active_sheets = await session.scalars(
-                select(GoogleSheet).filter(
-                    GoogleSheet.chat_id == channel.chat_id,
-                    GoogleSheet.is_active == True
-                )
-            )
-            active_sheets_list = active_sheets.all()
+            active_sheets_list = await get_active_sheets(session, channel.chat_id)
             
             # Логирование для отладки
             logger.info(f"Активные таблицы: {active_sheets_list}")
@@ -71,7 +67,7 @@ async def sheets_menu(message: Message, state: FSMContext):
             active_sheet_id = None
             if active_sheets_list:
                 for sheet in active_sheets_list:
-                    if sheet.is_active == 1 or sheet.is_active is True:
+                    if sheet.is_active:
                         has_active_sheets = True
                         active_sheet_id = sheet.id
                         logger.info(f"Found active sheet: ID={active_sheet_id}, is_active={sheet.is_active}")
@@ -116,24 +112,18 @@ async def open_sheets_menu_handler(call: CallbackQuery, state: FSMContext):
     
     try:
         async with AsyncSessionLocal() as session:
-            user = await session.scalar(select(User).filter(User.user_id == user_id))
+            user = await get_user(session, user_id)
             if not user or not user.current_chat_id:
                 await call.answer("⚠️ Сначала выберите канал или группу.", show_alert=True)
                 return
             
-            channel = await session.scalar(select(Group).filter(Group.chat_id == user.current_chat_id))
+            channel = await get_group(session, user.current_chat_id)
             if not channel:
                 await call.answer("❌ Канал не найден.", show_alert=True)
                 return
             
             # Запрос активных таблиц
-            active_sheets = await session.scalars(
-                select(GoogleSheet).filter(
-                    GoogleSheet.chat_id == channel.chat_id,
-                    GoogleSheet.is_active == True
-                )
-            )
-            active_sheets_list = active_sheets.all()
+            active_sheets_list = await get_active_sheets(session, channel.chat_id)
             
             # Логирование для отладки
             logger.info(f"Active sheets list from open_sheets_menu: {len(active_sheets_list)}")
@@ -143,7 +133,7 @@ async def open_sheets_menu_handler(call: CallbackQuery, state: FSMContext):
             active_sheet_id = None
             if active_sheets_list:
                 for sheet in active_sheets_list:
-                    if sheet.is_active == 1 or sheet.is_active is True:
+                    if sheet.is_active:
                         has_active_sheets = True
                         active_sheet_id = sheet.id
                         logger.info(f"Found active sheet: ID={active_sheet_id}")
@@ -276,7 +266,7 @@ async def sheet_connect_callback(call: CallbackQuery, state: FSMContext):
     try:
         async with AsyncSessionLocal() as session:
             # Получаем текущий выбранный канал пользователя
-            user = await session.scalar(select(User).filter(User.user_id == user_id))
+            user = await get_user(session, user_id)
             
             if not user or not user.current_chat_id:
                 await call.answer("⚠️ Сначала выберите канал или группу", show_alert=True)
@@ -356,9 +346,7 @@ async def sync_sheets_now_callback(call: CallbackQuery):
             )
             
             # Получаем информацию о подключенных таблицах для этого канала
-            sheets_q = select(GoogleSheet).filter(GoogleSheet.chat_id == channel_id, GoogleSheet.is_active == True)
-            sheets_result = await session.execute(sheets_q)
-            sheets = sheets_result.scalars().all()
+            sheets = await get_active_sheets(session, channel_id)
             
             if not sheets:
                 await status_message.edit_text(
@@ -492,9 +480,7 @@ async def sync_sheet_command(message: Message):
             channel_id = user.current_chat_id
             
             # Получаем информацию о подключенных таблицах для этого канала
-            sheets_q = select(GoogleSheet).filter(GoogleSheet.chat_id == channel_id, GoogleSheet.is_active == True)
-            sheets_result = await session.execute(sheets_q)
-            sheets = sheets_result.scalars().all()
+            sheets = await get_active_sheets(session, channel_id)
             
             if not sheets:
                 await message.answer("⚠️ У выбранного канала нет активных подключений к Google Таблицам.")
@@ -794,15 +780,13 @@ async def fix_db_sheets(message: Message):
             await message.answer("⚠️ У вас недостаточно прав для выполнения этой команды.")
             return
         
-        # Получаем все записи таблиц в БД
-        sheets_q = select(GoogleSheet)
-        sheets_result = await session.execute(sheets_q)
-        all_sheets = sheets_result.scalars().all()
+        # Статистика по каналам: агрегация и названия каналов одним запросом
+        stats_by_chat = await get_sheet_stats_by_chat(session)
         
         # Статистика для отчета
-        total_sheets = len(all_sheets)
-        active_sheets = len([s for s in all_sheets if s.is_active])
-        inactive_sheets = total_sheets - active_sheets
+        active_sheets = sum(n_active for _, _, n_active, _ in stats_by_chat)
+        inactive_sheets = sum(n_inactive for _, _, _, n_inactive in stats_by_chat)
+        total_sheets = active_sheets + inactive_sheets
         
         await message.answer(
             f"📊 <b>Статистика таблиц в БД:</b>\n\n"
@@ -812,33 +796,10 @@ async def fix_db_sheets(message: Message):
             parse_mode="HTML"
         )
         
-        # Для проверки состояния по каналам
-        channels_dict = {}
-        for sheet in all_sheets:
-            if sheet.chat_id not in channels_dict:
-                channels_dict[sheet.chat_id] = {"active": 0, "inactive": 0}
-            
-            if sheet.is_active:
-                channels_dict[sheet.chat_id]["active"] += 1
-            else:
-                channels_dict[sheet.chat_id]["inactive"] += 1
-        
-        # Статистика по каналам
-        channels_info = []
-        for chat_id, stats in channels_dict.items():
-            try:
-                group_q = select(Group).filter(Group.chat_id == chat_id)
-                group_result = await session.execute(group_q)
-                group = group_result.scalar_one_or_none()
-                name = group.title if group else f"Канал #{chat_id}"
-                channels_info.append(
-                    f"- {name}: активных {stats['active']}, неактивных {stats['inactive']}"
-                )
-            except Exception as e:
-                logger.error(f"Error getting channel info: {e}")
-                channels_info.append(
-                    f"- Канал #{chat_id}: активных {stats['active']}, неактивных {stats['inactive']}"
-                )
+        channels_info = [
+            f"- {title or f'Канал #{chat_id}'}: активных {n_active}, неактивных {n_inactive}"
+            for chat_id, title, n_active, n_inactive in stats_by_chat
+        ]
         
         if channels_info:
             await message.answer(
@@ -862,9 +823,7 @@ async def fix_sheets_confirm(call: CallbackQuery):
     try:
         async with AsyncSessionLocal() as session:
             # Получаем все активные записи таблиц
-            sheets_q = select(GoogleSheet).filter(GoogleSheet.is_active == True)
-            sheets_result = await session.execute(sheets_q)
-            active_sheets = sheets_result.scalars().all()
+            active_sheets = await get_active_sheets(session)
             
             count = len(active_sheets)
             
@@ -899,31 +858,19 @@ async def return_to_sheets_menu(call: CallbackQuery, state: FSMContext):
     
     try:
         async with AsyncSessionLocal() as session:
-            user = await session.scalar(select(User).filter(User.user_id == user_id))
+            user = await get_user(session, user_id)
             if not user or not user.current_chat_id:
                 await call.message.edit_text("⚠️ Сначала выберите канал или группу.")
                 return
             
-            channel = await session.scalar(select(Group).filter(Group.chat_id == user.current_chat_id))
+            channel = await get_group(session, user.current_chat_id)
             if not channel:
                 await call.message.edit_text("❌ Канал не найден.")
                 return
             
-            # Используем прямой SQL-запрос только для логирования
-            check_query = text(f"SELECT COUNT(*) FROM google_sheets WHERE chat_id = {channel.chat_id} AND is_active = 1")
-            check_result = await session.execute(check_query)
-            check_count = check_result.scalar_one()
-            logger.info(f"SQL query count for active sheets: {check_count}")
-            
-            # Запрос активных таблиц через ORM
-            active_sheets_list = await session.scalars(
-                select(GoogleSheet).filter(
-                    GoogleSheet.chat_id == channel.chat_id,
-                    GoogleSheet.is_active == True
-                )
-            )
-            active_sheets = active_sheets_list.all()
-            logger.info(f"ORM query found {len(active_sheets)} active sheets")
+            # Запрос активных таблиц (отдельный COUNT для лога не нужен)
+            active_sheets = await get_active_sheets(session, channel.chat_id)
+            logger.info(f"Found {len(active_sheets)} active sheets")
             
             # Всегда создаем базовую клавиатуру только с кнопкой добавления
             buttons = [
@@ -1,9 +1,8 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
+from database.crud import get_user_channels
 from database.db import AsyncSessionLocal
-from database.models import Group
 # Заменяем импорт главного меню
 from utils.keyboards import create_main_keyboard
 import logging
@@ -28,23 +27,9 @@ async def choose_group(message: Message):
         # получить все группы, которые добавил этот пользователя
         async with AsyncSessionLocal() as session:
             try:
-                # Сначала проверим существование таблицы
                 try:
-                    # Безопасный запрос - получаем все группы без фильтра
-                    query = select(Group)
-                    result = await session.execute(query)
-                    groups = result.scalars().all()
-                    
-                    # Если есть группы и поле added_by существует, 
-                    # попробуем отфильтровать только для текущего пользователя
-                    if groups:
-                        try:
-                            user_id = message.from_user.id
-                            filtered_groups = [g for g in groups if hasattr(g, 'added_by') and g.added_by == user_id]
-                            if filtered_groups:
-                                groups = filtered_groups
-                        except Exception as filter_err:
-                            logger.error(f"Error filtering groups: {filter_err}")
+                    # Только группы пользователя: фильтр по added_by выполняется в SQL
+                    groups = await get_user_channels(session, message.from_user.id)
                 except Exception as e:
                     logger.error(f"Error getting groups: {e}")
                     groups = []
@@ -2,6 +2,8 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, Chat
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select, delete
+from database.cache import invalidate_group
+from database.crud import get_user_channel, get_user_channels
 from database.db import AsyncSessionLocal
 from database.models import Group
 # Заменяем импорт главного меню
@@ -18,9 +20,7 @@ async def open_group_settings(call: CallbackQuery):
     try:
         # Получаем список групп пользователя
         async with AsyncSessionLocal() as session:
-            query = select(Group).where(Group.added_by == call.from_user.id)
-            result = await session.execute(query)
-            groups = result.scalars().all()
+            groups = await get_user_channels(session, call.from_user.id)
         
         if not groups:
             await call.message.edit_text(
@@ -110,9 +110,7 @@ async def delete_group(message: Message):
         # Удаляем группу из БД
         async with AsyncSessionLocal() as session:
             # Проверяем, есть ли такая группа у пользователя
-            query = select(Group).where(Group.chat_id == chat_id, Group.added_by == message.from_user.id)
-            result = await session.execute(query)
-            group = result.scalars().first()
+            group = await get_user_channel(session, message.from_user.id, chat_id)
             
             if not group:
                 await message.answer(f"❌ Группа с ID {chat_id} не найдена или не принадлежит вам.")
@@ -121,6 +119,7 @@ async def delete_group(message: Message):
             # Удаляем группу
             await session.execute(delete(Group).where(Group.id == group.id))
             await session.commit()
+            invalidate_group(chat_id)
             
             await message.answer(f"✅ Группа «{group.title}» удалена!")
     
@@ -137,9 +136,7 @@ async def group_settings_button(message: Message):
     try:
         # Получаем список групп пользователя
         async with AsyncSessionLocal() as session:
-            query = select(Group).where(Group.added_by == message.from_user.id)
-            result = await session.execute(query)
-            groups = result.scalars().all()
+            groups = await get_user_channels(session, message.from_user.id)
         
         if not groups:
             await message.answer(
@@ -46,39 +46,55 @@ async def show_history(message: Message, state: FSMContext):
 # Обновите файл handlers/history.py
 
 import logging
+from typing import Optional
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+from config import LIST_PAGE_SIZE
+from database.crud import get_history_page
 from database.db import AsyncSessionLocal
 from database.models import Post, Group
+from utils.pagination import NEXT, page_buttons, parse_page_callback
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Префикс callback_data кнопок листания истории
+HISTORY_PAGE_PREFIX = "history_page"
+
 @router.message(lambda m: m.text == "📜 История" or m.text == "История публикаций")
-async def history_command(message: Message, state: FSMContext):
+async def history_command(message: Message, state: FSMContext, session: AsyncSession):
     """Обработчик команды истории публикаций через текстовую кнопку"""
-    user_data = await state.get_data()
-    current_channel = user_data.get("current_channel_title", "текущем канале")
-    
-    # Здесь код для отображения истории публикаций
-    await show_history(message, state, is_callback=False)
+    await show_history(message, state, session, is_callback=False)
 
 @router.callback_query(F.data == "post_history")
-async def history_callback(call: CallbackQuery, state: FSMContext):
+async def history_callback(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Обработчик инлайн-кнопки 'История публикаций'"""
     logger.info(f"History callback received: {call.data}")
-    
-    # Здесь код для отображения истории публикаций через callback
-    await show_history(call, state, is_callback=True)
+    await show_history(call, state, session, is_callback=True)
+
+
+@router.callback_query(F.data.startswith(f"{HISTORY_PAGE_PREFIX}:"))
+async def history_page_callback(call: CallbackQuery, state: FSMContext, session: AsyncSession):
+    """Переход по страницам истории: курсор в callback_data"""
+    direction, cursor = parse_page_callback(call.data)
+    await show_history(call, state, session, is_callback=True, cursor=cursor, direction=direction)
 
 
-async def show_history(source, state: FSMContext, is_callback=False):
-    """Общая функция для отображения истории публикаций"""
+async def show_history(
+    source,
+    state: FSMContext,
+    session: AsyncSession,
+    is_callback=False,
+    cursor: Optional[str] = None,
+    direction: str = NEXT,
+):
+    """Общая функция для отображения истории публикаций (страница от курсора)"""
     try:
         user_data = await state.get_data()
         current_channel = user_data.get("current_channel_title", "текущий канал")
@@ -94,56 +110,47 @@ async def show_history(source, state: FSMContext, is_callback=False):
         
         chat_id = user_data["chat_id"]
         
-        async with AsyncSessionLocal() as session:
-            # Получаем опубликованные посты за последние 30 дней
-            now = datetime.now(ZoneInfo("Europe/Moscow"))
-            month_ago = now - timedelta(days=30)
-            
-            query = (
-                select(Post)
-                .filter(
-                    Post.chat_id == chat_id,
-                    Post.published == True,
-                    Post.publish_at >= month_ago
-                )
-                .order_by(Post.publish_at.desc())
-            )
-            
-            result = await session.execute(query)
-            published_posts = result.scalars().all()
-            
-            if not published_posts:
-                # Если нет опубликованных постов
-                history_text = f"📋 <b>История публикаций канала \"{current_channel}\"</b>\n\n" \
-                              f"За последние 30 дней не было опубликовано ни одного поста."
-            else:
-                # Если есть опубликованные посты
-                posts_text = "\n\n".join([
-                    f"📤 <b>{post.publish_at.strftime('%d.%m.%Y %H:%M')}</b>\n"
-                    f"{post.text[:100]}{'...' if len(post.text) > 100 else ''}"
-                    for post in published_posts[:10]  # Ограничиваем до 10 постов
-                ])
-                
-                history_text = f"📋 <b>История публикаций канала \"{current_channel}\"</b>\n\n" \
-                              f"{posts_text}\n\n" \
-                              f"Всего опубликовано: {len(published_posts)} постов за 30 дней."
-            
-            # Создаем клавиатуру с кнопкой возврата
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")]
+        # Опубликованные посты за последние 30 дней, новые сверху
+        # (publish_at хранится в московском времени без таймзоны)
+        now = datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None)
+        month_ago = now - timedelta(days=30)
+        page = await get_history_page(session, chat_id, month_ago, LIST_PAGE_SIZE, cursor, direction)
+        
+        if not page.items:
+            # Если нет опубликованных постов
+            history_text = f"📋 <b>История публикаций канала \"{current_channel}\"</b>\n\n" \
+                          f"За последние 30 дней не было опубликовано ни одного поста."
+        else:
+            # Если есть опубликованные посты
+            posts_text = "\n\n".join([
+                f"📤 <b>{post.publish_at.strftime('%d.%m.%Y %H:%M')}</b>\n"
+                f"{post.preview or ''}"
+                for post in page.items
             ])
             
-            # Отправляем сообщение с историей
-            if is_callback:
-                try:
-                    await source.message.edit_text(history_text, parse_mode="HTML", reply_markup=keyboard)
-                    await source.answer()
-                except Exception as e:
-                    logger.error(f"Error editing message: {e}")
-                    await source.message.answer(history_text, parse_mode="HTML", reply_markup=keyboard)
-                    await source.answer()
-            else:
-                await source.answer(history_text, parse_mode="HTML", reply_markup=keyboard)
+            history_text = f"📋 <b>История публикаций канала \"{current_channel}\"</b>\n\n" \
+                          f"{posts_text}\n\n" \
+                          f"Всего опубликовано: {page.total} постов за 30 дней."
+        
+        # Клавиатура: листание страниц и кнопка возврата
+        inline_keyboard = []
+        nav_buttons = page_buttons(HISTORY_PAGE_PREFIX, page)
+        if nav_buttons:
+            inline_keyboard.append(nav_buttons)
+        inline_keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")])
+        keyboard = InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+        
+        # Отправляем сообщение с историей
+        if is_callback:
+            try:
+                await source.message.edit_text(history_text, parse_mode="HTML", reply_markup=keyboard)
+                await source.answer()
+            except Exception as e:
+                logger.error(f"Error editing message: {e}")
+                await source.message.answer(history_text, parse_mode="HTML", reply_markup=keyboard)
+                await source.answer()
+        else:
+            await source.answer(history_text, parse_mode="HTML", reply_markup=keyboard)
                 
     except Exception as e:
         logger.error(f"Error showing history: {e}")
@@ -1,4 +1,4 @@
-from typing import Union  # Добавьте этот импорт
+from typing import Optional, Union  # Добавьте этот импорт
 from aiogram import Router, F
 from aiogram.types import (
     Message,
@@ -13,6 +13,8 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import logging
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from database.db import AsyncSessionLocal
 from database.models import Post, Group
 from states.post_states import ManualPostStates
@@ -330,7 +332,7 @@ async def cancel_creation(call: CallbackQuery, state: FSMContext):
 
 # ── публикация «сейчас» ────────────────────────────────────────
 @router.callback_query(F.data == "manual_publish_now")
-async def publish_now(call: CallbackQuery, state: FSMContext):
+async def publish_now(call: CallbackQuery, state: FSMContext, session: AsyncSession, current_group: Optional[Group]):
     """Публикация поста сейчас."""
     logger.info("Publishing post now")
     data = await state.get_data()
@@ -345,21 +347,14 @@ async def publish_now(call: CallbackQuery, state: FSMContext):
         await state.clear()
         return
 
-    # 1) Получаем chat_id
-    try:
-        async with AsyncSessionLocal() as session:
-            group = await session.get(Group, group_pk)
-            if not group:
-                await call.message.edit_text("❌ Ошибка: выбранная группа не найдена.")
-                await state.clear()
-                return
-            chat_id = group.chat_id
-            logger.info(f"Found group: {group.title}, chat_id: {chat_id}")
-    except Exception as e:
-        logger.error(f"Error getting group: {e}")
-        await call.message.edit_text(f"❌ Ошибка при получении группы: {e}")
+    # 1) Группа уже загружена DbSessionMiddleware по group_id из состояния
+    group = current_group
+    if not group:
+        await call.message.edit_text("❌ Ошибка: выбранная группа не найдена.")
         await state.clear()
         return
+    chat_id = group.chat_id
+    logger.info(f"Found group: {group.title}, chat_id: {chat_id}")
 
     # 2) Проверяем содержимое
     if not text and not media_file_id:
@@ -387,24 +382,26 @@ async def publish_now(call: CallbackQuery, state: FSMContext):
         return
 
     # 4) Сохраняем запись в БД
-    now_msk = datetime.now(ZoneInfo("Europe/Moscow"))
-    async with AsyncSessionLocal() as session:
-        try:
-            post = Post(
-                chat_id=chat_id,
-                text=text,
-                media_file_id=media_file_id,
-                publish_at=now_msk,
-                created_by=call.from_user.id,
-                status="sent",
-                published=True
-            )
-            session.add(post)
-            await session.commit()
-            logger.info(f"Post saved to database with ID {post.id}")
-        except Exception as e:
-            logger.error(f"Error saving post to database: {e}")
-            # Продолжаем выполнение, так как сообщение уже отправлено
+    # publish_at хранится в московском времени без таймзоны
+    now_msk = datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None)
+    try:
+        post = Post(
+            chat_id=chat_id,
+            text=text,
+            media_file_id=media_file_id,
+            publish_at=now_msk,
+            created_by=call.from_user.id,
+            status="sent",
+            published=True
+        )
+        session.add(post)
+        # Коммит сделает DbSessionMiddleware после хэндлера; flush выдает ID сразу
+        await session.flush()
+        logger.info(f"Post saved to database with ID {post.id}")
+    except Exception as e:
+        logger.error(f"Error saving post to database: {e}")
+        await session.rollback()
+        # Продолжаем выполнение, так как сообщение уже отправлено
 
     # 5) Успех и возврат в главное меню
     await call.message.edit_text("✅ Пост опубликован!")
@@ -504,11 +501,13 @@ async def confirm_manual(call: CallbackQuery, state: FSMContext):
             return
             
         chat_id = group.chat_id
+        # Время вводится в московском поясе; в БД - без таймзоны
+        publish_at = data.get("publish_at")
         post = Post(
             chat_id=chat_id,
             text=text,
             media_file_id=media_file_id,
-            publish_at=data.get("publish_at"),
+            publish_at=publish_at.replace(tzinfo=None) if publish_at else None,
             created_by=call.from_user.id,
             status="approved",
         )
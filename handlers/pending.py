@@ -1,8 +1,8 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from database.crud import get_pending_series_posts
 from database.db import AsyncSessionLocal
-from database.models import Post   # вместо GeneratedPost
-from sqlalchemy import select
+from database.models import GeneratedPost
 from aiogram.fsm.context import FSMContext
 from datetime import datetime
 from zoneinfo import ZoneInfo          # ← добавили
@@ -14,18 +14,11 @@ router = Router()
 @router.message(lambda m: m.text and m.text.startswith("🕓 Ожидают публикации"))
 async def show_pending(message: Message, state: FSMContext):
     async with AsyncSessionLocal() as session:
-        posts = (
-            await session.execute(
-                select(GeneratedPost)
-                .join(GeneratedSeries)
-                .where(
-                    GeneratedSeries.chat_id == message.chat.id,
-                    GeneratedPost.publish_at > datetime.now(ZoneInfo("Europe/Moscow")),  # ← заменили
-                    GeneratedPost.status.in_(["pending", "approved"]),
-                )
-                .order_by(GeneratedPost.publish_at)
-            )
-        ).scalars().all()
+        posts = await get_pending_series_posts(
+            session,
+            (await state.get_data()).get("chat_id", message.chat.id),
+            datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None),
+        )
 
         if not posts:
             await message.answer("Сейчас нет постов на премодерации.")
@@ -35,7 +28,7 @@ async def show_pending(message: Message, state: FSMContext):
             text = (
                 f"🕓 <strong>{p.publish_at:%d.%m %H:%M}</strong>\n"
                 f"Статус: {'⏳ Не проверен' if p.status == 'pending' else '✅ Одобрен'}\n\n"
-                f"{p.text[:100]}…"
+                f"{p.preview or ''}"
             )
             kb = (
                 InlineKeyboardMarkup(
@@ -0,0 +1,116 @@
+# handlers/post_import.py
+import html
+import logging
+from typing import Optional
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import IMPORT_MAX_ROWS
+from database.crud import get_user_channels
+from database.models import Group
+from utils.post_import import ImportFormatError, import_posts
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+# Telegram отдает ботам файлы до 20 МБ
+MAX_FILE_SIZE = 20 * 1024 * 1024
+# Сколько ошибок по строкам показывать в ответе
+MAX_REPORTED_ERRORS = 20
+
+
+class PostImportStates(StatesGroup):
+    """Ожидание файла контент-плана"""
+    waiting_for_file = State()
+
+
+def cancel_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text="❌ Отмена", callback_data="import_cancel")]]
+    )
+
+
+@router.message(Command("import"))
+async def cmd_import(message: Message, state: FSMContext, current_group: Optional[Group]):
+    """Запрашивает файл контент-плана для массового импорта"""
+    channel = f"«{html.escape(current_group.title)}»" if current_group else "не выбран (укажите chat_id в каждой строке)"
+    await state.set_state(PostImportStates.waiting_for_file)
+    await message.answer(
+        "📥 <b>Импорт контент-плана</b>\n\n"
+        "Пришлите файл .csv (с заголовком) или .json (список объектов) с колонками:\n"
+        "• <code>publish_at</code> — ДД.ММ.ГГГГ ЧЧ:ММ (московское время)\n"
+        "• <code>text</code> — текст поста\n"
+        "• <code>chat_id</code> — канал (необязательно)\n"
+        "• <code>media_file_id</code> — file_id фото (необязательно)\n\n"
+        f"Текущий канал: {channel}\n"
+        f"Не больше {IMPORT_MAX_ROWS} строк. Если в файле есть ошибки, ничего не сохраняется.",
+        parse_mode="HTML",
+        reply_markup=cancel_keyboard(),
+    )
+
+
+@router.callback_query(F.data == "import_cancel")
+async def cancel_import(call: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await call.message.edit_text("Импорт отменен.")
+    await call.answer()
+
+
+@router.message(PostImportStates.waiting_for_file, F.document)
+async def process_import_file(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession,
+    current_group: Optional[Group],
+):
+    """Проверяет файл и сохраняет посты одной транзакцией"""
+    document = message.document
+    if document.file_size and document.file_size > MAX_FILE_SIZE:
+        return await message.answer("⛔️ Файл больше 20 МБ.", reply_markup=cancel_keyboard())
+
+    channels = await get_user_channels(session, message.from_user.id)
+    # Сессия апдейта больше не нужна - импорт идет своей транзакцией
+    await session.commit()
+
+    content = await message.bot.download(document)
+    try:
+        result = await import_posts(
+            document.file_name or "",
+            content.read(),
+            created_by=message.from_user.id,
+            allowed_chats=[channel.chat_id for channel in channels],
+            default_chat_id=current_group.chat_id if current_group else None,
+        )
+    except ImportFormatError as e:
+        return await message.answer(f"⛔️ Не удалось прочитать файл: {html.escape(str(e))}", reply_markup=cancel_keyboard())
+    except Exception as e:
+        logger.error(f"Error importing posts from {document.file_name}: {e}")
+        await state.clear()
+        return await message.answer("⚠️ Ошибка при сохранении постов, попробуйте позже.")
+
+    if result.errors:
+        lines = [f"• строка {line}: {html.escape(error)}" for line, error in result.errors[:MAX_REPORTED_ERRORS]]
+        more = len(result.errors) - MAX_REPORTED_ERRORS
+        if more > 0:
+            lines.append(f"… и еще {more}")
+        return await message.answer(
+            f"⛔️ Ошибок: {len(result.errors)} из {result.total} строк, посты не сохранены.\n\n"
+            + "\n".join(lines)
+            + "\n\nИсправьте файл и пришлите его снова.",
+            reply_markup=cancel_keyboard(),
+        )
+
+    await state.clear()
+    if not result.imported:
+        return await message.answer("Файл пуст - нечего импортировать.")
+    await message.answer(f"✅ Запланировано постов: {result.imported}")
+
+
+@router.message(PostImportStates.waiting_for_file)
+async def import_file_expected(message: Message):
+    await message.answer("Пришлите файл .csv или .json с контент-планом.", reply_markup=cancel_keyboard())
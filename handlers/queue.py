@@ -1,18 +1,26 @@
 # handlers/queue.py
 import logging
 from datetime import datetime
+from typing import Optional
 from zoneinfo import ZoneInfo
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import LIST_PAGE_SIZE
+from database.crud import get_schedule_page
 from database.db import AsyncSessionLocal
 from database.models import Post, Group
+from utils.pagination import NEXT, page_buttons, parse_page_callback
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Префикс callback_data кнопок листания контент-плана
+SCHEDULE_PAGE_PREFIX = "schedule_page"
+
 
 
 @router.message(F.text == "📋 Очередь публикаций")
@@ -53,71 +61,79 @@ async def show_queue(message: Message, state: FSMContext):
 
 # Добавьте этот код в файл handlers/queue.py
 @router.callback_query(F.data == "show_schedule")
-async def show_schedule_callback(call: CallbackQuery, state: FSMContext):
+async def show_schedule_callback(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Обработчик инлайн-кнопки 'Контент план'"""
     logger.info(f"Show schedule callback received: {call.data}")
-    
-    user_id = call.from_user.id
+    await show_schedule_page(call, state, session)
+
+
+@router.callback_query(F.data.startswith(f"{SCHEDULE_PAGE_PREFIX}:"))
+async def schedule_page_callback(call: CallbackQuery, state: FSMContext, session: AsyncSession):
+    """Переход по страницам контент-плана: курсор в callback_data"""
+    direction, cursor = parse_page_callback(call.data)
+    await show_schedule_page(call, state, session, cursor, direction)
+
+
+async def show_schedule_page(
+    call: CallbackQuery,
+    state: FSMContext,
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    direction: str = NEXT,
+):
+    """Страница запланированных постов канала от курсора (ближайшие сверху)"""
     user_data = await state.get_data()
     current_channel = user_data.get("current_channel_title", "текущий канал")
     
     try:
-        async with AsyncSessionLocal() as session:
-            # Проверяем выбран ли канал
-            if not user_data.get("group_id") or not user_data.get("chat_id"):
-                await call.answer("⚠️ Сначала выберите канал для работы", show_alert=True)
-                return
+        # Проверяем выбран ли канал
+        if not user_data.get("group_id") or not user_data.get("chat_id"):
+            await call.answer("⚠️ Сначала выберите канал для работы", show_alert=True)
+            return
+        
+        chat_id = user_data["chat_id"]
+        
+        # Получаем страницу запланированных постов
+        # publish_at хранится в московском времени без таймзоны
+        now = datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None)
+        page = await get_schedule_page(session, chat_id, now, LIST_PAGE_SIZE, cursor, direction)
+        
+        if not page.items:
+            # Если нет запланированных постов
+            await call.message.edit_text(
+                f"📅 <b>Контент план канала \"{current_channel}\"</b>\n\n"
+                f"В данный момент нет запланированных публикаций.\n\n"
+                f"Чтобы создать новый пост, используйте кнопку 'Создать пост'.",
+                parse_mode="HTML",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="Создать пост", callback_data="post:create_manual")],
+                    [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")]
+                ])
+            )
+        else:
+            # Если есть запланированные посты
+            posts_text = "\n\n".join([
+                f"🕒 <b>{post.publish_at.strftime('%d.%m.%Y %H:%M')}</b>\n"
+                f"{post.preview or ''}"
+                for post in page.items
+            ])
             
-            chat_id = user_data["chat_id"]
+            inline_keyboard = []
+            nav_buttons = page_buttons(SCHEDULE_PAGE_PREFIX, page)
+            if nav_buttons:
+                inline_keyboard.append(nav_buttons)
+            inline_keyboard.append([InlineKeyboardButton(text="Создать пост", callback_data="post:create_manual")])
+            inline_keyboard.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")])
             
-            # Получаем запланированные посты
-            now = datetime.now(ZoneInfo("Europe/Moscow"))
-            query = (
-                select(Post)
-                .filter(
-                    Post.chat_id == chat_id,
-                    Post.status == "approved",
-                    Post.published == False,
-                    Post.publish_at > now
-                )
-                .order_by(Post.publish_at)
+            await call.message.edit_text(
+                f"📅 <b>Контент план канала \"{current_channel}\"</b>\n\n"
+                f"{posts_text}\n\n"
+                f"Всего запланировано: {page.total} постов.",
+                parse_mode="HTML",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
             )
             
-            result = await session.execute(query)
-            scheduled_posts = result.scalars().all()
-            
-            if not scheduled_posts:
-                # Если нет запланированных постов
-                await call.message.edit_text(
-                    f"📅 <b>Контент план канала \"{current_channel}\"</b>\n\n"
-                    f"В данный момент нет запланированных публикаций.\n\n"
-                    f"Чтобы создать новый пост, используйте кнопку 'Создать пост'.",
-                    parse_mode="HTML",
-                    reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                        [InlineKeyboardButton(text="Создать пост", callback_data="post:create_manual")],
-                        [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")]
-                    ])
-                )
-            else:
-                # Если есть запланированные посты
-                posts_text = "\n\n".join([
-                    f"🕒 <b>{post.publish_at.strftime('%d.%m.%Y %H:%M')}</b>\n"
-                    f"{post.text[:100]}{'...' if len(post.text) > 100 else ''}"
-                    for post in scheduled_posts[:10]  # Ограничиваем до 10 постов
-                ])
-                
-                await call.message.edit_text(
-                    f"📅 <b>Контент план канала \"{current_channel}\"</b>\n\n"
-                    f"{posts_text}\n\n"
-                    f"Всего запланировано: {len(scheduled_posts)} постов.",
-                    parse_mode="HTML",
-                    reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                        [InlineKeyboardButton(text="Создать пост", callback_data="post:create_manual")],
-                        [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")]
-                    ])
-                )
-                
-            await call.answer()
+        await call.answer()
             
     except Exception as e:
         logger.error(f"Error showing schedule: {e}")
@@ -1,13 +1,15 @@
 # handlers/start.py
 import logging
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.db import AsyncSessionLocal
-from database.models import User, Group
+from database.cache import invalidate_user
+from database.models import User
 from config import DEFAULT_ADMIN_ID
 from utils.keyboards import create_channels_keyboard
 
@@ -15,85 +17,80 @@ router = Router()
 logger = logging.getLogger(__name__)
 
 @router.message(Command('start'))
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, session: AsyncSession, db_user: Optional[User]):
     """Обработчик команды /start"""
     logger.info("Command /start received")
     user_id = message.from_user.id
     
     try:
-        async with AsyncSessionLocal() as session:
-            # Проверяем, есть ли пользователь уже в базе
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            existing_user = user_result.scalar_one_or_none()
+        # Пользователь уже загружен DbSessionMiddleware
+        existing_user = db_user
+        
+        if existing_user:
+            # Проверяем, есть ли у пользователя каналы
+            keyboard = await create_channels_keyboard(user_id, session)
             
-            if existing_user:
-                # Проверяем, есть ли у пользователя каналы
-                channels_q = select(Group).filter(Group.added_by == user_id)
-                channels_result = await session.execute(channels_q)
-                channels = channels_result.scalars().all()
-                
-                if channels:
-                    # Если есть каналы, показываем кнопку для их выбора
-                    keyboard = await create_channels_keyboard(user_id)
-                    await message.answer(
-                        f"📝 <b>Выберите канал или группу для работы</b>\n\n"
-                        f"Выберите одну из подключенных групп/каналов или добавьте новую.",
-                        parse_mode="HTML",
-                        reply_markup=keyboard
-                    )
-                else:
-                    # Если каналов нет, предлагаем добавить
-                    await message.answer(
-                        f"📌 <b>Добавьте первый канал или группу</b>\n\n"
-                        f"Чтобы начать работу с ботом, необходимо добавить канал "
-                        f"или группу, где бот будет публиковать контент.\n\n"
-                        f"⚠️ Для работы бот должен быть администратором с правами "
-                        f"на публикацию сообщений.",
-                        parse_mode="HTML",
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="+ Добавить канал", callback_data="add_channel")]
-                        ])
-                    )
-                
-                # Обновляем данные пользователя, если они изменились
-                if existing_user.username != message.from_user.username or existing_user.full_name != message.from_user.full_name:
-                    existing_user.username = message.from_user.username
-                    existing_user.full_name = message.from_user.full_name
-                    await session.commit()
-                    
-            else:
-                # Новый пользователь - регистрируем
-                is_admin = str(user_id) == DEFAULT_ADMIN_ID
-                
-                new_user = User(
-                    user_id=user_id,
-                    username=message.from_user.username,
-                    full_name=message.from_user.full_name,
-                    role="admin" if is_admin else "account_owner",
-                    is_active=True
+            if len(keyboard.inline_keyboard) > 1:
+                # Если есть каналы, показываем кнопку для их выбора
+                await message.answer(
+                    f"📝 <b>Выберите канал или группу для работы</b>\n\n"
+                    f"Выберите одну из подключенных групп/каналов или добавьте новую.",
+                    parse_mode="HTML",
+                    reply_markup=keyboard
                 )
-                
-                session.add(new_user)
-                await session.commit()
-                
-                # Отправляем приветственное сообщение
+            else:
+                # Если каналов нет, предлагаем добавить
                 await message.answer(
-                    f"🌟 <b>Добро пожаловать в Publicus!</b>\n\n"
-                    f"Я — бот для создания и публикации контента в Telegram-каналах и группах.\n\n"
-                    f"✏️ Возможности:\n"
-                    f"• Создание постов вручную и с помощью ИИ\n"
-                    f"• Запланированная публикация контента\n"
-                    f"• Интеграция с Google Таблицами\n"
-                    f"• Управление несколькими каналами\n\n"
-                    f"🚀 Чтобы начать работу, нажмите кнопку \"Начать\".",
+                    f"📌 <b>Добавьте первый канал или группу</b>\n\n"
+                    f"Чтобы начать работу с ботом, необходимо добавить канал "
+                    f"или группу, где бот будет публиковать контент.\n\n"
+                    f"⚠️ Для работы бот должен быть администратором с правами "
+                    f"на публикацию сообщений.",
                     parse_mode="HTML",
                     reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                        [InlineKeyboardButton(text="Начать", callback_data="start_onboarding")]
+                        [InlineKeyboardButton(text="+ Добавить канал", callback_data="add_channel")]
                     ])
                 )
+            
+            # Обновляем данные пользователя, если они изменились (коммит - в middleware,
+            # кэш сбрасывается после него)
+            if existing_user.username != message.from_user.username or existing_user.full_name != message.from_user.full_name:
+                existing_user.username = message.from_user.username
+                existing_user.full_name = message.from_user.full_name
+                invalidate_user(user_id, session)
                 
-                logger.info(f"New user registered: {user_id}, {message.from_user.username}")
+        else:
+            # Новый пользователь - регистрируем
+            is_admin = str(user_id) == DEFAULT_ADMIN_ID
+            
+            new_user = User(
+                user_id=user_id,
+                username=message.from_user.username,
+                full_name=message.from_user.full_name,
+                role="admin" if is_admin else "account_owner",
+                is_active=True
+            )
+            
+            session.add(new_user)
+            await session.flush()
+            
+            # Отправляем приветственное сообщение
+            await message.answer(
+                f"🌟 <b>Добро пожаловать в Publicus!</b>\n\n"
+                f"Я — бот для создания и публикации контента в Telegram-каналах и группах.\n\n"
+                f"✏️ Возможности:\n"
+                f"• Создание постов вручную и с помощью ИИ\n"
+                f"• Запланированная публикация контента\n"
+                f"• Интеграция с Google Таблицами\n"
+                f"• Управление несколькими каналами\n\n"
+                f"🚀 Чтобы начать работу, нажмите кнопку \"Начать\".",
+                parse_mode="HTML",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="Начать", callback_data="start_onboarding")]
+                ])
+            )
+            
+            logger.info(f"New user registered: {user_id}, {message.from_user.username}")
                 
     except Exception as e:
         logger.error(f"Error in /start command: {e}")
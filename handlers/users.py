@@ -7,9 +7,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy import select, update
 
+from database.cache import get_user, invalidate_user
 from database.db import AsyncSessionLocal
 from database.models import User
-from config import DEFAULT_ADMIN_ID
+from config import DEFAULT_ADMIN_ID, MODEL_ROUTES
+from utils.generation_cache import generation_cache
+from utils.llm_queue import llm_queue
+from utils.metrics import metrics
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -31,9 +35,7 @@ async def cmd_start(message: Message, state: FSMContext):
     try:
         async with AsyncSessionLocal() as session:
             # Проверяем, есть ли пользователь уже в базе
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            existing_user = user_result.scalar_one_or_none()
+            existing_user = await get_user(session, user_id)
             
             if existing_user:
                 # Пользователь уже зарегистрирован
@@ -49,6 +51,7 @@ async def cmd_start(message: Message, state: FSMContext):
                     existing_user.username = message.from_user.username
                     existing_user.full_name = message.from_user.full_name
                     await session.commit()
+                    invalidate_user(user_id)
                     
             else:
                 # Новый пользователь - регистрируем
@@ -130,6 +133,7 @@ async def process_email(message: Message, state: FSMContext):
             
             user.email = email
             await session.commit()
+            invalidate_user(user_id)
             
             # Продолжаем процесс
             await show_add_channel_prompt(message)
@@ -171,9 +175,7 @@ async def admin_users_list(message: Message):
     try:
         async with AsyncSessionLocal() as session:
             # Проверяем, является ли пользователь администратором
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id, fresh=True)
             
             if not user or user.role != 'admin':
                 await message.answer("⚠️ У вас нет прав для выполнения этой команды.")
@@ -233,18 +235,14 @@ async def make_admin(message: Message):
     try:
         async with AsyncSessionLocal() as session:
             # Проверяем, является ли пользователь администратором
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id, fresh=True)
             
             if not user or user.role != 'admin':
                 await message.answer("⚠️ У вас нет прав для выполнения этой команды.")
                 return
             
             # Находим целевого пользователя
-            target_user_q = select(User).filter(User.user_id == target_user_id)
-            target_user_result = await session.execute(target_user_q)
-            target_user = target_user_result.scalar_one_or_none()
+            target_user = await get_user(session, target_user_id, fresh=True)
             
             if not target_user:
                 await message.answer(f"⚠️ Пользователь с ID {target_user_id} не найден.")
@@ -253,6 +251,7 @@ async def make_admin(message: Message):
             # Назначаем пользователя администратором
             target_user.role = 'admin'
             await session.commit()
+            invalidate_user(target_user_id)
             
             await message.answer(
                 f"✅ Пользователь {target_user.full_name} (ID: {target_user_id}) назначен администратором."
@@ -282,18 +281,14 @@ async def block_user(message: Message):
     try:
         async with AsyncSessionLocal() as session:
             # Проверяем, является ли пользователь администратором
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id, fresh=True)
             
             if not user or user.role != 'admin':
                 await message.answer("⚠️ У вас нет прав для выполнения этой команды.")
                 return
             
             # Находим целевого пользователя
-            target_user_q = select(User).filter(User.user_id == target_user_id)
-            target_user_result = await session.execute(target_user_q)
-            target_user = target_user_result.scalar_one_or_none()
+            target_user = await get_user(session, target_user_id, fresh=True)
             
             if not target_user:
                 await message.answer(f"⚠️ Пользователь с ID {target_user_id} не найден.")
@@ -302,6 +297,7 @@ async def block_user(message: Message):
             # Блокируем пользователя
             target_user.is_active = False
             await session.commit()
+            invalidate_user(target_user_id)
             
             await message.answer(
                 f"✅ Пользователь {target_user.full_name} (ID: {target_user_id}) заблокирован."
@@ -331,18 +327,14 @@ async def unblock_user(message: Message):
     try:
         async with AsyncSessionLocal() as session:
             # Проверяем, является ли пользователь администратором
-            user_q = select(User).filter(User.user_id == user_id)
-            user_result = await session.execute(user_q)
-            user = user_result.scalar_one_or_none()
+            user = await get_user(session, user_id, fresh=True)
             
             if not user or user.role != 'admin':
                 await message.answer("⚠️ У вас нет прав для выполнения этой команды.")
                 return
             
             # Находим целевого пользователя
-            target_user_q = select(User).filter(User.user_id == target_user_id)
-            target_user_result = await session.execute(target_user_q)
-            target_user = target_user_result.scalar_one_or_none()
+            target_user = await get_user(session, target_user_id, fresh=True)
             
             if not target_user:
                 await message.answer(f"⚠️ Пользователь с ID {target_user_id} не найден.")
@@ -351,6 +343,7 @@ async def unblock_user(message: Message):
             # Разблокируем пользователя
             target_user.is_active = True
             await session.commit()
+            invalidate_user(target_user_id)
             
             await message.answer(
                 f"✅ Пользователь {target_user.full_name} (ID: {target_user_id}) разблокирован."
@@ -359,3 +352,69 @@ async def unblock_user(message: Message):
     except Exception as e:
         logger.error(f"Error unblocking user: {e}")
         await message.answer("⚠️ Произошла ошибка при разблокировке пользователя.")
+
+
+@router.message(Command(commands=['genstats']))
+async def generation_stats(message: Message):
+    """Статистика кэша генераций (только для администраторов)"""
+    user_id = message.from_user.id
+    
+    try:
+        async with AsyncSessionLocal() as session:
+            # Проверяем, является ли пользователь администратором
+            user = await get_user(session, user_id, fresh=True)
+            
+            if not user or user.role != 'admin':
+                await message.answer("⚠️ У вас нет прав для выполнения этой команды.")
+                return
+        
+        stats = generation_cache.stats()
+        summaries = metrics.snapshot()["summaries"]
+        route_lines = []
+        for route, model in MODEL_ROUTES.items():
+            latency = summaries.get(f"llm.latency.{route}")
+            timing = f"p50 {latency['p50']:.2f}s, p99 {latency['p99']:.2f}s" if latency else "нет данных"
+            route_lines.append(
+                f"{route} ({model}): {int(metrics.counter(f'llm.route.{route}.requests'))} запр., "
+                f"{timing}, ${metrics.counter(f'llm.route.{route}.cost_usd'):.4f}"
+            )
+        db_statements = summaries.get("db.update.statements")
+        db_time = summaries.get("db.update.time_ms")
+        db_lines = (
+            f"SQL на апдейт: p50 {db_statements['p50']:.0f}, p99 {db_statements['p99']:.0f}\n"
+            f"Время БД на апдейт: p50 {db_time['p50']:.1f} мс, p99 {db_time['p99']:.1f} мс\n"
+            if db_statements and db_time else "SQL на апдейт: нет данных\n"
+        )
+        await message.answer(
+            "📈 <b>Кэш генераций</b>\n\n"
+            f"Записей в памяти: {stats['size']}\n"
+            f"Попаданий: {stats['hits']}\n"
+            f"Промахов: {stats['misses']}\n"
+            f"Доля попаданий: {stats['hit_rate']:.1%}\n"
+            f"Сэкономлено токенов: {stats['saved_tokens']}\n"
+            f"Хранение в БД: {'включено' if generation_cache.persist else 'выключено'}\n\n"
+            "🧵 <b>Очередь генерации</b>\n\n"
+            f"Выполняется: {llm_queue.running}\n"
+            f"В очереди: {llm_queue.queued}\n"
+            f"Запросов к API: {int(metrics.counter('llm.requests'))}\n"
+            f"Израсходовано токенов: {int(metrics.counter('llm.tokens.total'))}\n"
+            f"Prompt-токенов из кэша провайдера: {int(metrics.counter('llm.tokens.cached'))} "
+            f"из {int(metrics.counter('llm.tokens.prompt'))}\n"
+            f"Отказов по бюджету: {int(metrics.counter('llm.budget_rejections'))}\n"
+            f"Стоимость: ${metrics.counter('llm.cost_usd'):.4f}\n\n"
+            "🧭 <b>Маршруты моделей</b>\n\n"
+            + "\n".join(route_lines) + "\n\n"
+            "🔮 <b>Спекулятивная генерация</b>\n\n"
+            f"Запущено: {int(metrics.counter('speculative.started'))}\n"
+            f"Использовано: {int(metrics.counter('speculative.hits'))}\n"
+            f"Отброшено: {int(metrics.counter('speculative.wasted'))}\n\n"
+            "🗄 <b>БД</b>\n\n"
+            + db_lines +
+            f"Медленных апдейтов: {int(metrics.counter('db.slow_updates'))}\n"
+            f"Повторяющихся запросов (N+1): {int(metrics.counter('db.repeated_statements'))}",
+            parse_mode="HTML"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error getting generation stats: {e}")
+        await message.answer("⚠️ Произошла ошибка при получении статистики.")
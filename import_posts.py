@@ -0,0 +1,56 @@
+# import_posts.py
+"""
+Массовый импорт контент-плана из командной строки (администратору).
+
+    python import_posts.py plan.csv --user 123456789 --chat -1001234567890
+
+Формат файла - как у команды /import (см. utils/post_import.py). Посты
+можно планировать в любой подключенный к боту канал.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from config import IMPORT_BATCH_SIZE
+from database.crud import get_groups
+from database.db import AsyncSessionLocal
+from utils.post_import import ImportFormatError, import_posts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main(args) -> int:
+    async with AsyncSessionLocal() as session:
+        chats = [group.chat_id for group in await get_groups(session)]
+
+    with open(args.file, "rb") as f:
+        content = f.read()
+
+    try:
+        result = await import_posts(
+            os.path.basename(args.file), content, created_by=args.user,
+            allowed_chats=chats, default_chat_id=args.chat, batch_size=args.batch_size,
+        )
+    except ImportFormatError as e:
+        logger.error(f"Не удалось прочитать файл: {e}")
+        return 2
+
+    for line, error in result.errors:
+        print(f"строка {line}: {error}")
+    if result.errors:
+        logger.error(f"Ошибок: {len(result.errors)} из {result.total} строк, посты не сохранены")
+        return 1
+    logger.info(f"Запланировано постов: {result.imported}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Импорт контент-плана из CSV/JSON")
+    parser.add_argument("file", help="Файл .csv или .json")
+    parser.add_argument("--user", type=int, required=True, help="Автор постов (user_id Telegram)")
+    parser.add_argument("--chat", type=int, default=None, help="Канал для строк без chat_id")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Строк в одном INSERT")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,11 @@
+# middlewares/__init__.py
+from .concurrency import ChatLockIsolation, ConcurrencyLimitMiddleware
+from .db import DbSessionMiddleware
+from .sql_stats import SqlStatsMiddleware
+
+__all__ = (
+    "ChatLockIsolation",
+    "ConcurrencyLimitMiddleware",
+    "DbSessionMiddleware",
+    "SqlStatsMiddleware",
+)
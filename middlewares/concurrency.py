@@ -0,0 +1,82 @@
+# middlewares/concurrency.py
+"""
+Параллельная обработка апдейтов с ограничением и порядком внутри диалога.
+
+Апдейты разных пользователей обрабатываются параллельно (polling запускает
+каждый апдейт отдельной задачей, webhook - пулом обработчиков), а:
+
+* ChatLockIsolation - изоляция событий FSM aiogram: апдейты одного диалога
+  (ключ хранилища FSM - чат и пользователь) обрабатываются строго по очереди,
+  состояние читается уже под блокировкой;
+* ConcurrencyLimitMiddleware - не больше limit апдейтов в хэндлерах
+  одновременно (генерация, Google Таблицы и сессии БД не растут без предела).
+
+Ожидание блокировки диалога не занимает слот ограничения: изоляция FSM
+выполняется раньше пользовательских middleware.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, List
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.types import TelegramObject
+
+from utils.metrics import metrics
+
+
+class ChatLockIsolation(BaseEventIsolation):
+    """
+    Блокировка на диалог FSM; блокировки без ожидающих сразу удаляются,
+    поэтому память не растет с числом пользователей.
+    """
+
+    def __init__(self):
+        # ключ -> [блокировка, число задач, которые ее держат или ждут]
+        self._locks: Dict[Hashable, List[Any]] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        started = time.perf_counter()
+        try:
+            async with entry[0]:
+                metrics.observe("updates.lock_wait", time.perf_counter() - started)
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    @property
+    def size(self) -> int:
+        return len(self._locks)
+
+    async def close(self) -> None:
+        self._locks.clear()
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Ограничивает число апдейтов, одновременно находящихся в хэндлерах"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        async with self._semaphore:
+            metrics.observe("updates.slot_wait", time.perf_counter() - started)
+            self.in_flight += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.in_flight -= 1
@@ -0,0 +1,73 @@
+# middlewares/db.py
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.cache import get_group, get_user
+from database.models import Group, User
+
+logger = logging.getLogger(__name__)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на апдейт.
+
+    Регистрируется как outer-middleware апдейтов (после встроенных UserContext и
+    FSMContext). Хэндлеры получают ее аргументами по имени:
+
+    * session       - AsyncSession, общая для всех хэндлеров и хелперов апдейта;
+    * db_user       - строка User отправителя (None, если он не зарегистрирован);
+    * current_group - выбранная группа/канал: group_id из FSM, иначе User.current_chat_id.
+
+    Соединение берется из пула только на время запросов: транзакция начинается
+    при первом запросе хэндлера и коммитится один раз после обработки апдейта
+    (если она была), при исключении - откатывается. Сбросы кэша, переданные
+    с этой сессией (invalidate_user(user_id, session)), выполняются после коммита.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_factory() as session:
+            data["session"] = session
+            data["db_user"], data["current_group"] = await self._resolve(session, data)
+            # Завершаем читающую транзакцию: хэндлер может долго ждать LLM или Telegram,
+            # а объекты после коммита остаются загруженными (expire_on_commit=False)
+            await session.commit()
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await session.rollback()
+                raise
+            if session.in_transaction():
+                await session.commit()
+            return result
+
+    @staticmethod
+    async def _resolve(session: AsyncSession, data: Dict[str, Any]):
+        """Загружает пользователя и текущую группу апдейта"""
+        from_user = data.get("event_from_user")
+        if from_user is None:
+            return None, None
+
+        user: Optional[User] = await get_user(session, from_user.id)
+
+        group: Optional[Group] = None
+        state: Optional[FSMContext] = data.get("state")
+        group_id = (await state.get_data()).get("group_id") if state is not None else None
+        if group_id:
+            group = await session.get(Group, group_id)
+        elif user is not None and user.current_chat_id:
+            group = await get_group(session, user.current_chat_id)
+        return user, group
@@ -0,0 +1,41 @@
+# middlewares/sql_stats.py
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from database.instrumentation import report, track_queries
+
+
+def describe_update(update: TelegramObject) -> str:
+    """Короткое описание апдейта для отчета: тип и текст кнопки/команды или callback_data"""
+    if not isinstance(update, Update):
+        return type(update).__name__
+    if update.message is not None:
+        text = update.message.text or update.message.caption or ""
+        return f"message '{text[:40]}'" if text else "message"
+    if update.callback_query is not None:
+        return f"callback '{(update.callback_query.data or '')[:40]}'"
+    return update.event_type
+
+
+class SqlStatsMiddleware(BaseMiddleware):
+    """
+    Считает SQL-запросы и время БД за обработку апдейта.
+
+    Регистрируется outer-middleware апдейтов раньше DbSessionMiddleware, чтобы
+    учитывать и загрузку пользователя/группы. Отчет - database.instrumentation.report:
+    метрики db.update.*, лог медленных апдейтов и (при SQL_DEBUG) повторяющихся запросов.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with track_queries(describe_update(event)) as stats:
+            try:
+                return await handler(event, data)
+            finally:
+                report(stats)
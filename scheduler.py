@@ -10,77 +10,38 @@ import asyncio
 import re
 import traceback
 
+from database.crud import get_active_sheets, get_due_posts
 from database.db import AsyncSessionLocal
-from database.models import Post, Group, GoogleSheet
+from database.models import Post, Group
 from utils.google_sheets import GoogleSheetsClient
 from utils.text_formatter import format_google_sheet_text, prepare_media_urls
+from utils.media_cache import media_cache
+from utils.generation_cache import generation_cache
+from utils.series_executor import pregenerate_series, publish_generated_posts
+from utils.post_archiver import archive_published_posts
+from database.fsm_storage import fsm_storage
+from config import SERIES_PREGEN_INTERVAL_MINUTES, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_MINUTES, FSM_STORAGE
 
 log = logging.getLogger(__name__)
 # Сохраняем глобальный объект планировщика для доступа из разных функций
 _scheduler = None
 
 
-# Добавить в начало файла scheduler.py
-import aiohttp
-from io import BytesIO
-from utils.text_formatter import format_google_sheet_text, prepare_media_urls
-
 async def download_image(url: str):
     """
-    Загружает изображение по URL.
+    Загружает изображение по URL через локальный кэш медиа.
     
-    Args:
-        url: URL изображения
-        
-    Returns:
-        BytesIO: Объект с содержимым изображения или None в случае ошибки
-    """
-    log.info(f"Downloading image from URL: {url}")
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=20) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    log.info(f"Successfully downloaded image, size: {len(content)} bytes")
-                    return BytesIO(content)
-                else:
-                    log.error(f"Failed to download image, HTTP status: {response.status}")
-                    return None
-        except Exception as e:
-            log.error(f"Error downloading image: {e}")
-            return None
-
-
-# начало загрузки изображений из URL
-import aiohttp
-from io import BytesIO
-from utils.text_formatter import format_google_sheet_text, prepare_media_urls
-
-async def download_image(url: str):
-    """
-    Загружает изображение по URL.
+    Повторные загрузки одного и того же URL выполняются условным запросом,
+    а содержимое читается с диска через mmap.
     
     Args:
         url: URL изображения
         
     Returns:
-        BytesIO: Объект с содержимым изображения или None в случае ошибки
+        InputFile: Файл для отправки в Telegram или None в случае ошибки
     """
     log.info(f"Downloading image from URL: {url}")
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, timeout=20) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    log.info(f"Successfully downloaded image, size: {len(content)} bytes")
-                    return BytesIO(content)
-                else:
-                    log.error(f"Failed to download image, HTTP status: {response.status}")
-                    return None
-        except Exception as e:
-            log.error(f"Error downloading image: {e}")
-            return None
-# конец загрузки изображений из URL
+    return await media_cache.get_input_file(url, timeout=20)
 
 
 def setup_scheduler(scheduler: AsyncIOScheduler, bot: Bot):
@@ -105,6 +66,84 @@ def setup_scheduler(scheduler: AsyncIOScheduler, bot: Bot):
         args=(bot,),
         id="check_sheets",
     )
+    
+    # Предгенерация постов для серий автогенерации (заранее, вне пути публикации)
+    scheduler.add_job(
+        pregenerate_series,
+        "interval",
+        minutes=SERIES_PREGEN_INTERVAL_MINUTES,
+        id="pregenerate_series",
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+    )
+    
+    # Публикация одобренных постов серий
+    scheduler.add_job(
+        publish_generated_posts,
+        "interval",
+        seconds=60,
+        args=(bot,),
+        id="publish_generated_posts",
+    )
+    
+    # Перенос старых опубликованных постов в posts_archive
+    if ARCHIVE_AFTER_DAYS > 0:
+        scheduler.add_job(
+            archive_posts,
+            "interval",
+            minutes=ARCHIVE_INTERVAL_MINUTES,
+            id="archive_posts",
+            max_instances=1,
+            coalesce=True,
+        )
+    
+    # Удаление брошенных диалогов FSM из БД
+    if FSM_STORAGE == "sql":
+        scheduler.add_job(
+            purge_fsm_states,
+            "interval",
+            hours=1,
+            id="purge_fsm_states",
+            max_instances=1,
+        )
+
+    # Очистка устаревших записей кэша генераций в БД
+    if generation_cache.persist:
+        scheduler.add_job(
+            purge_generation_cache,
+            "interval",
+            hours=1,
+            id="purge_generation_cache",
+        )
+
+
+async def archive_posts():
+    """Переносит опубликованные посты старше ARCHIVE_AFTER_DAYS в архив"""
+    try:
+        await archive_published_posts()
+    except Exception as e:
+        log.error(f"Error archiving posts: {e}")
+
+
+async def purge_fsm_states():
+    """Удаляет состояния FSM, не менявшиеся дольше FSM_STATE_TTL"""
+    try:
+        removed = await fsm_storage.purge_expired()
+        if removed:
+            log.info(f"Removed {removed} expired FSM states")
+    except Exception as e:
+        log.error(f"Error purging FSM states: {e}")
+
+
+async def purge_generation_cache():
+    """Удаляет из БД записи кэша генераций, у которых истек TTL"""
+    try:
+        removed = await generation_cache.purge_expired()
+        if removed:
+            log.info(f"Removed {removed} expired generation cache entries")
+    except Exception as e:
+        log.error(f"Error purging generation cache: {e}")
 
 
 async def check_scheduled_posts(bot: Bot):
@@ -115,95 +154,76 @@ async def check_scheduled_posts(bot: Bot):
     
     log.info(f"Checking for scheduled posts at {now_utc} UTC / {now_msk} MSK")
 
-    next_post_time = None
-    
     try:
         async with AsyncSessionLocal() as session:
-            # Получаем все посты из базы для диагностики
-            check_q = select(Post).order_by(Post.id)
-            check_result = await session.execute(check_q)
-            all_posts = check_result.scalars().all()
+            # Только наступившие и ближайшие посты: фильтр по статусу и времени - в SQL
+            # (publish_at хранится в московском времени без таймзоны)
+            horizon = now_msk.replace(tzinfo=None) + timedelta(minutes=2)
+            due_posts = await get_due_posts(session, horizon)
             
-            log.info(f"Total posts in database: {len(all_posts)}")
+            log.info(f"Posts due within 2 minutes: {len(due_posts)}")
             
             # Список постов, которые скоро должны быть опубликованы
             upcoming_posts = []
             
-            if all_posts:
-                for p in all_posts:
-                    status = "to be published" if not p.published else "already published"
-                    when = f"at {p.publish_at}" if p.publish_at else "unknown time"
-                    log.info(f"Post {p.id}: status={p.status}, published={p.published}, {status}, {when}")
+            for p in due_posts:
+                # Проверим, с учетом часового пояса
+                publish_time = p.publish_at
+                
+                # Если publish_at без временной зоны, предполагаем московское время
+                if publish_time.tzinfo is None:
+                    publish_time = publish_time.replace(tzinfo=ZoneInfo("Europe/Moscow"))
+                publish_time_utc = publish_time.astimezone(timezone.utc)
                     
-                    # Если есть неопубликованные посты, проверим, пришло ли их время
-                    if p.status == "approved" and not p.published and p.publish_at:
-                        # Проверим, с учетом часового пояса
-                        publish_time = p.publish_at
-                        
-                        # Если publish_at без временной зоны, предполагаем московское время
-                        if publish_time.tzinfo is None:
-                            log.info(f"Post {p.id} has naive datetime, assuming MSK")
-                            # Предполагаем, что время в московском часовом поясе
-                            publish_time = publish_time.replace(tzinfo=ZoneInfo("Europe/Moscow"))
-                            # Конвертируем в UTC для сравнения
-                            publish_time_utc = publish_time.astimezone(timezone.utc)
-                        else:
-                            publish_time_utc = publish_time
-                            
-                        log.info(f"Post {p.id} publish time: {publish_time}, converted to UTC: {publish_time_utc}")
-                        
-                        # Проверяем, пришло ли время публикации
-                        if publish_time_utc <= now_utc:
-                            log.info(f"Time to publish post {p.id}!")
-                            
-                            try:
-                                log.info(f"Sending post {p.id} to chat {p.chat_id}")
-                                log.info(f"Post text: {p.text[:100]}...")
-                                log.info(f"Post media: {p.media_file_id}")
-
-                                # Отправляем пост
-                                if p.media_file_id:
-                                    result = await bot.send_photo(
-                                        chat_id=p.chat_id,
-                                        photo=p.media_file_id,
-                                        caption=p.text,
-                                        parse_mode="HTML"
-                                    )
-                                    log.info(f"Sent photo post {p.id} to chat {p.chat_id}, message_id: {result.message_id}")
-                                else:
-                                    result = await bot.send_message(
-                                        chat_id=p.chat_id, 
-                                        text=p.text,
-                                        parse_mode="HTML"
-                                    )
-                                    log.info(f"Sent text post {p.id} to chat {p.chat_id}, message_id: {result.message_id}")
-    
-                                # Обновляем статус
-                                p.status = "sent"
-                                p.published = True
-                                await session.commit()
-                                log.info(f"Post {p.id} marked as published")
-    
-                            except Exception as e:
-                                log.error(f"Error sending post {p.id}: {e}")
-                                p.status = "error"
-                                try:
-                                    await session.commit()
-                                except Exception as commit_err:
-                                    log.error(f"Error updating post status: {commit_err}")
+                log.info(f"Post {p.id} publish time: {publish_time}, converted to UTC: {publish_time_utc}")
+                
+                # Проверяем, пришло ли время публикации
+                if publish_time_utc <= now_utc:
+                    log.info(f"Time to publish post {p.id}!")
+                    
+                    try:
+                        log.info(f"Sending post {p.id} to chat {p.chat_id}")
+                        log.info(f"Post preview: {p.preview}")
+                        log.info(f"Post media: {p.media_file_id}")
+
+                        # get_due_posts не загружает полный текст - читаем его перед отправкой
+                        await session.refresh(p, ["text"])
+
+                        # Отправляем пост
+                        if p.media_file_id:
+                            result = await bot.send_photo(
+                                chat_id=p.chat_id,
+                                photo=p.media_file_id,
+                                caption=p.text,
+                                parse_mode="HTML"
+                            )
+                            log.info(f"Sent photo post {p.id} to chat {p.chat_id}, message_id: {result.message_id}")
                         else:
-                            # Еще не время публикации
-                            time_left = publish_time_utc - now_utc
-                            log.info(f"Post {p.id} will be published in {time_left}")
-                            
-                            # Если пост должен быть опубликован в ближайшие 2 минуты,
-                            # добавим его в список для точного планирования
-                            if time_left < timedelta(minutes=2):
-                                upcoming_posts.append((p.id, publish_time_utc))
-                            
-                            # Отслеживаем ближайший пост для планирования
-                            if next_post_time is None or publish_time_utc < next_post_time:
-                                next_post_time = publish_time_utc
+                            result = await bot.send_message(
+                                chat_id=p.chat_id, 
+                                text=p.text,
+                                parse_mode="HTML"
+                            )
+                            log.info(f"Sent text post {p.id} to chat {p.chat_id}, message_id: {result.message_id}")
+
+                        # Обновляем статус
+                        p.status = "sent"
+                        p.published = True
+                        await session.commit()
+                        log.info(f"Post {p.id} marked as published")
+
+                    except Exception as e:
+                        log.error(f"Error sending post {p.id}: {e}")
+                        p.status = "error"
+                        try:
+                            await session.commit()
+                        except Exception as commit_err:
+                            log.error(f"Error updating post status: {commit_err}")
+                else:
+                    # Еще не время публикации: до поста меньше 2 минут,
+                    # добавим его в список для точного планирования
+                    log.info(f"Post {p.id} will be published in {publish_time_utc - now_utc}")
+                    upcoming_posts.append((p.id, publish_time_utc))
             
             # Планируем точную публикацию для постов в ближайшие 2 минуты
             for post_id, post_time in upcoming_posts:
@@ -227,9 +247,7 @@ async def check_google_sheets(bot: Bot):
         
         async with AsyncSessionLocal() as session:
             # Получаем все активные подключения таблиц
-            sheets_q = select(GoogleSheet).filter(GoogleSheet.is_active == 1)  # Используем 1 вместо True
-            sheets_result = await session.execute(sheets_q)
-            active_sheets = sheets_result.scalars().all()
+            active_sheets = await get_active_sheets(session)
             
             log.info(f"Found {len(active_sheets)} active Google Sheets connections")
             
@@ -241,7 +259,7 @@ async def check_google_sheets(bot: Bot):
             for sheet in active_sheets:
                 try:
                     # Обновляем время последней синхронизации
-                    sheet.last_sync = datetime.now(timezone.utc)
+                    sheet.last_sync = datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None)
                     
                     # Получаем запланированные посты
                     log.info(f"Getting upcoming posts from sheet {sheet.spreadsheet_id}, sheet name: {sheet.sheet_name}")
@@ -424,7 +442,7 @@ async def check_google_sheets(bot: Bot):
 async def process_sheet(sheets_client, sheet, bot):
     """Обрабатывает отдельную таблицу с тайм-аутом."""
     # Обновляем время последней синхронизации
-    sheet.last_sync = datetime.now(timezone.utc)
+    sheet.last_sync = datetime.now(ZoneInfo("Europe/Moscow")).replace(tzinfo=None)
     
     # Получаем запланированные посты с безопасной обработкой
     try:
@@ -0,0 +1,95 @@
+# utils/batch_generation.py
+import datetime as dt
+import json
+import logging
+from typing import List
+
+from database.crud import add_posts
+from database.db import AsyncSessionLocal
+from database.models import GenerationTemplate, Post
+from gpt_client import generate_variants
+from utils.prompt_manager import BASIC_MODE, build_basic_prompt, build_generation_params
+
+logger = logging.getLogger(__name__)
+
+
+def _build_template(user_id: int, chat_id: int, params: dict, post_count: int) -> GenerationTemplate:
+    """Создает шаблон генерации из данных FSM"""
+    if params.get("generation_mode", BASIC_MODE) == BASIC_MODE:
+        return GenerationTemplate(
+            user_id=user_id,
+            chat_id=chat_id,
+            content_type=params.get("content_type_code", ""),
+            themes=params.get("themes", ""),
+            tone=params.get("tone_code", ""),
+            structure=json.dumps(params.get("structure", {})),
+            length=params.get("length_code", ""),
+            post_count=post_count,
+            last_used_at=dt.datetime.utcnow(),
+        )
+    return GenerationTemplate(
+        user_id=user_id,
+        chat_id=chat_id,
+        content_type="pro",
+        themes=params.get("pro_prompt", ""),
+        tone="",
+        structure="{}",
+        length="",
+        post_count=post_count,
+        last_used_at=dt.datetime.utcnow(),
+    )
+
+
+async def generate_draft_batch(user_id: int, chat_id: int, params: dict, count: int) -> List[Post]:
+    """
+    Генерирует пакет черновиков по текущим параметрам и сохраняет их в БД.
+
+    Все варианты генерируются параллельно (см. generate_variants), затем шаблон
+    генерации и посты-черновики сохраняются одной транзакцией.
+
+    Args:
+        user_id: Telegram ID автора
+        chat_id: ID канала, для которого создаются черновики
+        params: Данные FSM (параметры BASIC или промпт PRO)
+        count: Количество черновиков (GenerationTemplate.post_count)
+
+    Returns:
+        List[Post]: Сохраненные черновики
+
+    Raises:
+        OpenAIError: если генерация не удалась
+    """
+    if params.get("generation_mode", BASIC_MODE) == BASIC_MODE:
+        prompt = build_basic_prompt(params)
+    else:
+        prompt = params.get("pro_prompt", "")
+
+    # Черновики идут через маршрут draft (быстрая дешевая модель)
+    texts = await generate_variants(prompt, count, route="draft")
+    if not texts:
+        return []
+
+    generation_params = json.dumps(build_generation_params(params))
+
+    async with AsyncSessionLocal() as session:
+        template = _build_template(user_id, chat_id, params, count)
+        session.add(template)
+        await session.flush()
+
+        posts = [
+            Post(
+                chat_id=chat_id,
+                text=text,
+                created_by=user_id,
+                status="draft",
+                published=False,
+                is_generated=True,
+                template_id=template.id,
+                generation_params=generation_params,
+            )
+            for text in texts
+        ]
+        await add_posts(session, posts)
+
+    logger.info(f"Saved {len(posts)} generated drafts for chat {chat_id} (template {template.id})")
+    return posts
@@ -0,0 +1,167 @@
+# utils/generation_cache.py
+import datetime as dt
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import delete
+
+from config import GENERATION_CACHE_SIZE, GENERATION_CACHE_TTL, GENERATION_CACHE_PERSIST
+from database.db import AsyncSessionLocal
+from database.models import GenerationCacheEntry
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedGeneration:
+    """Закэшированный результат генерации"""
+    text: str
+    total_tokens: int
+    created_at: float  # unix time
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Нормализует промпт: схлопывает пробельные символы и обрезает края"""
+    return " ".join(prompt.split())
+
+
+def make_key(model: str, system: str, prompt: str, temperature: float) -> str:
+    """
+    Строит ключ кэша по параметрам запроса.
+
+    Args:
+        model: Модель
+        system: Системный промпт
+        prompt: Пользовательский промпт
+        temperature: Температура генерации
+
+    Returns:
+        str: SHA-256 от нормализованных параметров
+    """
+    payload = json.dumps(
+        [model, normalize_prompt(system), normalize_prompt(prompt), round(float(temperature), 3)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    LRU+TTL кэш результатов генерации с опциональным хранением в БД.
+
+    В памяти держится не более max_size записей; при включенном persist
+    промах в памяти проверяется по таблице generation_cache, а новые
+    результаты туда записываются. Ошибки БД не ломают генерацию:
+    кэш просто считается промахнувшимся.
+    """
+
+    def __init__(self, max_size: int, ttl: int, persist: bool = False):
+        """
+        Args:
+            max_size: Максимальное число записей в памяти
+            ttl: Время жизни записи в секундах
+            persist: Сохранять ли результаты в БД
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist = persist
+        self._entries: "OrderedDict[str, CachedGeneration]" = OrderedDict()
+
+    def _remember(self, key: str, entry: CachedGeneration):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _is_fresh(self, entry: CachedGeneration) -> bool:
+        return time.time() - entry.created_at < self.ttl
+
+    async def _load(self, key: str) -> Optional[CachedGeneration]:
+        try:
+            async with AsyncSessionLocal() as session:
+                row = await session.get(GenerationCacheEntry, key)
+                if row is None:
+                    return None
+                created_at = row.created_at.replace(tzinfo=dt.timezone.utc).timestamp()
+                return CachedGeneration(row.text, row.total_tokens or 0, created_at)
+        except Exception as e:
+            logger.error(f"Failed to read generation cache from DB: {e}")
+            return None
+
+    async def _store(self, key: str, model: str, entry: CachedGeneration):
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.merge(GenerationCacheEntry(
+                    key=key,
+                    model=model,
+                    text=entry.text,
+                    total_tokens=entry.total_tokens,
+                    created_at=dt.datetime.utcfromtimestamp(entry.created_at),
+                ))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to write generation cache to DB: {e}")
+
+    async def get(self, key: str) -> Optional[CachedGeneration]:
+        """Возвращает свежую запись или None; обновляет счетчики попаданий"""
+        entry = self._entries.get(key)
+        if entry is not None and not self._is_fresh(entry):
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self.persist:
+            entry = await self._load(key)
+            if entry is not None and self._is_fresh(entry):
+                self._remember(key, entry)
+            else:
+                entry = None
+
+        if entry is None:
+            metrics.inc("generation_cache.misses")
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.inc("generation_cache.hits")
+        metrics.inc("generation_cache.saved_tokens", entry.total_tokens)
+        return entry
+
+    async def set(self, key: str, model: str, text: str, total_tokens: int = 0):
+        """Сохраняет результат генерации"""
+        entry = CachedGeneration(text, total_tokens, time.time())
+        self._remember(key, entry)
+        if self.persist:
+            await self._store(key, model, entry)
+
+    async def purge_expired(self) -> int:
+        """Удаляет устаревшие записи из БД; возвращает число удаленных строк"""
+        if not self.persist:
+            return 0
+        border = dt.datetime.utcnow() - dt.timedelta(seconds=self.ttl)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                delete(GenerationCacheEntry).where(GenerationCacheEntry.created_at < border)
+            )
+            await session.commit()
+            return result.rowcount or 0
+
+    def stats(self) -> dict:
+        """Статистика кэша: попадания, промахи, доля попаданий, сэкономленные токены"""
+        hits = metrics.counter("generation_cache.hits")
+        misses = metrics.counter("generation_cache.misses")
+        total = hits + misses
+        return {
+            "size": len(self._entries),
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": hits / total if total else 0.0,
+            "saved_tokens": int(metrics.counter("generation_cache.saved_tokens")),
+        }
+
+
+generation_cache = GenerationCache(GENERATION_CACHE_SIZE, GENERATION_CACHE_TTL, GENERATION_CACHE_PERSIST)
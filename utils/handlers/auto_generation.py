@@ -1,14 +1,17 @@
 from aiogram import Router, F
+from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from typing import Optional
 from datetime import datetime
 from database.db import AsyncSessionLocal  # Исправлено с SessionLocal на AsyncSessionLocal
-from database.models import GeneratedSeries
+from database.models import GeneratedSeries, Group
+from utils.series_executor import next_series_time, now_msk
 
 router = Router()
 
-class AutoGenStates(StatesGroup):
+class SeriesStates(StatesGroup):
     prompt = State()
     repeat = State()
     gen_time = State()
@@ -16,35 +19,36 @@ class AutoGenStates(StatesGroup):
     moderation = State()
     confirm = State()
 
-@router.message(lambda m: m.text and m.text.startswith("🤖 Автогенерация постов"))
+# Кнопку «🤖 Автогенерация постов» обрабатывает handlers/auto_generation.py - серии создаются командой
+@router.message(Command("series"))
 async def start_auto_gen(message: Message, state: FSMContext):
     await message.answer(text="📄 Введите шаблон для генерации:")
-    await state.set_state(AutoGenStates.prompt)
+    await state.set_state(SeriesStates.prompt)
 
-@router.message(AutoGenStates.prompt)
+@router.message(SeriesStates.prompt)
 async def set_prompt(message: Message, state: FSMContext):
     await state.update_data(prompt=message.text)
     await message.answer(text="🔁 Повторять каждый день?\nДа / Нет")
-    await state.set_state(AutoGenStates.repeat)
+    await state.set_state(SeriesStates.repeat)
 
-@router.message(AutoGenStates.repeat)
+@router.message(SeriesStates.repeat)
 async def set_repeat(message: Message, state: FSMContext):
     repeat = message.text.lower() == "да"
     await state.update_data(repeat=repeat)
     await message.answer(text="🕒 Укажите время генерации в формате ЧЧ:ММ (например, 12:00)")
-    await state.set_state(AutoGenStates.gen_time)
+    await state.set_state(SeriesStates.gen_time)
 
-@router.message(AutoGenStates.gen_time)
+@router.message(SeriesStates.gen_time)
 async def set_time(message: Message, state: FSMContext):
     try:
         gen_time = datetime.strptime(message.text, "%H:%M").time()
         await state.update_data(gen_time=gen_time.strftime("%H:%M"))
         await message.answer(text="🔢 Сколько постов сгенерировать максимум? (по умолчанию 10)")
-        await state.set_state(AutoGenStates.post_limit)
+        await state.set_state(SeriesStates.post_limit)
     except ValueError:
         await message.answer(text="⛔ Неверный формат времени. Попробуйте снова (например, 12:00).")
 
-@router.message(AutoGenStates.post_limit)
+@router.message(SeriesStates.post_limit)
 async def set_limit(message: Message, state: FSMContext):
     try:
         limit = int(message.text)
@@ -52,9 +56,9 @@ async def set_limit(message: Message, state: FSMContext):
     except ValueError:
         await state.update_data(post_limit=10)
     await message.answer("👁 Включить премодерацию? Да / Нет")  # Исправлено text= из сообщения
-    await state.set_state(AutoGenStates.moderation)
+    await state.set_state(SeriesStates.moderation)
 
-@router.message(AutoGenStates.moderation)
+@router.message(SeriesStates.moderation)
 async def set_moderation(message: Message, state: FSMContext):
     mod = message.text.lower() == "да"
     await state.update_data(moderation=mod)
@@ -74,17 +78,19 @@ async def set_moderation(message: Message, state: FSMContext):
             [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_gen")]
         ])
     )
-    await state.set_state(AutoGenStates.confirm)
+    await state.set_state(SeriesStates.confirm)
 
-@router.callback_query(F.data == "start_gen")
-async def confirm_gen(call: CallbackQuery, state: FSMContext):
+@router.callback_query(SeriesStates.confirm, F.data == "start_gen")
+async def confirm_gen(call: CallbackQuery, state: FSMContext, current_group: Optional[Group]):
     data = await state.get_data()
+    # Серия публикует в выбранный канал (DbSessionMiddleware), иначе - в текущий чат
+    chat_id = current_group.chat_id if current_group else data.get('chat_id', call.message.chat.id)
     async with AsyncSessionLocal() as session:  # Исправлено с SessionLocal на AsyncSessionLocal
         series = GeneratedSeries(
-            chat_id=call.message.chat.id,
+            chat_id=chat_id,
             prompt=data['prompt'],
-            repeat=data['repeat'],
-            time=data['gen_time'],
+            repeat="daily" if data['repeat'] else "once",
+            time=next_series_time(data['gen_time'], now_msk()),
             post_limit=data['post_limit'],
             posts_generated=0,
             moderation=data['moderation']
@@ -94,7 +100,7 @@ async def confirm_gen(call: CallbackQuery, state: FSMContext):
     await call.message.edit_text("🚀 Серия автогенерации создана и запущена!")
     await state.clear()
 
-@router.callback_query(F.data == "cancel_gen")
+@router.callback_query(SeriesStates.confirm, F.data == "cancel_gen")
 async def cancel_gen(call: CallbackQuery, state: FSMContext):
     await call.message.edit_text("❌ Автогенерация отменена.")
     await state.clear()
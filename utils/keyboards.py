@@ -1,8 +1,10 @@
 # utils/keyboards.py
+from typing import Optional
+
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.crud import get_user_channels
 from database.db import AsyncSessionLocal
-from database.models import Group
 
 async def create_main_keyboard():
     """Создает основную клавиатуру с меню"""
@@ -19,26 +21,32 @@ async def create_main_keyboard():
         is_persistent=True
     )
 
-async def create_channels_keyboard(user_id):
-    """Создает клавиатуру со списком каналов/групп пользователя"""
-    async with AsyncSessionLocal() as session:
-        # Получаем все каналы пользователя
-        channels_q = select(Group).filter(Group.added_by == user_id)
-        channels_result = await session.execute(channels_q)
-        channels = channels_result.scalars().all()
-        
-        # Создаем inline-клавиатуру
-        keyboard = []
-        for channel in channels:
-            # Безопасно получаем атрибуты, используя getattr с значениями по умолчанию
-            channel_type = getattr(channel, 'type', 'channel')
-            display_name = getattr(channel, 'display_name', channel.title)
-            
-            display_text = f"{'канал' if channel_type == 'channel' else 'группа'} {display_name or channel.title}"
-            keyboard.append([InlineKeyboardButton(text=display_text, callback_data=f"select_channel_{channel.id}")])
-        
-        # Добавляем кнопку для добавления нового канала
-        keyboard.append([InlineKeyboardButton(text="+ Добавить канал", callback_data="add_channel")])
-        
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
+async def create_channels_keyboard(user_id, session: Optional[AsyncSession] = None):
+    """
+    Создает клавиатуру со списком каналов/групп пользователя
+
+    Args:
+        user_id: Telegram ID пользователя
+        session: Сессия апдейта (из DbSessionMiddleware); без нее открывается своя
+    """
+    if session is None:
+        async with AsyncSessionLocal() as own_session:
+            return await create_channels_keyboard(user_id, own_session)
 
+    # Получаем все каналы пользователя (фильтр по added_by - в SQL)
+    channels = await get_user_channels(session, user_id)
+    
+    # Создаем inline-клавиатуру
+    keyboard = []
+    for channel in channels:
+        # Безопасно получаем атрибуты, используя getattr с значениями по умолчанию
+        channel_type = getattr(channel, 'type', 'channel')
+        display_name = getattr(channel, 'display_name', channel.title)
+        
+        display_text = f"{'канал' if channel_type == 'channel' else 'группа'} {display_name or channel.title}"
+        keyboard.append([InlineKeyboardButton(text=display_text, callback_data=f"select_channel_{channel.id}")])
+    
+    # Добавляем кнопку для добавления нового канала
+    keyboard.append([InlineKeyboardButton(text="+ Добавить канал", callback_data="add_channel")])
+    
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
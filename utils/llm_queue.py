@@ -0,0 +1,154 @@
+# utils/llm_queue.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Set
+
+from config import LLM_MAX_CONCURRENCY, LLM_USER_CONCURRENCY
+from utils.llm_usage import token_budget, usage_scope
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    user_id: Optional[int]
+    chat_id: Optional[int]
+    kind: str
+    factory: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    slot: Hashable = None   # очередь, в которой задача ждет и учитывается в лимите: user_id или lane
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class LLMQueue:
+    """
+    Очередь задач генерации с общим лимитом параллельности и честным обслуживанием.
+
+    У каждого пользователя своя очередь; свободные слоты раздаются по кругу
+    (round-robin) между пользователями, у которых есть ожидающие задачи и
+    которые не превысили свой лимит параллельных задач. Поэтому один
+    пользователь, нажавший «регенерировать» десять раз, не занимает все слоты.
+    Фоновые задачи (user_id=None) образуют отдельную очередь. Задачи с lane
+    (например, спекулятивные) ждут в общей очереди этого lane и не занимают
+    слоты пользователя, хотя расход по-прежнему записывается на него.
+
+    Перед постановкой в очередь проверяются дневные бюджеты токенов
+    пользователя и канала; расход задачи записывается в llm_usage.
+    """
+
+    def __init__(self, max_concurrency: int, per_user_concurrency: int):
+        """
+        Args:
+            max_concurrency: Максимум одновременно выполняемых задач
+            per_user_concurrency: Максимум одновременных задач одного пользователя
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self._pending: Dict[Optional[int], Deque[_Job]] = defaultdict(deque)
+        self._rotation: "OrderedDict[Optional[int], None]" = OrderedDict()
+        self._active: Dict[Optional[int], int] = defaultdict(int)
+        self._running = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def queued(self) -> int:
+        """Число задач, ожидающих выполнения"""
+        return sum(len(q) for q in self._pending.values())
+
+    @property
+    def running(self) -> int:
+        """Число выполняющихся задач"""
+        return self._running
+
+    async def submit(
+        self,
+        user_id: Optional[int],
+        chat_id: Optional[int],
+        factory: Callable[[], Awaitable[Any]],
+        kind: str = "article",
+        lane: Optional[str] = None,
+    ) -> Any:
+        """
+        Ставит задачу генерации в очередь и ждет ее результата.
+
+        Args:
+            user_id: Telegram ID пользователя (None для фоновых задач)
+            chat_id: ID канала, для которого генерируется контент
+            factory: Функция без аргументов, возвращающая корутину генерации
+            kind: Тип задачи для учета расхода
+            lane: Отдельная очередь со своим лимитом per_user_concurrency вместо очереди пользователя
+
+        Returns:
+            Результат корутины factory()
+
+        Raises:
+            BudgetExceeded: если исчерпан дневной бюджет пользователя или канала
+        """
+        await token_budget.check(user_id, chat_id)
+
+        slot = user_id if lane is None else ("lane", lane)
+        job = _Job(user_id, chat_id, kind, factory, asyncio.get_running_loop().create_future(), slot)
+        self._pending[slot].append(job)
+        self._rotation[slot] = None
+        metrics.inc("llm_queue.submitted")
+        self._dispatch()
+        return await job.future
+
+    def _next_job(self) -> Optional[_Job]:
+        """Следующая задача по кругу среди пользователей, не упершихся в свой лимит"""
+        for slot in list(self._rotation):
+            if self._active.get(slot, 0) >= self.per_user_concurrency:
+                continue
+            queue = self._pending[slot]
+            job = queue.popleft()
+            # Пользователь уходит в конец круга; без задач - удаляется из него
+            del self._rotation[slot]
+            if queue:
+                self._rotation[slot] = None
+            else:
+                del self._pending[slot]
+            return job
+        return None
+
+    def _dispatch(self):
+        while self._running < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+            if job.future.cancelled():
+                # Вызывающий перестал ждать (например, хэндлер отменен)
+                continue
+            self._running += 1
+            self._active[job.slot] += 1
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            # Если вызывающий перестал ждать результат, генерация прерывается
+            job.future.add_done_callback(lambda f, t=task: t.cancel() if f.cancelled() else None)
+
+    async def _run(self, job: _Job):
+        metrics.observe("llm_queue.wait_seconds", time.monotonic() - job.enqueued_at)
+        try:
+            async with usage_scope(job.user_id, job.chat_id, job.kind):
+                result = await job.factory()
+            if not job.future.done():
+                job.future.set_result(result)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self._running -= 1
+            self._active[job.slot] -= 1
+            if not self._active[job.slot]:
+                del self._active[job.slot]
+            self._dispatch()
+
+
+llm_queue = LLMQueue(LLM_MAX_CONCURRENCY, LLM_USER_CONCURRENCY)
@@ -0,0 +1,205 @@
+# utils/llm_usage.py
+import datetime as dt
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from config import LLM_USER_DAILY_TOKENS, LLM_CHAT_DAILY_TOKENS, MODEL_PRICES, CACHED_PROMPT_PRICE_RATIO
+from database.db import AsyncSessionLocal
+from database.models import LLMUsage
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceeded(Exception):
+    """Исчерпан дневной бюджет токенов пользователя или канала"""
+
+
+@dataclass
+class UsageScope:
+    """Накопитель расхода токенов одной задачи генерации"""
+    user_id: Optional[int] = None
+    chat_id: Optional[int] = None
+    kind: str = "article"
+    model: Optional[str] = None
+    route: Optional[str] = None
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+# Текущая задача генерации; gpt_client записывает в нее usage из ответов API
+_current_scope: ContextVar[Optional[UsageScope]] = ContextVar("llm_usage_scope", default=None)
+
+
+def estimate_cost(
+    model: Optional[str], prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0
+) -> float:
+    """
+    Стоимость запроса в USD по MODEL_PRICES (0, если цена модели неизвестна).
+
+    Кэшированные провайдером prompt-токены считаются по цене CACHED_PROMPT_PRICE_RATIO от обычной.
+    """
+    prompt_price, completion_price = MODEL_PRICES.get(model or "", (0.0, 0.0))
+    prompt_cost = (prompt_tokens - cached_tokens) * prompt_price + cached_tokens * prompt_price * CACHED_PROMPT_PRICE_RATIO
+    return (prompt_cost + completion_tokens * completion_price) / 1_000_000
+
+
+def record_usage(model: str, usage: Optional[dict], route: Optional[str] = None):
+    """
+    Учитывает usage из ответа API в метриках и в текущей задаче генерации.
+
+    Args:
+        model: Модель, к которой был запрос
+        usage: Поле usage ответа API (может отсутствовать)
+        route: Маршрут модели (preview / draft / final)
+    """
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens", 0) or 0
+    completion_tokens = usage.get("completion_tokens", 0) or 0
+    total_tokens = usage.get("total_tokens", 0) or prompt_tokens + completion_tokens
+    # Токены общего префикса промпта, которые провайдер взял из своего кэша
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+    cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+
+    metrics.inc("llm.requests")
+    metrics.inc("llm.tokens.prompt", prompt_tokens)
+    metrics.inc("llm.tokens.cached", cached_tokens)
+    metrics.inc("llm.tokens.completion", completion_tokens)
+    metrics.inc("llm.tokens.total", total_tokens)
+    metrics.inc("llm.cost_usd", cost)
+    if route:
+        metrics.inc(f"llm.route.{route}.requests")
+        metrics.inc(f"llm.route.{route}.tokens", total_tokens)
+        metrics.inc(f"llm.route.{route}.prompt_tokens", prompt_tokens)
+        metrics.inc(f"llm.route.{route}.cached_tokens", cached_tokens)
+        metrics.inc(f"llm.route.{route}.cost_usd", cost)
+
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.model = model
+        scope.route = route
+        scope.requests += 1
+        scope.prompt_tokens += prompt_tokens
+        scope.cached_tokens += cached_tokens
+        scope.completion_tokens += completion_tokens
+        scope.total_tokens += total_tokens
+        scope.cost_usd += cost
+
+
+class TokenBudget:
+    """
+    Дневные бюджеты токенов на пользователя и на канал.
+
+    Расход за текущие сутки (UTC) загружается из llm_usage при первом
+    обращении и дальше поддерживается в памяти.
+    """
+
+    def __init__(self, user_limit: int, chat_limit: int):
+        self.user_limit = user_limit
+        self.chat_limit = chat_limit
+        self._day: Optional[dt.date] = None
+        self._used: Dict[Tuple[str, int], int] = {}
+
+    def _reset_if_new_day(self) -> dt.date:
+        today = dt.datetime.utcnow().date()
+        if self._day != today:
+            self._day = today
+            self._used = {}
+        return today
+
+    async def used_today(self, field: str, value: int) -> int:
+        """Сколько токенов израсходовано сегодня пользователем (field='user_id') или каналом ('chat_id')"""
+        today = self._reset_if_new_day()
+        key = (field, value)
+        if key not in self._used:
+            day_start = dt.datetime.combine(today, dt.time.min)
+            async with AsyncSessionLocal() as session:
+                column = getattr(LLMUsage, field)
+                result = await session.execute(
+                    select(func.coalesce(func.sum(LLMUsage.total_tokens), 0))
+                    .where(column == value, LLMUsage.created_at >= day_start)
+                )
+                self._used[key] = result.scalar_one()
+        return self._used[key]
+
+    def add(self, user_id: Optional[int], chat_id: Optional[int], tokens: int):
+        """Учитывает расход, если счетчик уже загружен (иначе он будет прочитан из БД)"""
+        self._reset_if_new_day()
+        for key in (("user_id", user_id), ("chat_id", chat_id)):
+            if key[1] is not None and key in self._used:
+                self._used[key] += tokens
+
+    async def check(self, user_id: Optional[int], chat_id: Optional[int]):
+        """
+        Проверяет бюджеты пользователя и канала.
+
+        Raises:
+            BudgetExceeded: если один из бюджетов исчерпан
+        """
+        if user_id is not None and self.user_limit > 0:
+            if await self.used_today("user_id", user_id) >= self.user_limit:
+                metrics.inc("llm.budget_rejections")
+                raise BudgetExceeded(
+                    f"исчерпан дневной лимит токенов пользователя ({self.user_limit}). Попробуйте завтра."
+                )
+        if chat_id is not None and self.chat_limit > 0:
+            if await self.used_today("chat_id", chat_id) >= self.chat_limit:
+                metrics.inc("llm.budget_rejections")
+                raise BudgetExceeded(
+                    f"исчерпан дневной лимит токенов канала ({self.chat_limit}). Попробуйте завтра."
+                )
+
+
+token_budget = TokenBudget(LLM_USER_DAILY_TOKENS, LLM_CHAT_DAILY_TOKENS)
+
+
+async def save_usage(scope: UsageScope):
+    """Сохраняет расход задачи в llm_usage и учитывает его в бюджетах"""
+    try:
+        async with AsyncSessionLocal() as session:
+            session.add(LLMUsage(
+                user_id=scope.user_id,
+                chat_id=scope.chat_id,
+                kind=scope.kind,
+                model=scope.model,
+                route=scope.route,
+                requests=scope.requests,
+                prompt_tokens=scope.prompt_tokens,
+                cached_tokens=scope.cached_tokens,
+                completion_tokens=scope.completion_tokens,
+                total_tokens=scope.total_tokens,
+                cost_usd=scope.cost_usd,
+            ))
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Failed to save LLM usage: {e}")
+    token_budget.add(scope.user_id, scope.chat_id, scope.total_tokens)
+
+
+@asynccontextmanager
+async def usage_scope(user_id: Optional[int] = None, chat_id: Optional[int] = None, kind: str = "article"):
+    """
+    Контекст задачи генерации: весь usage запросов внутри него сохраняется одной строкой llm_usage.
+
+    Args:
+        user_id: Telegram ID пользователя (None для фоновых задач)
+        chat_id: ID канала, для которого генерируется контент
+        kind: Тип задачи (article, batch, series ...)
+    """
+    scope = UsageScope(user_id=user_id, chat_id=chat_id, kind=kind)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        if scope.requests:
+            await save_usage(scope)
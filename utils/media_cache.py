@@ -0,0 +1,289 @@
+# utils/media_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import time
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import AsyncGenerator, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from aiogram.types import InputFile
+
+from config import MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Размер чанка при чтении блоба для загрузки в Telegram
+READ_CHUNK_SIZE = 64 * 1024
+# Задержка записи индекса: изменения за это время сохраняются одной записью
+INDEX_SAVE_DELAY = 5.0
+
+
+class MappedInputFile(InputFile):
+    """InputFile, читающий блоб из кэша через mmap без загрузки файла целиком в память"""
+
+    def __init__(self, path: Path, filename: Optional[str] = None, chunk_size: int = READ_CHUNK_SIZE):
+        super().__init__(filename=filename or path.name, chunk_size=chunk_size)
+        self.path = path
+
+    async def read(self, bot) -> AsyncGenerator[bytes, None]:
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for offset in range(0, size, self.chunk_size):
+                    yield mm[offset:offset + self.chunk_size]
+
+
+class MediaCache:
+    """
+    Локальный контентно-адресуемый кэш медиафайлов.
+
+    Блобы хранятся по SHA-256 содержимого, поэтому одна и та же картинка,
+    используемая в нескольких постах и каналах, лежит на диске один раз.
+    Индекс связывает URL с блобом и хранит ETag/Last-Modified для условных
+    запросов. При превышении лимита размера удаляются давно не использованные блобы,
+    кроме закрепленных: блоб закреплен, пока существует выданный для него InputFile.
+
+    Индекс меняется в памяти и записывается на диск в отдельном потоке не чаще
+    раза в INDEX_SAVE_DELAY секунд; close() дописывает последние изменения.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        """
+        Args:
+            root: Каталог кэша
+            max_bytes: Максимальный суммарный размер блобов в байтах
+        """
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.index_path = self.root / "index.json"
+        self.max_bytes = max_bytes
+        self._lock = asyncio.Lock()
+        self._index = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._save_task: Optional[asyncio.Task] = None
+        # sha256 -> число InputFile, которые еще могут читать блоб
+        self._pins: Counter = Counter()
+
+    # ── индекс ────────────────────────────────────────────────
+    def _load_index(self) -> dict:
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {"urls": {}, "blobs": {}}
+            except Exception as e:
+                logger.error(f"Media cache index is corrupted, starting from scratch: {e}")
+                self._index = {"urls": {}, "blobs": {}}
+        return self._index
+
+    def _write_index(self, payload: str):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.index_path)
+
+    def _schedule_save(self):
+        """Откладывает запись индекса: частые попадания и загрузки дают одну запись"""
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(INDEX_SAVE_DELAY)
+        await self.save_index()
+
+    async def save_index(self):
+        """Записывает индекс на диск (сериализация под блокировкой, запись в отдельном потоке)"""
+        async with self._lock:
+            if self._index is None:
+                return
+            payload = json.dumps(self._index)
+        try:
+            await asyncio.to_thread(self._write_index, payload)
+        except OSError as e:
+            logger.error(f"Failed to save media cache index: {e}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Общая HTTP-сессия загрузок (пул соединений переиспользуется между файлами)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        """Закрывает HTTP-сессию и дописывает индекс (при остановке бота)"""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        await self.save_index()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _pin(self, sha256: str):
+        self._pins[sha256] += 1
+
+    def _unpin(self, sha256: str):
+        self._pins[sha256] -= 1
+        if self._pins[sha256] <= 0:
+            del self._pins[sha256]
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blobs_dir / sha256[:2] / sha256
+
+    def _write_blob(self, sha256: str, content: bytes):
+        path = self._blob_path(sha256)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _touch(self, sha256: str):
+        blob = self._index["blobs"].get(sha256)
+        if blob:
+            blob["atime"] = time.time()
+
+    def _evict(self, keep: Optional[str] = None):
+        """Удаляет давно не использованные блобы, пока кэш не уложится в лимит"""
+        blobs = self._index["blobs"]
+        total = sum(b["size"] for b in blobs.values())
+        if total <= self.max_bytes:
+            return
+
+        for sha256, blob in sorted(blobs.items(), key=lambda item: item[1]["atime"]):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep or sha256 in self._pins:
+                continue
+            try:
+                self._blob_path(sha256).unlink(missing_ok=True)
+            except OSError as e:
+                logger.error(f"Failed to evict blob {sha256}: {e}")
+                continue
+            total -= blob["size"]
+            del blobs[sha256]
+            logger.info(f"Evicted blob {sha256} ({blob['size']} bytes) from media cache")
+
+        # Убираем ссылки URL на удаленные блобы
+        self._index["urls"] = {
+            url: entry for url, entry in self._index["urls"].items()
+            if entry["sha256"] in blobs
+        }
+
+    # ── публичный API ─────────────────────────────────────────
+    async def fetch(self, url: str, timeout: int = 20, pin: bool = False) -> Optional[str]:
+        """
+        Возвращает SHA-256 блоба для URL, загружая или ревалидируя его при необходимости.
+
+        Если URL уже есть в кэше, выполняется условный GET (If-None-Match /
+        If-Modified-Since): на 304 используется локальная копия. При сетевой ошибке
+        отдается закэшированная версия, если она есть.
+
+        Args:
+            url: URL изображения
+            timeout: Таймаут запроса в секундах
+            pin: Закрепить блоб (его не вытеснит другая загрузка); снимать через _unpin
+
+        Returns:
+            str: SHA-256 содержимого или None, если файл получить не удалось
+        """
+        async with self._lock:
+            cached = self._load_index()["urls"].get(url)
+            if cached and not self._blob_path(cached["sha256"]).exists():
+                cached = None
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with self._get_session().get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                if response.status == 304 and cached:
+                    logger.info(f"Media cache hit (not modified): {url}")
+                    return await self._use_cached(cached["sha256"], pin)
+
+                if response.status != 200:
+                    logger.error(f"Failed to download image, HTTP status: {response.status}")
+                    return await self._use_cached(cached["sha256"], pin) if cached else None
+
+                content = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except Exception as e:
+            logger.error(f"Error downloading image: {e}")
+            return await self._use_cached(cached["sha256"], pin) if cached else None
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        await asyncio.to_thread(self._write_blob, sha256, content)
+
+        async with self._lock:
+            index = self._load_index()
+            index["blobs"][sha256] = {"size": len(content), "atime": time.time()}
+            index["urls"][url] = {
+                "sha256": sha256,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            logger.info(f"Cached image from {url}: {sha256}, size: {len(content)} bytes")
+
+            if pin:
+                self._pin(sha256)
+            self._evict(keep=sha256)
+            self._schedule_save()
+        return sha256
+
+    async def _use_cached(self, sha256: str, pin: bool) -> Optional[str]:
+        """Отдает закэшированный блоб, если его еще не вытеснили"""
+        async with self._lock:
+            if sha256 not in self._index["blobs"] or not self._blob_path(sha256).exists():
+                return None
+            self._touch(sha256)
+            if pin:
+                self._pin(sha256)
+            self._schedule_save()
+        return sha256
+
+    def open(self, sha256: str, filename: Optional[str] = None) -> Optional[MappedInputFile]:
+        """
+        Возвращает InputFile для отправки блоба в Telegram или None, если блоба нет.
+
+        Блоб закреплен, пока InputFile существует: вытеснение не удалит его
+        между загрузкой и отправкой (в том числе при повторах отправки).
+        """
+        path = self._blob_path(sha256)
+        if not path.exists():
+            return None
+        input_file = MappedInputFile(path, filename=filename)
+        self._pin(sha256)
+        weakref.finalize(input_file, self._unpin, sha256)
+        return input_file
+
+    async def get_input_file(self, url: str, timeout: int = 20) -> Optional[MappedInputFile]:
+        """Загружает URL через кэш и возвращает InputFile для send_photo"""
+        sha256 = await self.fetch(url, timeout=timeout, pin=True)
+        if not sha256:
+            return None
+        try:
+            filename = os.path.basename(urlparse(url).path) or sha256
+            return self.open(sha256, filename=filename)
+        finally:
+            # Закрепление на время между fetch и open; дальше его держит InputFile
+            self._unpin(sha256)
+
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
@@ -0,0 +1,73 @@
+# utils/metrics.py
+import threading
+from collections import defaultdict, deque
+from typing import Dict
+
+# Сколько последних наблюдений хранится для расчета перцентилей
+SUMMARY_WINDOW = 1000
+
+
+class Metrics:
+    """
+    Простой реестр метрик процесса: счетчики и сводки (count/sum/перцентили).
+
+    Метрики живут в памяти и сбрасываются при перезапуске бота; снимок
+    доступен администратору через команду /genstats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._summaries: Dict[str, dict] = {}
+
+    def inc(self, name: str, value: float = 1):
+        """Увеличивает счетчик name на value"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        """Добавляет наблюдение в сводку name (например, длительность запроса)"""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = {"count": 0, "sum": 0.0, "window": deque(maxlen=SUMMARY_WINDOW)}
+                self._summaries[name] = summary
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["window"].append(value)
+
+    def counter(self, name: str) -> float:
+        """Текущее значение счетчика"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        """
+        Возвращает снимок всех метрик.
+
+        Returns:
+            dict: {"counters": {name: value}, "summaries": {name: {count, sum, avg, p50, p99}}}
+        """
+        with self._lock:
+            summaries = {}
+            for name, summary in self._summaries.items():
+                window = sorted(summary["window"])
+                summaries[name] = {
+                    "count": summary["count"],
+                    "sum": summary["sum"],
+                    "avg": summary["sum"] / summary["count"] if summary["count"] else 0.0,
+                    "p50": _percentile(window, 0.50),
+                    "p99": _percentile(window, 0.99),
+                }
+            return {"counters": dict(self._counters), "summaries": summaries}
+
+
+def _percentile(values: list, q: float) -> float:
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q * len(values)) - 1))
+    return values[index]
+
+
+metrics = Metrics()
@@ -0,0 +1,122 @@
+# utils/pagination.py
+"""
+Keyset-пагинация списков постов по (publish_at, id).
+
+Вместо OFFSET страница ищется от курсора - ключа крайнего поста соседней
+страницы, поэтому запрос читает не больше page_size + 1 строк по индексу
+(chat_id, ..., publish_at) независимо от номера страницы. Курсор передается
+в callback_data кнопок "назад/вперед" (лимит Telegram - 64 байта).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from aiogram.types import InlineKeyboardButton
+from sqlalchemy import Select, and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+CURSOR_FORMAT = "%Y%m%d%H%M%S%f"
+
+# Направления перехода в callback_data
+NEXT = "n"
+PREV = "p"
+
+
+@dataclass
+class Page:
+    """Страница списка и курсоры для соседних страниц"""
+    items: List[Any]
+    total: int
+    has_prev: bool
+    has_next: bool
+
+    @property
+    def first_cursor(self) -> Optional[str]:
+        return encode_cursor(self.items[0]) if self.items else None
+
+    @property
+    def last_cursor(self) -> Optional[str]:
+        return encode_cursor(self.items[-1]) if self.items else None
+
+
+def encode_cursor(post) -> str:
+    """Курсор поста: publish_at (до микросекунд) и id"""
+    return f"{post.publish_at.strftime(CURSOR_FORMAT)}.{post.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Разбирает курсор из callback_data.
+
+    Raises:
+        ValueError: если курсор поврежден
+    """
+    stamp, post_id = cursor.split(".")
+    return datetime.strptime(stamp, CURSOR_FORMAT), int(post_id)
+
+
+def parse_page_callback(data: str) -> Tuple[str, Optional[str]]:
+    """'<префикс>:<n|p>:<курсор>' -> (направление, курсор)"""
+    _, direction, cursor = data.split(":", 2)
+    return direction, cursor or None
+
+
+def page_buttons(prefix: str, page: Page) -> List[InlineKeyboardButton]:
+    """Кнопки "назад/вперед" с курсорами страницы (пустой список, если страница одна)"""
+    buttons = []
+    if page.has_prev:
+        buttons.append(InlineKeyboardButton(text="◀️ Назад", callback_data=f"{prefix}:{PREV}:{page.first_cursor}"))
+    if page.has_next:
+        buttons.append(InlineKeyboardButton(text="Вперед ▶️", callback_data=f"{prefix}:{NEXT}:{page.last_cursor}"))
+    return buttons
+
+
+async def keyset_page(
+    session: AsyncSession,
+    query: Select,
+    model,
+    page_size: int,
+    cursor: Optional[str] = None,
+    direction: str = NEXT,
+    descending: bool = False,
+) -> Page:
+    """
+    Загружает страницу query в порядке (publish_at, id).
+
+    Args:
+        session: Сессия БД
+        query: select(Model) с фильтрами, без order_by и limit
+        model: Модель с колонками publish_at и id
+        page_size: Постов на странице
+        cursor: Курсор крайнего поста соседней страницы (None - первая страница)
+        direction: NEXT - страница после курсора, PREV - перед ним
+        descending: Порядок списка (True - новые сверху)
+
+    Returns:
+        Page: посты страницы в порядке списка, общее число постов и наличие соседних страниц
+    """
+    # COUNT(*) отдельным запросом по тем же фильтрам, без загрузки строк
+    total = await session.scalar(query.with_only_columns(func.count(model.id)).order_by(None))
+
+    # Для PREV идем от курсора в обратную сторону и разворачиваем результат
+    forward = direction != PREV
+    ascending = forward != descending
+    publish_at, ident = model.publish_at, model.id
+
+    if cursor:
+        stamp, post_id = decode_cursor(cursor)
+        if ascending:
+            query = query.where(or_(publish_at > stamp, and_(publish_at == stamp, ident > post_id)))
+        else:
+            query = query.where(or_(publish_at < stamp, and_(publish_at == stamp, ident < post_id)))
+
+    order = (publish_at.asc(), ident.asc()) if ascending else (publish_at.desc(), ident.desc())
+    rows = list((await session.scalars(query.order_by(*order).limit(page_size + 1))).all())
+
+    # Лишняя строка означает, что дальше в этом направлении есть еще страница
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if forward:
+        return Page(rows, total or 0, has_prev=cursor is not None, has_next=has_more)
+    rows.reverse()
+    return Page(rows, total or 0, has_prev=has_more, has_next=True)
@@ -0,0 +1,92 @@
+# utils/post_archiver.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from database.db import AsyncSessionLocal
+from database.models import Post, PostArchive
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MSK = ZoneInfo("Europe/Moscow")
+
+# Колонки, которые переносятся из posts в posts_archive как есть
+ARCHIVED_COLUMNS = (
+    "id", "chat_id", "text", "preview", "media_file_id", "publish_at", "created_by", "status",
+    "created_at", "template_id", "generation_params", "rejection_reason",
+)
+
+
+def _archive_select(ids, archived_at: datetime):
+    """SELECT строк posts для INSERT ... SELECT в posts_archive"""
+    columns = [getattr(Post, name) for name in ARCHIVED_COLUMNS]
+    return select(
+        *columns,
+        # Старые строки могли остаться с NULL в флагах - в архиве они обязательны
+        func.coalesce(Post.published, True),
+        func.coalesce(Post.is_generated, False),
+        literal(archived_at, PostArchive.archived_at.type),
+    ).where(Post.id.in_(ids))
+
+
+async def archive_published_posts(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> int:
+    """
+    Переносит опубликованные посты старше older_than_days из posts в posts_archive.
+
+    Каждый пакет из batch_size постов переносится отдельной короткой транзакцией
+    (INSERT ... SELECT и DELETE по списку id), между пакетами управление
+    возвращается циклу событий, чтобы не задерживать хэндлеры и планировщик.
+
+    Args:
+        older_than_days: Возраст поста (по publish_at) для переноса; 0 - архивация выключена
+        batch_size: Постов в одной транзакции
+
+    Returns:
+        int: Число перенесенных постов
+    """
+    if older_than_days <= 0:
+        return 0
+
+    # publish_at хранится в московском времени без таймзоны
+    border = datetime.now(MSK).replace(tzinfo=None) - timedelta(days=older_than_days)
+    target = [PostArchive.__table__.c[name] for name in ARCHIVED_COLUMNS] + [
+        PostArchive.__table__.c.published,
+        PostArchive.__table__.c.is_generated,
+        PostArchive.__table__.c.archived_at,
+    ]
+    moved = 0
+
+    while True:
+        async with AsyncSessionLocal() as session:
+            ids = (await session.scalars(
+                select(Post.id)
+                .where(Post.published.is_(True), Post.publish_at < border)
+                .order_by(Post.id)
+                .limit(batch_size)
+            )).all()
+            if not ids:
+                break
+
+            await session.execute(
+                insert(PostArchive.__table__).from_select(target, _archive_select(ids, datetime.utcnow()))
+            )
+            await session.execute(delete(Post).where(Post.id.in_(ids)))
+            await session.commit()
+
+        moved += len(ids)
+        metrics.inc("posts_archive.moved", len(ids))
+        if len(ids) < batch_size:
+            break
+        await asyncio.sleep(0)
+
+    if moved:
+        logger.info(f"Archived {moved} published posts older than {older_than_days} days")
+    return moved
@@ -0,0 +1,223 @@
+# utils/post_import.py
+"""
+Массовый импорт контент-плана из CSV или JSON.
+
+Файл разбирается и проверяется целиком за один проход: для каждой строки
+либо готовится словарь колонок Post, либо запоминается ошибка с номером
+строки. Если ошибок нет, все посты вставляются одной транзакцией пакетными
+INSERT (database.crud.insert_posts); при ошибках ничего не сохраняется,
+чтобы файл можно было исправить и загрузить заново целиком.
+
+Колонки (заголовок CSV или ключи объектов JSON):
+    publish_at     - "ДД.ММ.ГГГГ ЧЧ:ММ" или "ГГГГ-ММ-ДД ЧЧ:ММ", московское время
+    text           - текст поста
+    chat_id        - канал (необязательно, по умолчанию - текущий канал)
+    media_file_id  - file_id фото из Telegram (необязательно)
+"""
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Collection, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import IMPORT_BATCH_SIZE, IMPORT_MAX_ROWS
+from database.crud import insert_posts
+from database.db import AsyncSessionLocal
+from database.models.post import make_preview
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MSK = ZoneInfo("Europe/Moscow")
+
+DATETIME_FORMATS = ("%d.%m.%Y %H:%M", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+# Лимиты Telegram: текст сообщения и подпись к фото
+MAX_TEXT_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+
+
+class ImportFormatError(ValueError):
+    """Файл не удалось прочитать как CSV или JSON со списком постов"""
+
+
+@dataclass
+class ImportResult:
+    """Итог импорта: число постов и ошибки по строкам (номер строки, описание)"""
+    total: int = 0
+    imported: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def read_rows(filename: str, content: bytes) -> List[Tuple[int, dict]]:
+    """
+    Читает строки файла по расширению (.json - JSON, иначе CSV).
+
+    Returns:
+        [(номер строки в файле, словарь полей)]
+
+    Raises:
+        ImportFormatError: если файл не разбирается или строк больше IMPORT_MAX_ROWS
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFormatError("файл должен быть в кодировке UTF-8")
+
+    if filename.lower().endswith(".json"):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"некорректный JSON: {e}")
+        if not isinstance(data, list):
+            raise ImportFormatError("JSON должен содержать список постов")
+        rows = list(enumerate(data, start=1))
+    else:
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+        if not reader.fieldnames or "text" not in reader.fieldnames:
+            raise ImportFormatError("в первой строке CSV нужен заголовок с колонками publish_at и text")
+        # Строка 1 - заголовок
+        rows = list(enumerate(reader, start=2))
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ImportFormatError(f"слишком много строк: {len(rows)} (максимум {IMPORT_MAX_ROWS})")
+    return rows
+
+
+def parse_publish_at(value: str) -> datetime:
+    """Время публикации в московском времени без таймзоны (как хранится publish_at)"""
+    value = value.strip()
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"неверное время '{value}', нужно ДД.ММ.ГГГГ ЧЧ:ММ")
+
+
+def validate_row(
+    row: dict,
+    default_chat_id: Optional[int],
+    allowed_chats: Collection[int],
+    now: datetime,
+) -> dict:
+    """
+    Проверяет строку файла и возвращает значения колонок Post.
+
+    Raises:
+        ValueError: с описанием ошибки для отчета
+    """
+    if not isinstance(row, dict):
+        raise ValueError("ожидается объект с полями publish_at и text")
+
+    text = str(row.get("text") or "").strip()
+    if not text:
+        raise ValueError("пустой текст")
+    media_file_id = str(row.get("media_file_id") or "").strip() or None
+    limit = MAX_CAPTION_LENGTH if media_file_id else MAX_TEXT_LENGTH
+    if len(text) > limit:
+        raise ValueError(f"текст длиннее {limit} символов")
+
+    raw_chat_id = str(row.get("chat_id") or "").strip()
+    if raw_chat_id:
+        try:
+            chat_id = int(raw_chat_id)
+        except ValueError:
+            raise ValueError(f"неверный chat_id '{raw_chat_id}'")
+    elif default_chat_id is not None:
+        chat_id = default_chat_id
+    else:
+        raise ValueError("не указан chat_id и не выбран текущий канал")
+    if chat_id not in allowed_chats:
+        raise ValueError(f"канал {chat_id} не подключен")
+
+    publish_at = parse_publish_at(str(row.get("publish_at") or ""))
+    if publish_at <= now:
+        raise ValueError(f"время {publish_at:%d.%m.%Y %H:%M} уже прошло")
+
+    return {
+        "chat_id": chat_id,
+        "text": text,
+        "preview": make_preview(text),
+        "media_file_id": media_file_id,
+        "publish_at": publish_at,
+        "status": "approved",
+        "published": False,
+        "is_generated": False,
+    }
+
+
+def validate_rows(
+    rows: List[Tuple[int, dict]],
+    created_by: int,
+    default_chat_id: Optional[int],
+    allowed_chats: Collection[int],
+) -> Tuple[List[dict], List[Tuple[int, str]]]:
+    """
+    Проверяет все строки за один проход.
+
+    Returns:
+        (значения колонок для вставки, ошибки [(номер строки, описание)])
+    """
+    now = datetime.now(MSK).replace(tzinfo=None)
+    created_at = datetime.utcnow()
+    allowed = set(allowed_chats)
+    values, errors = [], []
+    for line, row in rows:
+        try:
+            post = validate_row(row, default_chat_id, allowed, now)
+        except ValueError as e:
+            errors.append((line, str(e)))
+            continue
+        post["created_by"] = created_by
+        post["created_at"] = created_at
+        values.append(post)
+    return values, errors
+
+
+async def import_posts(
+    filename: str,
+    content: bytes,
+    created_by: int,
+    allowed_chats: Collection[int],
+    default_chat_id: Optional[int] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportResult:
+    """
+    Импортирует контент-план из файла.
+
+    Args:
+        filename: Имя файла (по расширению выбирается формат)
+        content: Содержимое файла
+        created_by: Автор постов (user_id Telegram)
+        allowed_chats: Каналы, в которые можно планировать посты
+        default_chat_id: Канал для строк без chat_id
+        batch_size: Строк в одном INSERT
+
+    Returns:
+        ImportResult: при ошибках в строках imported = 0 и ничего не сохраняется
+
+    Raises:
+        ImportFormatError: если файл не разбирается целиком
+    """
+    rows = read_rows(filename, content)
+    values, errors = validate_rows(rows, created_by, default_chat_id, allowed_chats)
+    result = ImportResult(total=len(rows), errors=errors)
+    if errors or not values:
+        metrics.inc("posts_import.rejected_rows", len(errors))
+        return result
+
+    async with AsyncSessionLocal() as session:
+        result.imported = await insert_posts(session, values, batch_size)
+        await session.commit()
+
+    metrics.inc("posts_import.imported", result.imported)
+    logger.info(f"Imported {result.imported} posts from {filename} for user {created_by}")
+    return result
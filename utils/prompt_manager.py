@@ -16,6 +16,19 @@ FORBIDDEN_KEYWORDS = ["взлом", "запрещенный контент", "н
 # Настройки системного контекста
 SYSTEM_CONTEXT = "Ты помощник для создания контента в социальных сетях. Создавай короткие, информативные посты."
 
+# Системный промпт генерации постов: одинаков для всех запросов и идет первым сообщением.
+# Содержит общие правила оформления (раньше их добавлял в каждый промпт build_basic_prompt),
+# а все параметры поста - во втором, пользовательском сообщении
+ARTICLE_SYSTEM_PROMPT = (
+    "Ты пишешь короткие посты для социальных сетей на русском языке. Не используй явные маркеры "
+    "структуры текста вроде 'Основной текст:', 'Подзаголовок:', 'Заключение:' и т.п. "
+    "Форматируй текст органично и естественно.\n\n"
+    "ВАЖНО: В тексте поста НЕ УКАЗЫВАЙ явные маркеры структуры вида 'Основной текст:', "
+    "'Подзаголовок:', 'Заключение:', и т.д. Эти элементы должны органично вписываться в текст "
+    "без явных пометок. Используй эмодзи и форматирование для визуального разделения частей, "
+    "а не текстовые метки."
+)
+
 # Типы контента
 CONTENT_TYPES = {
     "news": "Новостной",
@@ -91,6 +104,31 @@ def validate_pro_prompt(prompt_text: str) -> bool:
         
     return True
 
+def build_generation_params(params: dict) -> dict:
+    """
+    Собирает параметры генерации для сохранения вместе с постом
+    
+    Args:
+        params: Данные FSM с параметрами BASIC или промптом PRO
+        
+    Returns:
+        dict: Параметры генерации (сохраняются в Post.generation_params как JSON)
+    """
+    if params.get("generation_mode", BASIC_MODE) == BASIC_MODE:
+        return {
+            "mode": BASIC_MODE,
+            "blog_topic": params.get("blog_topic_name"),
+            "content_type": params.get("content_type_name"),
+            "themes": params.get("themes"),
+            "tone": params.get("tone_name"),
+            "structure": {k: v for k, v in params.get("structure", {}).items() if v},
+            "length": params.get("length_name")
+        }
+    return {
+        "mode": PRO_MODE,
+        "prompt": params.get("pro_prompt", "")
+    }
+
 def build_basic_prompt(params: dict) -> str:
     """
     Строит промпт из параметров конструктора BASIC
@@ -128,21 +166,13 @@ def build_basic_prompt(params: dict) -> str:
     if structure.get("hashtags", False):
         structure_elements.append("хэштеги")
     
-    # Формируем базовый промпт
+    # Только переменная часть: общие правила оформления передаются в ARTICLE_SYSTEM_PROMPT
     prompt = (
         f"Создай {content_type} на тему \"{theme}\" в сфере {blog_topic} в {tone} тоне. "
         f"Пост должен включать: {', '.join(structure_elements)}. "
         f"Длина поста: {length}. "
     )
     
-    # Важные инструкции о форматировании
-    prompt += (
-        "ВАЖНО: В тексте поста НЕ УКАЗЫВАЙ явные маркеры структуры вида 'Основной текст:', "
-        "'Подзаголовок:', 'Заключение:', и т.д. Эти элементы должны органично вписываться в текст "
-        "без явных пометок. Используй эмодзи и форматирование для визуального разделения частей, "
-        "а не текстовые метки. "
-    )
-    
     # Добавляем дополнительные опции
     if structure.get("emoji", False):
         prompt += "Используй подходящие эмодзи для украшения текста. "
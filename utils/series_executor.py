@@ -0,0 +1,188 @@
+# utils/series_executor.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot
+from sqlalchemy import select
+
+from config import SERIES_PREGEN_HOURS, SERIES_PREGEN_MAX_PER_RUN
+from database.db import AsyncSessionLocal
+from database.models import GeneratedPost, GeneratedSeries
+from gpt_client import generate_variants
+from utils.llm_queue import llm_queue
+
+logger = logging.getLogger(__name__)
+
+MSK = ZoneInfo("Europe/Moscow")
+
+# Слот считается пропущенным, если его время прошло больше чем на это значение
+MISSED_SLOT_GRACE = timedelta(minutes=5)
+
+
+def now_msk() -> datetime:
+    """Текущее московское время без таймзоны (в таком виде хранятся времена публикаций)"""
+    return datetime.now(MSK).replace(tzinfo=None)
+
+
+def next_series_time(time_str: str, now: datetime) -> datetime:
+    """
+    Ближайшее будущее время публикации для строки ЧЧ:ММ.
+
+    Args:
+        time_str: Время в формате ЧЧ:ММ
+        now: Текущее время (МСК, без таймзоны)
+
+    Returns:
+        datetime: Сегодня в указанное время или завтра, если оно уже прошло
+    """
+    slot_time = datetime.strptime(time_str, "%H:%M").time()
+    slot = datetime.combine(now.date(), slot_time)
+    if slot <= now:
+        slot += timedelta(days=1)
+    return slot
+
+
+def _plan_slots(series: GeneratedSeries, now: datetime, horizon_end: datetime, budget: int) -> List[datetime]:
+    """Времена публикаций, которые нужно сгенерировать для серии в этом проходе"""
+    slot = series.time
+    if slot < now - MISSED_SLOT_GRACE:
+        # Бот был остановлен или генерация падала - не публикуем задним числом
+        if series.repeat == "daily":
+            while slot < now:
+                slot += timedelta(days=1)
+        else:
+            slot = now
+
+    remaining = min((series.post_limit or 0) - (series.posts_generated or 0), budget)
+    slots = []
+    while slot <= horizon_end and len(slots) < remaining:
+        slots.append(slot)
+        if series.repeat != "daily":
+            break
+        slot += timedelta(days=1)
+    return slots
+
+
+async def pregenerate_series():
+    """
+    Заранее генерирует посты активных серий на SERIES_PREGEN_HOURS вперед.
+
+    Проход выполняется в три шага: чтение серий, генерация (без открытой
+    сессии БД, через общую очередь генерации) и запись результатов. Посты
+    серий с премодерацией получают статус pending, остальные - approved
+    и публикуются publish_generated_posts.
+    Если генерация для серии упала, ее время не сдвигается и она будет
+    повторена следующим проходом.
+    """
+    now = now_msk()
+    horizon_end = now + timedelta(hours=SERIES_PREGEN_HOURS)
+
+    # 1. Выбираем серии, у которых ближайшая публикация попадает в горизонт
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(GeneratedSeries)
+            .where(
+                GeneratedSeries.is_active.is_(True),
+                GeneratedSeries.time <= horizon_end,
+                GeneratedSeries.posts_generated < GeneratedSeries.post_limit,
+            )
+            .order_by(GeneratedSeries.time)
+        )
+        due_series = result.scalars().all()
+
+    plans: Dict[int, List[datetime]] = {}
+    prompts: Dict[int, str] = {}
+    chats: Dict[int, int] = {}
+    budget = SERIES_PREGEN_MAX_PER_RUN
+    for series in due_series:
+        if budget <= 0:
+            break
+        slots = _plan_slots(series, now, horizon_end, budget)
+        if slots:
+            plans[series.id] = slots
+            prompts[series.id] = series.prompt
+            chats[series.id] = series.chat_id
+            budget -= len(slots)
+
+    if not plans:
+        return
+
+    # 2. Генерируем все слоты серии одним запросом; серии ставятся в общую очередь
+    #    генерации как фоновые задачи (с учетом бюджета канала)
+    def make_job(sid: int):
+        return lambda: generate_variants(prompts[sid], len(plans[sid]))
+
+    series_ids = list(plans)
+    results = await asyncio.gather(
+        *(llm_queue.submit(None, chats[sid], make_job(sid), kind="series") for sid in series_ids),
+        return_exceptions=True,
+    )
+
+    # 3. Сохраняем посты и сдвигаем расписание серий
+    created = 0
+    async with AsyncSessionLocal() as session:
+        for series_id, texts in zip(series_ids, results):
+            if isinstance(texts, Exception):
+                logger.error(f"Pre-generation failed for series {series_id}: {texts}")
+                continue
+
+            series = await session.get(GeneratedSeries, series_id)
+            if series is None or not series.is_active:
+                continue
+
+            status = "pending" if series.moderation else "approved"
+            slots = plans[series_id][:len(texts)]
+            for slot, text in zip(slots, texts):
+                session.add(GeneratedPost(
+                    series_id=series.id,
+                    chat_id=series.chat_id,
+                    text=text,
+                    publish_at=slot,
+                    status=status,
+                    published=False,
+                ))
+            if not slots:
+                continue
+
+            created += len(slots)
+            series.posts_generated = (series.posts_generated or 0) + len(slots)
+            if series.repeat == "daily":
+                series.time = slots[-1] + timedelta(days=1)
+            else:
+                series.is_active = False
+            if series.posts_generated >= series.post_limit:
+                series.is_active = False
+
+        await session.commit()
+
+    logger.info(f"Pre-generated {created} posts for {len(series_ids)} series")
+
+
+async def publish_generated_posts(bot: Bot):
+    """Публикует одобренные посты серий, время которых пришло"""
+    now = now_msk()
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(GeneratedPost)
+            .where(
+                GeneratedPost.status == "approved",
+                GeneratedPost.published.is_(False),
+                GeneratedPost.publish_at <= now,
+            )
+            .order_by(GeneratedPost.publish_at)
+        )
+        posts = result.scalars().all()
+
+        for post in posts:
+            try:
+                await bot.send_message(chat_id=post.chat_id, text=post.text, parse_mode="HTML")
+                post.status = "sent"
+                post.published = True
+                logger.info(f"Published generated post {post.id} to chat {post.chat_id}")
+            except Exception as e:
+                logger.error(f"Error publishing generated post {post.id}: {e}")
+                post.status = "error"
+            await session.commit()
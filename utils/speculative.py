@@ -0,0 +1,129 @@
+# utils/speculative.py
+import asyncio
+import datetime as dt
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config import SPECULATIVE_ENABLED, SPECULATIVE_DAILY_LIMIT
+from gpt_client import generate_variant
+from utils.llm_queue import llm_queue
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Очередь llm_queue для спекулятивных задач: они не занимают слот пользователя
+SPECULATIVE_LANE = "speculative"
+
+
+@dataclass
+class _Speculation:
+    prompt: str
+    task: asyncio.Task
+
+
+class SpeculativeGenerator:
+    """
+    Фоновая генерация следующего варианта поста, пока пользователь читает текущий.
+
+    На пользователя держится не больше одной спекулятивной задачи. Она идет
+    через общую очередь генерации (и учитывается в бюджетах токенов), но в
+    отдельном lane: догадка не задерживает следующую настоящую задачу
+    пользователя, а все спекулятивные задачи вместе занимают не больше
+    LLM_USER_CONCURRENCY слотов. При регенерации с тем же промптом ее результат
+    отдается сразу, а при публикации, планировании поста или пакетной генерации
+    задача отменяется. Число фоновых генераций ограничено дневным лимитом
+    на пользователя.
+    """
+
+    def __init__(self, enabled: bool, daily_limit: int):
+        """
+        Args:
+            enabled: Включен ли режим
+            daily_limit: Максимум спекулятивных генераций на пользователя в сутки
+        """
+        self.enabled = enabled
+        self.daily_limit = daily_limit
+        self._speculations: Dict[int, _Speculation] = {}
+        self._day: Optional[dt.date] = None
+        self._started_today: Dict[int, int] = {}
+
+    def _take_quota(self, user_id: int) -> bool:
+        today = dt.datetime.utcnow().date()
+        if self._day != today:
+            self._day = today
+            self._started_today = {}
+        if self._started_today.get(user_id, 0) >= self.daily_limit:
+            return False
+        self._started_today[user_id] = self._started_today.get(user_id, 0) + 1
+        return True
+
+    def start(self, user_id: int, chat_id: Optional[int], prompt: str):
+        """
+        Запускает фоновую генерацию варианта для prompt (если режим включен и не исчерпан лимит).
+
+        Args:
+            user_id: Telegram ID пользователя
+            chat_id: ID канала (для бюджета канала)
+            prompt: Промпт, который будет использован при регенерации
+        """
+        if not self.enabled:
+            return
+        self.discard(user_id)
+        if not self._take_quota(user_id):
+            metrics.inc("speculative.limited")
+            return
+
+        async def generate() -> str:
+            return await llm_queue.submit(
+                user_id, chat_id, lambda: generate_variant(prompt), kind="speculative", lane=SPECULATIVE_LANE
+            )
+
+        task = asyncio.create_task(generate())
+        # Исключение забирается в take(); здесь только гасим предупреждение о непрочитанной ошибке
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._speculations[user_id] = _Speculation(prompt, task)
+        metrics.inc("speculative.started")
+
+    async def take(self, user_id: int, prompt: str) -> Optional[str]:
+        """
+        Забирает результат спекулятивной генерации для prompt.
+
+        Если генерация еще идет, ожидает ее завершения (это все равно быстрее
+        холодного запроса). Возвращает None, если подходящей задачи нет или она
+        завершилась ошибкой.
+        """
+        speculation = self._speculations.pop(user_id, None)
+        if speculation is None:
+            return None
+        if speculation.prompt != prompt:
+            speculation.task.cancel()
+            metrics.inc("speculative.wasted")
+            return None
+
+        try:
+            text = await speculation.task
+        except asyncio.CancelledError:
+            # Отменили саму фоновую задачу - просто промах; отмену вызывающего пробрасываем
+            if asyncio.current_task().cancelling():
+                raise
+            return None
+        except Exception as e:
+            logger.warning(f"Speculative generation for user {user_id} failed: {e}")
+            metrics.inc("speculative.failed")
+            return None
+
+        metrics.inc("speculative.hits")
+        return text
+
+    def discard(self, user_id: int):
+        """Отменяет спекулятивную задачу пользователя (например, при публикации поста)"""
+        speculation = self._speculations.pop(user_id, None)
+        if speculation is None:
+            return
+        if not speculation.task.done():
+            speculation.task.cancel()
+        metrics.inc("speculative.wasted")
+
+
+speculative = SpeculativeGenerator(SPECULATIVE_ENABLED, SPECULATIVE_DAILY_LIMIT)
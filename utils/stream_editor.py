@@ -0,0 +1,64 @@
+# utils/stream_editor.py
+import asyncio
+import logging
+from typing import Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+from config import STREAM_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Лимит длины текста сообщения в Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+# Курсор, показывающий, что текст еще печатается
+TYPING_CURSOR = " ▌"
+
+
+class ThrottledEditor:
+    """
+    Прогрессивно обновляет текст сообщения, не чаще чем раз в min_interval секунд.
+
+    Промежуточные правки пропускаются, если с прошлой правки прошло слишком мало
+    времени или текст не изменился. На TelegramRetryAfter следующая правка
+    откладывается на указанное Telegram время, генерация при этом не прерывается.
+    """
+
+    def __init__(self, message: Message, min_interval: float = STREAM_EDIT_INTERVAL):
+        """
+        Args:
+            message: Сообщение бота, которое будет редактироваться
+            min_interval: Минимальный интервал между правками в секундах
+        """
+        self.message = message
+        self.min_interval = min_interval
+        self._next_edit_at = 0.0
+        self._last_text: Optional[str] = None
+
+    async def update(self, text: str):
+        """Показывает промежуточный текст, если позволяет троттлинг"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if now < self._next_edit_at:
+            return
+
+        # Telegram не принимает текст длиннее лимита - показываем хвост
+        if len(text) > MAX_MESSAGE_LENGTH:
+            text = "…" + text[-(MAX_MESSAGE_LENGTH - 1):]
+        if text == self._last_text:
+            return
+
+        try:
+            # Промежуточный текст может содержать незакрытые теги, поэтому без parse_mode
+            await self.message.edit_text(text, parse_mode=None)
+            self._last_text = text
+            self._next_edit_at = now + self.min_interval
+        except TelegramRetryAfter as e:
+            logger.warning(f"Flood control on stream edit, waiting {e.retry_after}s")
+            self._next_edit_at = now + e.retry_after
+        except TelegramBadRequest as e:
+            # "message is not modified" и подобные ошибки не критичны для превью
+            logger.debug(f"Stream edit skipped: {e}")
+            self._next_edit_at = now + self.min_interval
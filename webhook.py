@@ -0,0 +1,166 @@
+# webhook.py
+"""
+Прием апдейтов через webhook (BOT_MODE=webhook) вместо long polling.
+
+aiohttp-сервер принимает POST от Telegram на WEBHOOK_PATH, проверяет
+секрет из заголовка X-Telegram-Bot-Api-Secret-Token и кладет апдейт
+в ограниченную очередь (WEBHOOK_QUEUE_SIZE). WEBHOOK_WORKERS обработчиков
+забирают апдейты из очереди и передают их диспетчеру, так что число
+одновременно обрабатываемых апдейтов не зависит от числа запросов Telegram
+(в хэндлерах их дополнительно ограничивает UPDATE_CONCURRENCY, а обработчик,
+ждущий блокировку диалога, простаивает - поэтому WEBHOOK_WORKERS больше).
+Если очередь заполнена, сервер отвечает 503 и Telegram повторит доставку позже.
+
+Если WEBHOOK_URL пуст, webhook в Telegram не регистрируется - сервер можно
+проверить локально, отправляя записанные апдейты (bench/webhook_replay.py).
+"""
+import asyncio
+import hmac
+import logging
+import signal
+import time
+from contextlib import suppress
+from typing import Any, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from config import (
+    WEBHOOK_HOST, WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_QUEUE_SIZE, WEBHOOK_SECRET, WEBHOOK_URL, WEBHOOK_WORKERS,
+)
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateQueue:
+    """Ограниченная очередь апдейтов и пул обработчиков, передающих их диспетчеру"""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int, maxsize: int, workflow_data: Dict[str, Any]):
+        """
+        Args:
+            dp: Диспетчер
+            bot: Бот, от имени которого обрабатываются апдейты
+            workers: Число одновременно обрабатываемых апдейтов
+            maxsize: Максимум апдейтов, ожидающих обработки
+            workflow_data: Данные, которые диспетчер передает хэндлерам (как при polling)
+        """
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self.workflow_data = workflow_data
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def put(self, update: Update) -> bool:
+        """Ставит апдейт в очередь; False, если очередь заполнена"""
+        try:
+            self._queue.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            metrics.inc("webhook.rejected")
+            return False
+        metrics.inc("webhook.updates")
+        return True
+
+    async def _worker(self):
+        while True:
+            enqueued, update = await self._queue.get()
+            metrics.observe("webhook.queue_wait", time.perf_counter() - enqueued)
+            started = time.perf_counter()
+            try:
+                await self.dp.feed_update(self.bot, update, **self.workflow_data)
+            except Exception as e:
+                logger.error(f"Error handling update {update.update_id}: {e}")
+            finally:
+                metrics.observe("webhook.handle_time", time.perf_counter() - started)
+                self._queue.task_done()
+
+    async def stop(self, timeout: float = 30.0):
+        """Дожидается обработки уже принятых апдейтов (не дольше timeout) и останавливает обработчики"""
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._queue.join(), timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def create_app(queue: UpdateQueue, secret: str = WEBHOOK_SECRET, path: str = WEBHOOK_PATH) -> web.Application:
+    """aiohttp-приложение: POST path - прием апдейтов, GET /healthz - состояние очереди"""
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            metrics.inc("webhook.unauthorized")
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": queue.bot})
+        except ValueError:
+            return web.Response(status=400)
+        if not queue.put(update):
+            # Telegram повторит доставку, когда очередь освободится
+            return web.Response(status=503)
+        return web.Response()
+
+    async def healthz(request: web.Request) -> web.Response:
+        return web.json_response({"queued": queue.size, "workers": queue.workers})
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """
+    Запускает прием апдейтов через webhook и работает до SIGINT/SIGTERM.
+
+    Повторяет жизненный цикл start_polling: startup/shutdown-хэндлеры
+    диспетчера и закрытие сессии бота при остановке.
+    """
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+
+    queue = UpdateQueue(dp, bot, WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, workflow_data)
+    queue.start()
+    runner = web.AppRunner(create_app(queue))
+    await runner.setup()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        logger.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+        if WEBHOOK_URL:
+            if not WEBHOOK_SECRET:
+                logger.warning("WEBHOOK_SECRET is empty: webhook requests are not authenticated")
+            await bot.set_webhook(
+                WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+            logger.info(f"Webhook registered at {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+
+        await stop.wait()
+    finally:
+        # Webhook в Telegram не удаляем: его могут обслуживать другие реплики
+        await runner.cleanup()
+        await queue.stop()
+        try:
+            await dp.emit_shutdown(bot=bot, **workflow_data)
+        finally:
+            await bot.session.close()